@@ -0,0 +1,354 @@
+# archiver.py
+#
+# Moves returned loans older than a cutoff, with their resolved alerts, out of
+# the working database into a sibling archive file (test.db -> test-archive.db),
+# so the hot tables only hold recent and active rows.
+#   python archiver.py [--days 365] [--batch 5000] [--db test.db]
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from db import DEFAULT_DB, Database, begin_immediate
+from migrations import apply_migrations
+from utils import from_day, today_day
+
+# Returned loans older than this many days are archived
+ARCHIVE_AFTER_DAYS = 365
+
+# Loans moved per transaction
+BATCH_SIZE = 5000
+
+LOAN_COLUMNS = "loan_id, book_id, user_id, issue_date, due_date, return_date"
+NOTIFICATION_COLUMNS = "id, loan_id, type, message, status, created_at"
+
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.loans (
+        loan_id INTEGER PRIMARY KEY,
+        book_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        issue_date INTEGER NOT NULL,
+        due_date INTEGER NOT NULL,
+        return_date INTEGER NOT NULL,
+        archived_on INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archived_loans_user ON loans (user_id)",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archived_loans_book ON loans (book_id)",
+    """
+    CREATE TABLE IF NOT EXISTS archive.notifications (
+        id INTEGER PRIMARY KEY,
+        loan_id INTEGER NOT NULL,
+        type TEXT NOT NULL,
+        message TEXT NOT NULL,
+        status TEXT,
+        created_at TEXT NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS archive.idx_archived_notifications_loan ON notifications (loan_id)",
+]
+
+# Full history. A row left in both files by an interrupted run is read
+# from the working copy only.
+HISTORY_VIEWS = [
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS loan_history AS
+    SELECT {LOAN_COLUMNS} FROM main.loans
+    UNION ALL
+    SELECT {LOAN_COLUMNS} FROM archive.loans a
+    WHERE NOT EXISTS (SELECT 1 FROM main.loans m WHERE m.loan_id = a.loan_id)
+    """,
+    f"""
+    CREATE TEMP VIEW IF NOT EXISTS notification_history AS
+    SELECT {NOTIFICATION_COLUMNS} FROM main.notifications
+    UNION ALL
+    SELECT {NOTIFICATION_COLUMNS} FROM archive.notifications a
+    WHERE NOT EXISTS (SELECT 1 FROM main.notifications m WHERE m.id = a.id)
+    """,
+]
+
+
+# ========================== ATTACHING ==========================
+
+def archive_path(db_path):
+    return os.path.splitext(db_path)[0] + "-archive.db"
+
+
+# ATTACH as schema `archive` (created on first use) and add the history views
+def attach_archive(conn, path):
+    conn.execute("ATTACH DATABASE ? AS archive", (path,))
+    conn.execute("PRAGMA archive.journal_mode = WAL")
+    for sql in ARCHIVE_SCHEMA + HISTORY_VIEWS:
+        conn.execute(sql)
+    conn.commit()
+
+
+def detach_archive(conn):
+    conn.execute("DROP VIEW IF EXISTS temp.loan_history")
+    conn.execute("DROP VIEW IF EXISTS temp.notification_history")
+    conn.execute("DETACH DATABASE archive")
+
+
+# Attach the archive of the file `conn` has open, if one exists; yields
+# whether it did. For writers that must touch archived rows too.
+@contextmanager
+def archive_attached(conn):
+    db_path = next((file for _, name, file in conn.execute("PRAGMA database_list") if name == "main"), "")
+    path = archive_path(db_path) if db_path else None
+    if path is None or not os.path.exists(path):
+        yield False
+        return
+
+    attach_archive(conn, path)
+    try:
+        yield True
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        detach_archive(conn)
+
+
+# Yields the name to read full loan history from: `loan_history` while the
+# archive is attached, plain `loans` when nothing has been archived yet
+@contextmanager
+def loan_history(conn, db_path):
+    path = archive_path(db_path)
+    if not os.path.exists(path):
+        yield "loans"
+        return
+
+    attach_archive(conn, path)
+    try:
+        yield "loan_history"
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        detach_archive(conn)
+
+
+# ========================== ARCHIVED ROWS ==========================
+
+# Add (sign=1) or remove (sign=-1) the share of the archived loans matching
+# `where` (a condition on archive.loans `a`) in the circulation statistics.
+# Archived loans are all returned, so only the daily counts and the loan
+# totals per book and user move.
+def adjust_archived_stats(cursor, where, params, sign):
+    cursor.execute(
+        f"""
+        INSERT INTO stats_daily (day, issued, returned)
+        SELECT a.issue_date, {sign} * COUNT(*), 0 FROM archive.loans a WHERE {where} GROUP BY a.issue_date
+        ON CONFLICT (day) DO UPDATE SET issued = issued + excluded.issued
+        """,
+        params,
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO stats_daily (day, issued, returned)
+        SELECT a.return_date, 0, {sign} * COUNT(*) FROM archive.loans a WHERE {where} GROUP BY a.return_date
+        ON CONFLICT (day) DO UPDATE SET returned = returned + excluded.returned
+        """,
+        params,
+    )
+    for table, column in (("stats_book", "book_id"), ("stats_user", "user_id")):
+        cursor.execute(
+            f"""
+            INSERT INTO {table} ({column}, loans, active)
+            SELECT a.{column}, {sign} * COUNT(*), 0 FROM archive.loans a WHERE {where} GROUP BY a.{column}
+            ON CONFLICT ({column}) DO UPDATE SET loans = loans + excluded.loans
+            """,
+            params,
+        )
+
+
+# Erase the archived loans (and their alerts) of a book or user being
+# deleted, with their share of the statistics, so loan history and stats
+# rebuilds do not bring them back. `column` is "book_id" or "user_id"; runs
+# inside the caller's transaction with the archive attached.
+def purge_archived(cursor, column, value):
+    adjust_archived_stats(cursor, f"a.{column} = ?", (value,), -1)
+    cursor.execute(
+        f"""
+        DELETE FROM archive.notifications
+        WHERE loan_id IN (SELECT loan_id FROM archive.loans WHERE {column} = ?)
+        """,
+        (value,),
+    )
+    cursor.execute(f"DELETE FROM archive.loans WHERE {column} = ?", (value,))
+
+
+# ========================== ARCHIVING ==========================
+
+# Returned before the cutoff, no fine on the ledger (balances stay with
+# the working database) and no alert still waiting to be read
+_ELIGIBLE = """
+    l.return_date < :cutoff
+    AND NOT EXISTS (SELECT 1 FROM fines f WHERE f.loan_id = l.loan_id)
+    AND NOT EXISTS (SELECT 1 FROM notifications n WHERE n.loan_id = l.loan_id AND n.status != 'resolved')
+"""
+
+
+def _copy_batch(conn, params):
+    cur = conn.cursor()
+    begin_immediate(conn)
+    try:
+        cur.execute("DELETE FROM temp.archive_batch")
+        cur.execute(
+            f"""
+            INSERT INTO temp.archive_batch (loan_id)
+            SELECT l.loan_id FROM loans l
+            WHERE l.loan_id > :after AND {_ELIGIBLE}
+            ORDER BY l.loan_id LIMIT :limit
+            """,
+            params,
+        )
+        if cur.rowcount == 0:
+            conn.rollback()
+            return 0
+        # OR REPLACE: a row copied by an interrupted run is refreshed
+        cur.execute(
+            f"""
+            INSERT OR REPLACE INTO archive.loans ({LOAN_COLUMNS}, archived_on)
+            SELECT {LOAN_COLUMNS}, :today FROM main.loans
+            WHERE loan_id IN (SELECT loan_id FROM temp.archive_batch)
+            """,
+            params,
+        )
+        copied = cur.rowcount
+        cur.execute(
+            f"""
+            INSERT OR REPLACE INTO archive.notifications ({NOTIFICATION_COLUMNS})
+            SELECT {NOTIFICATION_COLUMNS} FROM main.notifications
+            WHERE loan_id IN (SELECT loan_id FROM temp.archive_batch)
+            """
+        )
+        conn.commit()
+        return copied
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+# Drop the working rows whose archive copy is identical; returns (loans, notifications)
+def _delete_batch(conn, params):
+    cur = conn.cursor()
+    begin_immediate(conn)
+    try:
+        cur.execute(
+            """
+            DELETE FROM notifications
+            WHERE loan_id IN (SELECT loan_id FROM temp.archive_batch)
+              AND status = 'resolved'
+              AND id IN (SELECT id FROM archive.notifications)
+            """
+        )
+        notifications = cur.rowcount
+
+        cur.execute(
+            f"""
+            DELETE FROM loans
+            WHERE loan_id IN (SELECT loan_id FROM temp.archive_batch)
+              AND loan_id IN (
+                  SELECT l.loan_id FROM main.loans l
+                  JOIN archive.loans a ON a.loan_id = l.loan_id
+                  WHERE l.loan_id IN (SELECT loan_id FROM temp.archive_batch)
+                    AND a.book_id = l.book_id AND a.user_id = l.user_id
+                    AND a.issue_date = l.issue_date AND a.due_date = l.due_date
+                    AND a.return_date = l.return_date
+                    AND {_ELIGIBLE}
+                    AND NOT EXISTS (SELECT 1 FROM notifications n WHERE n.loan_id = l.loan_id)
+              )
+            """,
+            params,
+        )
+        loans = cur.rowcount
+        # Archived loans still count in the statistics: add back in one pass
+        # what the per-row delete trigger just subtracted (no schema change,
+        # which would make every other connection re-prepare its statements)
+        if loans:
+            adjust_archived_stats(
+                cur,
+                """a.loan_id IN (SELECT loan_id FROM temp.archive_batch)
+                   AND NOT EXISTS (SELECT 1 FROM main.loans m WHERE m.loan_id = a.loan_id)""",
+                (),
+                1,
+            )
+        conn.commit()
+        return loans, notifications
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+
+# Archive in batches: copy into the archive, then delete from the working
+# database. A transaction spanning both files is not atomic in WAL mode, so
+# the copy commits first and a crash in between only leaves a duplicate
+# that the next run cleans up.
+def archive_loans(conn, db_path, days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, quiet=False):
+    today = today_day()
+    params = {"cutoff": today - days, "today": today, "after": 0, "limit": batch_size}
+
+    attach_archive(conn, archive_path(db_path))
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (loan_id INTEGER PRIMARY KEY)")
+
+    loans = 0
+    notifications = 0
+    started = time.perf_counter()
+
+    try:
+        while _copy_batch(conn, params):
+            moved, alerts = _delete_batch(conn, params)
+            loans += moved
+            notifications += alerts
+            params["after"] = conn.execute("SELECT MAX(loan_id) FROM temp.archive_batch").fetchone()[0]
+
+            if not quiet:
+                elapsed = time.perf_counter() - started
+                print(f"\r  {loans:,} loans archived ({loans / elapsed:,.0f} loans/s)", end="")
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.archive_batch")
+        detach_archive(conn)
+
+    elapsed = time.perf_counter() - started
+    if not quiet and loans:
+        print()
+
+    return {
+        "loans": loans,
+        "notifications": notifications,
+        "cutoff": from_day(params["cutoff"]),
+        "seconds": elapsed,
+    }
+
+
+def main(argv):
+    # Imported here: the app imports this module at startup, the CLI is rare
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move old returned loans into the archive database")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS,
+                        help="archive loans returned more than this many days ago")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="loans per transaction")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+    conn = db.connection()
+    apply_migrations(conn)
+    print(f"--- 🗄️  ARCHIVING loans returned over {args.days} days ago -> {archive_path(args.db)} ---")
+
+    try:
+        stats = archive_loans(conn, args.db, args.days, args.batch)
+    except sqlite3.Error as e:
+        print(f"❌ Error: {e}")
+        return 1
+    finally:
+        db.close()
+
+    print("-" * 30)
+    print(f"✅ Archived {stats['loans']:,} loans returned before {stats['cutoff']} "
+          f"and {stats['notifications']:,} resolved alerts in {stats['seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,2 @@
+# bench: synthetic datasets, timed scenarios and stored baselines.
+# Run `python -m bench --help` from the repository root.
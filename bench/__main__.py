@@ -0,0 +1,171 @@
+# bench/__main__.py
+#
+# Usage:
+#   python -m bench --scale small --save bench/baseline-small.json
+#   python -m bench --scale small --compare bench/baseline-small.json
+import argparse
+import fnmatch
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from bench.datagen import SCALES, ensure_dataset
+from bench.scenarios import SCENARIOS, Context
+from db import connect
+from services import LibraryService
+
+# Median slowdown (as a fraction) that counts as a regression
+DEFAULT_THRESHOLD = 0.20
+
+# Medians below this are timer noise and never flagged
+NOISE_FLOOR_MS = 0.05
+
+
+# ========================== RUNNING ==========================
+
+def time_scenario(fn, ctx, repeat):
+    # One untimed warm-up iteration fills the page cache and statement cache
+    undo = fn(ctx)
+    if callable(undo):
+        undo()
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        undo = fn(ctx)
+        samples.append((time.perf_counter() - started) * 1000)
+        if callable(undo):
+            undo()
+
+    samples.sort()
+    return {
+        "repeat": repeat,
+        "min_ms": round(samples[0], 4),
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "max_ms": round(samples[-1], 4),
+    }
+
+
+def run(db_path, params, pattern="*", quiet=False):
+    conn = connect(db_path)
+    service = LibraryService(conn)
+    ctx = Context(service, params)
+
+    results = {}
+    try:
+        for name, (fn, repeat) in SCENARIOS.items():
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            results[name] = stats = time_scenario(fn, ctx, repeat)
+            if not quiet:
+                print(f"  {name:<28} median {stats['median_ms']:>10.3f} ms   p95 {stats['p95_ms']:>10.3f} ms")
+    finally:
+        conn.close()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "dataset": params,
+        },
+        "results": results,
+    }
+
+
+# ========================== BASELINES ==========================
+
+# Returns a list of (name, old_ms, new_ms, change, status) rows
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    rows = []
+    old_results = baseline["results"]
+    for name, stats in current["results"].items():
+        old = old_results.get(name)
+        if old is None:
+            rows.append((name, None, stats["median_ms"], None, "NEW"))
+            continue
+
+        old_ms, new_ms = old["median_ms"], stats["median_ms"]
+        change = (new_ms - old_ms) / old_ms if old_ms else 0.0
+        if max(old_ms, new_ms) < NOISE_FLOOR_MS:
+            status = "ok"
+        elif change > threshold:
+            status = "REGRESSION"
+        elif change < -threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append((name, old_ms, new_ms, change, status))
+    return rows
+
+
+def _same_dataset(a, b):
+    keys = ("books", "users", "loans", "seed")
+    return all(a.get(k) == b.get(k) for k in keys)
+
+
+def print_comparison(rows, threshold):
+    print(f"\n--- 📊 COMPARISON (threshold {threshold:.0%}) ---")
+    for name, old_ms, new_ms, change, status in rows:
+        if old_ms is None:
+            print(f"  {name:<28} {'-':>10}   -> {new_ms:>10.3f} ms   {status}")
+        else:
+            print(f"  {name:<28} {old_ms:>10.3f} -> {new_ms:>10.3f} ms  {change:>+7.1%}  {status}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="LibTrack benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--db", help="dataset path (default: bench/<scale>.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", default="*", help="scenario name glob, e.g. 'list.*'")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--regenerate", action="store_true", help="rebuild the dataset first")
+    args = parser.parse_args(argv)
+
+    books, users, loans = SCALES[args.scale]
+    db_path = args.db or f"bench/{args.scale}.db"
+
+    if args.regenerate:
+        from bench.datagen import generate
+        params = generate(db_path, books, users, loans, seed=args.seed)
+    else:
+        params = ensure_dataset(db_path, books, users, loans, seed=args.seed)
+
+    print(f"--- ⏱️  RUNNING BENCHMARKS ({args.scale}) ---")
+    current = run(db_path, params, args.only)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"✅ Results saved to {args.save}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if not _same_dataset(baseline["meta"]["dataset"], params):
+        print("⚠️  Baseline was recorded on a different dataset; numbers are not comparable.")
+
+    rows = compare(baseline, current, args.threshold)
+    print_comparison(rows, args.threshold)
+
+    regressions = [r for r in rows if r[4] == "REGRESSION"]
+    if regressions:
+        print(f"\n❌ {len(regressions)} scenario(s) regressed beyond {args.threshold:.0%}.")
+        return 1
+    print("\n✅ No regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
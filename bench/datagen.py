@@ -0,0 +1,254 @@
+# bench/datagen.py
+import heapq
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date
+from itertools import accumulate, islice
+
+from migrations import (
+    BOOKS_FTS_INSERT_TRIGGER,
+    CIRCULATION_STATS_TRIGGERS,
+    LATEST_VERSION,
+    apply_migrations,
+    rebuild_catalog_fts,
+    rebuild_circulation_stats,
+)
+from utils import FINE_PER_DAY, from_day, to_day
+
+# Named dataset sizes: (books, users, loans)
+SCALES = {
+    "tiny": (1_000, 500, 20_000),
+    "small": (10_000, 5_000, 200_000),
+    "default": (100_000, 50_000, 2_000_000),
+}
+
+# Rows written per executemany/commit
+CHUNK = 50_000
+
+_SYLLABLES = [
+    "ka", "lo", "mi", "ra", "ten", "vor", "shi", "an", "del", "mar", "qu", "is",
+    "bel", "dor", "fen", "gal", "hir", "jas", "kel", "lun", "mor", "nar", "ost", "pel",
+]
+
+
+# ========================== BUILDING BLOCKS ==========================
+
+def _word(rng):
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def _vocabulary(rng, size):
+    return [_word(rng) for _ in range(size)]
+
+
+# Zipf-like cumulative weights: item k is picked ~1/(k+1)^s as often as item 0
+def _zipf_cum_weights(n, s):
+    return list(accumulate(1.0 / (k + 1) ** s for k in range(n)))
+
+
+# ========================== GENERATOR ==========================
+
+# Deterministic for a given (sizes, seed, as_of). Returns the parameters used.
+def generate(path, books, users, loans, seed=42, as_of=None,
+             active_ratio=0.05, overdue_ratio=0.3, history_days=730, hot_titles=20, quiet=False):
+    as_of = as_of or date.today()
+    as_of_day = to_day(as_of)
+    rng = random.Random(seed)
+    params = {
+        "books": books, "users": users, "loans": loans, "seed": seed,
+        "as_of": as_of.isoformat(), "active_ratio": active_ratio,
+        "overdue_ratio": overdue_ratio, "history_days": history_days,
+        "hot_titles": hot_titles, "schema": LATEST_VERSION,
+    }
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    apply_migrations(conn)
+
+    started = time.perf_counter()
+    _log(quiet, f"Generating {books:,} books, {users:,} users, {loans:,} loans -> {path}")
+
+    # The FTS index and circulation stats are rebuilt once at the end instead of row by row
+    conn.execute("DROP TRIGGER IF EXISTS trg_books_fts_insert")
+    for name, _ in CIRCULATION_STATS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    vocab = _vocabulary(rng, 5000)
+    surnames = _vocabulary(rng, 2000)
+
+    # Users: one admin, the rest students
+    user_rows = [("Bench Admin", "admin", "0000000000", "admin", "admin")]
+    for i in range(1, users):
+        name = f"{rng.choice(vocab).title()} {rng.choice(surnames).title()}"
+        user_rows.append((name, f"user{i}", f"9{i:09d}"[-10:], f"pw{i}", "student"))
+    conn.executemany(
+        "INSERT INTO users (name, username, phone, password, role) VALUES (?, ?, ?, ?, ?)", user_rows
+    )
+    conn.commit()
+    del user_rows
+    _log(quiet, f"  users done ({time.perf_counter() - started:.1f}s)")
+
+    # Loans first (in memory only as per-book active counts), so stock can match
+    book_weights = _zipf_cum_weights(books, 1.1)
+    user_weights = _zipf_cum_weights(users - 1, 0.6)
+    active_per_book = [0] * books
+
+    # Issue dates rise with loan_id, as in a real table: returned loans are
+    # spread from history_days ago up to 15 days ago, and the active ones
+    # (issued in the last 60 days) merge in by date, so they sit at the tail
+    active_loans = round(loans * active_ratio)
+    active_ages = sorted(
+        (rng.randint(15, 60) if rng.random() < overdue_ratio else rng.randint(0, 14) for _ in range(active_loans)),
+        reverse=True,
+    )
+
+    def timeline():
+        returned = loans - active_loans
+        history = ((history_days - i * (history_days - 15) // returned, False) for i in range(returned))
+        return heapq.merge(history, ((age, True) for age in active_ages), key=lambda item: -item[0])
+
+    def loan_rows():
+        loans_in_order = timeline()
+        while True:
+            picks = list(islice(loans_in_order, CHUNK))
+            if not picks:
+                return
+            book_picks = rng.choices(range(books), cum_weights=book_weights, k=len(picks))
+            user_picks = rng.choices(range(users - 1), cum_weights=user_weights, k=len(picks))
+            rows = []
+            for (issued, active), b, u in zip(picks, book_picks, user_picks):
+                if active:
+                    active_per_book[b] += 1
+                    returned = None
+                else:
+                    returned = max(issued - rng.randint(1, 20), 0)
+                rows.append((
+                    b + 1, u + 2, as_of_day - issued, as_of_day - issued + 14,
+                    None if returned is None else as_of_day - returned,
+                ))
+            yield rows
+
+    for rows in loan_rows():
+        conn.executemany(
+            "INSERT INTO loans (book_id, user_id, issue_date, due_date, return_date) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    _log(quiet, f"  loans done ({time.perf_counter() - started:.1f}s)")
+
+    # Books: stock covers every active loan plus a few copies on the shelf
+    # (none for the hot titles, which have hold queues instead)
+    def book_rows():
+        for start in range(0, books, CHUNK):
+            rows = []
+            for b in range(start, min(start + CHUNK, books)):
+                title = " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 5))).title()
+                author = f"{rng.choice(vocab).title()} {rng.choice(surnames).title()}"
+                shelf = rng.randint(0, 4)
+                if b < hot_titles:
+                    shelf = 0
+                rows.append((title, author, shelf + active_per_book[b], shelf))
+            yield rows
+
+    for rows in book_rows():
+        conn.executemany(
+            "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    _log(quiet, f"  books done ({time.perf_counter() - started:.1f}s)")
+
+    # Hold queues on the most borrowed titles, each behind twice as many
+    # fulfilled holds, so queue lookups run against real depth
+    waiting = min(max(loans // 2000, 10), users - 1)
+    hold_rows = []
+    for b in range(min(hot_titles, books)):
+        for position in range(1, 2 * waiting + 1):
+            placed = as_of_day - rng.randint(30, history_days)
+            hold_rows.append((b + 1, rng.randint(2, users), position, "fulfilled", placed))
+        for position, u in enumerate(rng.sample(range(2, users + 1), waiting), start=1):
+            hold_rows.append((b + 1, u, position, "waiting", as_of_day - rng.randint(0, 29)))
+    conn.executemany(
+        "INSERT INTO holds (book_id, user_id, position, status, placed_on) VALUES (?, ?, ?, ?, ?)", hold_rows
+    )
+    conn.commit()
+    _log(quiet, f"  {len(hold_rows):,} holds done ({time.perf_counter() - started:.1f}s)")
+    del hold_rows
+
+    # Historical alerts: resolved DUE_TODAY rows for a slice of returned loans
+    conn.execute(
+        """
+        INSERT INTO notifications (loan_id, type, message, status, created_at)
+        SELECT loan_id, 'DUE_TODAY', 'Historical alert', 'resolved', date(due_date * 86400, 'unixepoch')
+        FROM loans WHERE return_date IS NOT NULL AND loan_id % 10 = 0
+        """
+    )
+    conn.commit()
+
+    # Fines ledger: open overdue loans as of as_of, like the migration's
+    # backfill (late returns from before the ledger are not charged)
+    conn.execute(
+        """
+        INSERT INTO fines (loan_id, user_id, days_overdue, amount, updated_at)
+        SELECT loan_id, user_id, ? - due_date, (? - due_date) * ?, ?
+        FROM loans WHERE return_date IS NULL AND due_date < ?
+        """,
+        (as_of_day, as_of_day, FINE_PER_DAY, from_day(as_of_day), as_of_day),
+    )
+    conn.commit()
+    _log(quiet, f"  fines done ({time.perf_counter() - started:.1f}s)")
+
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+    rebuild_catalog_fts(cursor)
+    cursor.execute(BOOKS_FTS_INSERT_TRIGGER)
+    rebuild_circulation_stats(cursor)
+    for _, sql in CIRCULATION_STATS_TRIGGERS:
+        cursor.execute(sql)
+    cursor.execute(
+        "INSERT OR REPLACE INTO app_state (key, value) VALUES ('bench_dataset', ?)",
+        (json.dumps(params, sort_keys=True),),
+    )
+    cursor.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+
+    _log(quiet, f"  done in {time.perf_counter() - started:.1f}s")
+    return params
+
+
+# Parameters recorded in a generated database, or None
+def dataset_params(path):
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT value FROM app_state WHERE key = 'bench_dataset'").fetchone()
+    except sqlite3.Error:
+        row = None
+    finally:
+        conn.close()
+    return json.loads(row[0]) if row else None
+
+
+# Reuse the file when it was generated with the same sizes, seed and schema today
+def ensure_dataset(path, books, users, loans, seed=42, quiet=False):
+    params = dataset_params(path)
+    wanted = {"books": books, "users": users, "loans": loans, "seed": seed,
+              "as_of": date.today().isoformat(), "schema": LATEST_VERSION}
+    if params and all(params.get(k) == v for k, v in wanted.items()):
+        _log(quiet, f"Reusing dataset {path}")
+        return params
+    return generate(path, books, users, loans, seed=seed, quiet=quiet)
+
+
+def _log(quiet, message):
+    if not quiet:
+        print(message)
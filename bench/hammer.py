@@ -0,0 +1,137 @@
+# bench/hammer.py
+#
+# Many desks fighting over a handful of copies. Every desk issues as fast as
+# it can (returning now and then so stock keeps churning); afterwards the
+# books table must agree with the loans table and no copy may be lent twice.
+#
+# Usage:
+#   python -m bench.hammer --desks 8 --seconds 10
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from db import Database
+from migrations import apply_migrations
+from services import BusyError, ConflictError, LibraryService
+
+DB_PATH = "bench/hammer.db"
+
+
+def _reset(path, books, copies, users):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    db = Database(path)
+    conn = db.connection()
+    apply_migrations(conn)
+    conn.executemany(
+        "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)",
+        [(f"Hammer Book {i}", "Bench", copies, copies) for i in range(books)],
+    )
+    conn.executemany(
+        "INSERT INTO users (name, username, phone, password, role) VALUES (?, ?, ?, ?, 'student')",
+        [(f"Desk User {i}", f"hammer{i}", "9000000000", "pw") for i in range(users)],
+    )
+    conn.commit()
+    db.close()
+
+
+def desk(path, books, users, seconds, return_ratio, seed, start_at, results):
+    conn = Database(path).connection()
+    service = LibraryService(conn)
+    rng = random.Random(seed)
+    counts = {"issued": 0, "out_of_stock": 0, "returned": 0, "busy": 0}
+    mine = []
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            if mine and rng.random() < return_ratio:
+                service.return_loan(mine.pop(rng.randrange(len(mine))))
+                counts["returned"] += 1
+            else:
+                loan = service.issue(rng.randint(1, books), rng.randint(1, users))
+                mine.append(loan.loan_id)
+                counts["issued"] += 1
+        except BusyError:
+            counts["busy"] += 1
+        except ConflictError:
+            counts["out_of_stock"] += 1
+
+    conn.close()
+    results.put(counts)
+
+
+# Books whose stock disagrees with their open loans; returns (oversold, drifted)
+def audit(path):
+    conn = Database(path).connection()
+    rows = conn.execute(
+        """
+        SELECT b.book_id, b.total_copies, b.available_copies,
+               (SELECT COUNT(*) FROM loans l
+                WHERE l.book_id = b.book_id AND l.return_date IS NULL)
+        FROM books b
+        """
+    ).fetchall()
+    conn.close()
+
+    oversold = [r for r in rows if r[2] < 0 or r[3] > r[1]]
+    drifted = [r for r in rows if r[1] - r[2] != r[3]]
+    return oversold, drifted
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.hammer", description="Concurrent issue hammer test")
+    parser.add_argument("--desks", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--books", type=int, default=5)
+    parser.add_argument("--copies", type=int, default=2)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--return-ratio", type=float, default=0.3)
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    _reset(args.db, args.books, args.copies, args.users)
+    print(f"--- 🔨 HAMMER: {args.desks} desks, {args.books} books x {args.copies} copies, {args.seconds:g}s ---")
+
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    procs = [
+        multiprocessing.Process(
+            target=desk,
+            args=(args.db, args.books, args.users, args.seconds, args.return_ratio, 500 + i, start_at, results),
+        )
+        for i in range(args.desks)
+    ]
+    for p in procs:
+        p.start()
+    per_desk = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    total = {key: sum(c[key] for c in per_desk) for key in per_desk[0]}
+    print(f"  issued {total['issued']:,} ({total['issued'] / args.seconds:,.0f}/s), "
+          f"returned {total['returned']:,}, refused out of stock {total['out_of_stock']:,}, busy {total['busy']:,}")
+
+    oversold, drifted = audit(args.db)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+    if oversold or drifted:
+        print(f"❌ {len(oversold)} oversold and {len(drifted)} drifted books:")
+        for book_id, total_copies, available, active in (oversold + drifted)[:10]:
+            print(f"   book {book_id}: total {total_copies}, available {available}, open loans {active}")
+        return 1
+    print("✅ Zero oversells: stock matches open loans for every book.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,225 @@
+# bench/loadtest.py
+#
+# Load test for server.py: starts the API on a private copy of a generated
+# dataset, then several client processes send a kiosk-like mix of catalog
+# reads, notification polls and issue/return writes over keep-alive
+# connections. Reports requests per second and p50/p99 latency per request
+# kind; exits with status 1 if any request failed with a 5xx.
+#
+# Usage:
+#   python -m bench.loadtest --scale small --clients 8 --seconds 10
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.datagen import SCALES, ensure_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Request kind -> share of the traffic; issue/return alternate per client
+MIX = [
+    ("search", 0.35),
+    ("books.page", 0.20),
+    ("user.loans", 0.10),
+    ("notifications.page", 0.10),
+    ("notifications.unread", 0.10),
+    ("write", 0.15),
+]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Consistent snapshot of the dataset (the generator may leave a WAL next to it)
+def _copy_dataset(src, dst):
+    source = sqlite3.connect(src)
+    target = sqlite3.connect(dst)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+def _start_server(db_path, port, workers):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "server.py"), "--db", db_path, "--port", str(port),
+         "--workers", str(workers), "--interval", "0"],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server.py exited during startup")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return proc
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server.py did not answer /health in 30s")
+
+
+# What the clients pick from: title words, shelf stock and the user range
+def _workload(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        words = sorted({
+            w.lower() for (title,) in conn.execute("SELECT title FROM books LIMIT 500")
+            for w in title.split() if len(w) > 2
+        })
+        in_stock = [r[0] for r in conn.execute("SELECT book_id FROM books WHERE available_copies > 0 LIMIT 500")]
+        max_book = conn.execute("SELECT MAX(book_id) FROM books").fetchone()[0]
+        max_user = conn.execute("SELECT MAX(user_id) FROM users").fetchone()[0]
+    finally:
+        conn.close()
+    return {"words": words, "in_stock": in_stock, "max_book": max_book, "max_user": max_user}
+
+
+# ========================== CLIENTS ==========================
+
+def client(port, workload, seconds, seed, start_at, results):
+    rng = random.Random(seed)
+    kinds = [k for k, _ in MIX]
+    weights = [w for _, w in MIX]
+    latencies = {}
+    statuses = {}
+    mine = []
+
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+
+    def call(kind, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if data else {}
+        started = time.perf_counter()
+        conn.request(method, path, body=data, headers=headers)
+        response = conn.getresponse()
+        payload = response.read()
+        latencies.setdefault(kind, []).append(time.perf_counter() - started)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        return response.status, payload
+
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "search":
+            call(kind, "GET", f"/search?q={rng.choice(workload['words'])}&limit=20")
+        elif kind == "books.page":
+            call(kind, "GET", f"/books?cursor={rng.randint(0, workload['max_book'])}")
+        elif kind == "user.loans":
+            call(kind, "GET", f"/users/{rng.randint(1, workload['max_user'])}/loans")
+        elif kind == "notifications.page":
+            call(kind, "GET", f"/notifications?cursor={rng.randint(0, 1000)}")
+        elif kind == "notifications.unread":
+            call(kind, "GET", "/notifications/unread")
+        elif mine and (len(mine) > 5 or rng.random() < 0.5):
+            call("return", "POST", f"/loans/{mine.pop(rng.randrange(len(mine)))}/return")
+        else:
+            body = {"book_id": rng.choice(workload["in_stock"]), "user_id": rng.randint(2, workload["max_user"])}
+            status, payload = call("issue", "POST", "/loans", body)
+            if status == 201:
+                mine.append(json.loads(payload)["loan_id"])
+
+    # Put the stock back so later runs start from the same shelf
+    for loan_id in mine:
+        call("return", "POST", f"/loans/{loan_id}/return")
+    conn.close()
+    results.put((latencies, statuses))
+
+
+def _percentile(sorted_samples, p):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * p))]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.loadtest", description="HTTP API load test")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--clients", type=int, default=8, help="client processes, one keep-alive connection each")
+    parser.add_argument("--workers", type=int, default=8, help="server request threads")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.clients > args.workers:
+        # A keep-alive connection holds its request thread until it closes
+        print(f"⚠️  {args.clients} clients share {args.workers} request threads; the extra ones will queue.")
+
+    dataset = f"bench/{args.scale}.db"
+    ensure_dataset(dataset, *SCALES[args.scale])
+
+    workdir = tempfile.mkdtemp(prefix="libtrack-loadtest-")
+    db_path = os.path.join(workdir, "loadtest.db")
+    _copy_dataset(dataset, db_path)
+    workload = _workload(db_path)
+
+    port = _free_port()
+    server = _start_server(db_path, port, args.workers)
+    print(f"--- 🌐 LOAD TEST ({args.scale}, {args.clients} clients, {args.workers} workers, {args.seconds:g}s) ---")
+
+    try:
+        results = multiprocessing.Queue()
+        start_at = time.time() + 0.5
+        procs = [
+            multiprocessing.Process(target=client,
+                                    args=(port, workload, args.seconds, args.seed + i, start_at, results))
+            for i in range(args.clients)
+        ]
+        for p in procs:
+            p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    latencies = {}
+    statuses = {}
+    for client_latencies, client_statuses in collected:
+        for kind, samples in client_latencies.items():
+            latencies.setdefault(kind, []).extend(samples)
+        for status, count in client_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    everything = sorted(s for samples in latencies.values() for s in samples)
+    for kind in sorted(latencies):
+        samples = sorted(latencies[kind])
+        print(f"  {kind:<22} {len(samples):>8,} req   p50 {statistics.median(samples) * 1000:>8.2f} ms"
+              f"   p99 {_percentile(samples, 0.99) * 1000:>8.2f} ms")
+
+    print("-" * 30)
+    print(f"  {len(everything):,} requests, {len(everything) / args.seconds:,.0f} req/s, "
+          f"p50 {statistics.median(everything) * 1000:.2f} ms, p99 {_percentile(everything, 0.99) * 1000:.2f} ms")
+    print(f"  status codes: {', '.join(f'{code}: {count:,}' for code, count in sorted(statuses.items()))}")
+
+    errors = sum(count for code, count in statuses.items() if code >= 500)
+    if errors:
+        print(f"❌ {errors:,} request(s) failed with a server error.")
+        return 1
+    print("✅ No server errors.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,238 @@
+# bench/query_plans.py
+#
+# Query plan regression check: EXPLAIN QUERY PLAN for every statement in
+# queries.QUERIES against a generated dataset. Fails if a statement not
+# listed in queries.SCAN_OK reads a whole table (or a whole non-partial
+# index, or a primary-key range it filters row by row), or if the registry
+# has outgrown the per-connection statement cache.
+#
+# Usage:
+#   python -m bench.query_plans              (bench/small.db)
+#   python -m bench.query_plans --scale default --verbose
+import argparse
+import re
+import sys
+
+from bench.datagen import SCALES, ensure_dataset
+from db import STATEMENT_CACHE_SIZE, connect
+from migrations import apply_migrations
+from queries import QUERIES, SCAN_OK
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NAMED = re.compile(r":(\w+)")
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?$")
+_PARENS = re.compile(r"\([^()]*\)")
+_KEY_RANGE = re.compile(r"^SEARCH (\w+) USING INTEGER PRIMARY KEY \(rowid[<>]")
+_WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+_WHERE_END = re.compile(r"\b(?:GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|RETURNING)\b", re.IGNORECASE)
+_BETWEEN = re.compile(r"\bBETWEEN\s+\S+\s+AND\b", re.IGNORECASE)
+_AND = re.compile(r"\s+AND\s+", re.IGNORECASE)
+_QUALIFIED = re.compile(r"\b(\w+)\.\w+")
+_BARE = re.compile(r"(?<![\w.:])([A-Za-z_]\w*)\b(?!\s*[.(])")
+_PARAM = r"(?:\?|:\w+)"
+_WORD = re.compile(r"\b(WHERE|JOIN|GROUP\s+BY|HAVING|DISTINCT|UNION|ORDER\s+BY|LIMIT)\b", re.IGNORECASE)
+
+# Words that can follow a table name and are not an alias
+_KEYWORDS = {"WHERE", "JOIN", "ON", "SET", "ORDER", "GROUP", "LIMIT", "SELECT", "VALUES", "USING", "LEFT", "INNER"}
+
+
+# Every parameter bound to NULL: the plan does not depend on the values
+def _null_params(sql):
+    bare = _STRING.sub("", sql)
+    names = _NAMED.findall(bare)
+    if names:
+        return dict.fromkeys(names)
+    return (None,) * bare.count("?")
+
+
+# alias -> table for the real tables a statement references
+def _aliases(sql, tables):
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(_STRING.sub("", sql)):
+        if table not in tables:
+            continue
+        aliases[table] = table
+        if alias and alias.upper() not in _KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+# The statement with every parenthesised part (subqueries, function
+# arguments) removed: what is left belongs to the outermost SELECT
+def _top_level(sql):
+    text = _STRING.sub("''", sql)
+    while True:
+        stripped = _PARENS.sub(" ", text)
+        if stripped == text:
+            return text
+        text = stripped
+
+
+# Names (table and alias) of the one table an unfiltered
+# "SELECT ... FROM t ORDER BY x LIMIT ?" walks in order, or None. Only such a
+# walk stops after LIMIT rows: a WHERE, JOIN, GROUP BY, DISTINCT or UNION can
+# skip rows and read on to the end, and a LIMIT inside a subquery bounds
+# nothing outside it.
+def _limited_walk(sql, details, tables):
+    top = _top_level(sql)
+    words = {" ".join(w.upper().split()) for w in _WORD.findall(top)}
+    if words != {"ORDER BY", "LIMIT"}:
+        return None
+    if any("TEMP B-TREE FOR ORDER BY" in d for d in details):
+        return None
+    refs = _aliases(top, tables)
+    if len(set(refs.values())) != 1:
+        return None
+    return set(refs)
+
+
+# Conditions ANDed together in the outermost WHERE, subqueries kept whole
+def _where_terms(sql):
+    text = _STRING.sub(lambda m: "'" + "_" * (len(m.group()) - 2) + "'", sql)
+    # Same length as `text`, with everything inside parentheses blanked out
+    depth = 0
+    masked = []
+    for ch in text:
+        if ch == "(":
+            depth += 1
+        masked.append(ch if depth == 0 else "_")
+        if ch == ")":
+            depth -= 1
+    masked = "".join(masked)
+
+    where = _WHERE.search(masked)
+    if not where:
+        return []
+    end = _WHERE_END.search(masked, where.end())
+    start, stop = where.end(), end.start() if end else len(masked)
+    # BETWEEN's AND does not separate conditions
+    clause = _BETWEEN.sub(lambda m: m.group()[:-3] + "___", masked[start:stop])
+    terms = []
+    pos = 0
+    for sep in _AND.finditer(clause):
+        terms.append(text[start + pos:start + sep.start()].strip())
+        pos = sep.end()
+    terms.append(text[start + pos:stop].strip())
+    return terms
+
+
+# Whether the WHERE filters `alias` (a table with integer key `key` and
+# column names `columns`) on anything besides a range of its key: SQLite
+# then walks the key range and tests every row, however few of them match.
+# Bare names count when they are one of the table's columns.
+def _filters_key_range(sql, alias, key, columns):
+    key_ref = rf"(?:{alias}\.)?{key}"
+    key_range = re.compile(
+        rf"{key_ref}\s*[<>]=?\s*{_PARAM}|{_PARAM}\s*[<>]=?\s*{key_ref}"
+        rf"|{key_ref}\s+BETWEEN\s+{_PARAM}\s+AND\s+{_PARAM}",
+        re.IGNORECASE,
+    )
+    for term in _where_terms(sql):
+        if key_range.fullmatch(term):
+            continue
+        bare = _STRING.sub("", term)
+        if alias in _QUALIFIED.findall(bare) or columns & set(_BARE.findall(bare)):
+            return True
+    return False
+
+
+def plan(conn, sql):
+    rows = conn.execute("EXPLAIN QUERY PLAN " + sql, _null_params(sql)).fetchall()
+    return [detail for _, _, _, detail in rows]
+
+
+# Tables read from end to end: "SCAN loans", a walk over a whole index
+# ("SCAN n USING COVERING INDEX idx_notifications_loan"), or a primary-key
+# range filtered row by row ("SEARCH l USING INTEGER PRIMARY KEY (rowid>?)"
+# for "l.loan_id > ? AND l.return_date IS NULL"). Partial indexes only
+# hold the rows the query wants, and the walk _limited_walk accepts reads
+# only LIMIT rows. Any other scan needs an entry in queries.SCAN_OK.
+# `keys` maps table -> (integer key column, set of column names).
+def full_scans(sql, details, tables, partial_indexes, keys):
+    aliases = _aliases(sql, tables)
+    walked = _limited_walk(sql, details, tables) or set()
+    scans = []
+    for detail in details:
+        ranged = _KEY_RANGE.match(detail)
+        if ranged and ranged.group(1) in aliases:
+            key, columns = keys[aliases[ranged.group(1)]]
+            if _filters_key_range(sql, ranged.group(1), key, columns):
+                scans.append(aliases[ranged.group(1)])
+            continue
+        match = _SCAN.match(detail)
+        if not match or match.group(1) not in aliases:
+            continue
+        if match.group(2) in partial_indexes or match.group(1) in walked:
+            continue
+        scans.append(aliases[match.group(1)])
+    return scans
+
+
+def check(conn, verbose=False):
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    partial_indexes = {
+        name for name, sql in conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'")
+        if sql and " WHERE " in sql.upper()
+    }
+    keys = {}
+    for table in tables:
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        key = next((name for _, name, kind, _, _, pk in info if pk == 1 and kind.upper() == "INTEGER"), "rowid")
+        keys[table] = (key, {name for _, name, *_ in info})
+    failures = []
+
+    for name, sql in sorted(QUERIES.items()):
+        details = plan(conn, sql)
+        scans = full_scans(sql, details, tables, partial_indexes, keys)
+        if scans and name not in SCAN_OK:
+            status = "❌"
+            failures.append((name, scans))
+        elif scans:
+            status = "➖"
+        else:
+            status = "✅"
+
+        print(f"  {status} {name}" + (f"  (scans {', '.join(scans)})" if scans else ""))
+        if verbose or (scans and name not in SCAN_OK):
+            for detail in details:
+                print(f"        {detail}")
+
+    return failures
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.query_plans", description="Query plan regression check")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--db", help="dataset path (default: bench/<scale>.db)")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or f"bench/{args.scale}.db"
+    ensure_dataset(db_path, *SCALES[args.scale])
+
+    print(f"--- 🔎 QUERY PLANS ({len(QUERIES)} statements, {db_path}) ---")
+    conn = connect(db_path)
+    try:
+        # Plans for the schema the app would run against
+        apply_migrations(conn)
+        failures = check(conn, args.verbose)
+    finally:
+        conn.close()
+
+    failed = False
+    if failures:
+        print(f"\n❌ {len(failures)} hot-path statement(s) read a whole table or key range: "
+              f"{', '.join(name for name, _ in failures)}")
+        failed = True
+    if len(QUERIES) > STATEMENT_CACHE_SIZE:
+        print(f"❌ {len(QUERIES)} registered statements do not fit the statement cache ({STATEMENT_CACHE_SIZE}).")
+        failed = True
+    if failed:
+        return 1
+    print(f"\n✅ No full table scans on the hot path; {len(QUERIES)} statements fit the cache of {STATEMENT_CACHE_SIZE}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
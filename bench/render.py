@@ -0,0 +1,103 @@
+# bench/render.py
+#
+# Table rendering check: time to the first row and peak memory of
+# tables.render_table against tabulate's fancy_grid, for growing row
+# counts. Rows come from a generator, as they would from a cursor, and the
+# output goes to /dev/null. Fails if the streaming renderer's first row or
+# peak memory grows with the row count.
+#
+# Usage:
+#   python -m bench.render
+#   python -m bench.render --rows 1000 100000 --tabulate-max 0
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from tables import iter_table_lines
+from utils import tabulate
+
+HEADERS = ["ID", "Book Title", "Student Name", "Issued", "Due", "Returned"]
+MAXCOLWIDTHS = [None, 25, 20, None, None, None]
+
+# Largest row count's first-row time / peak memory may be this many times
+# the smallest one's before the check fails
+GROWTH_LIMIT = 3.0
+
+
+# Loan-listing shaped rows, generated lazily
+def loan_rows(count):
+    for n in range(1, count + 1):
+        yield [n, f"Collected Stories Volume {n % 97}", f"Student {n % 5003}", "2025-03-01", "2025-03-15",
+               None if n % 7 == 0 else "2025-03-10"]
+
+
+# (seconds to first line, seconds in total, peak bytes) writing the lines to
+# out. Peak memory comes from a second, traced pass: tracemalloc slows
+# allocation-heavy code several times over.
+def _measure(make_lines, out):
+    started = time.perf_counter()
+    first = None
+    for line in make_lines():
+        out.write(line + "\n")
+        if first is None:
+            first = time.perf_counter() - started
+    total = time.perf_counter() - started
+
+    tracemalloc.start()
+    for line in make_lines():
+        out.write(line + "\n")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak
+
+
+def streaming(count):
+    return lambda: iter_table_lines(loan_rows(count), HEADERS, MAXCOLWIDTHS)
+
+
+# tabulate returns one string; its "first line" is only ready when all of it is
+def whole_table(count):
+    def lines():
+        yield from tabulate(loan_rows(count), headers=HEADERS, tablefmt="fancy_grid",
+                            maxcolwidths=MAXCOLWIDTHS).split("\n")
+    return lines
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.render", description="Table rendering check")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--tabulate-max", type=int, default=10000,
+                        help="largest row count to compare with tabulate (0: never)")
+    args = parser.parse_args(argv)
+    counts = sorted(args.rows)
+
+    print("--- 🧾 TABLE RENDERING ---")
+    results = {}
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        for count in counts:
+            renderers = [("stream", streaming(count))]
+            if count <= args.tabulate_max:
+                renderers.append(("tabulate", whole_table(count)))
+            for name, make_lines in renderers:
+                first, total, peak = _measure(make_lines, out)
+                results[name, count] = (first, peak)
+                print(f"  {name:<9} {count:>9,} rows   first row {first * 1000:>9.2f} ms   "
+                      f"total {total:>7.2f} s   peak {peak / 1024 / 1024:>8.2f} MiB")
+
+    small, large = counts[0], counts[-1]
+    first_growth = results["stream", large][0] / results["stream", small][0]
+    peak_growth = results["stream", large][1] / results["stream", small][1]
+    print(f"\n  stream, {small:,} -> {large:,} rows: first row x{first_growth:.2f}, peak memory x{peak_growth:.2f}")
+
+    if len(counts) > 1 and max(first_growth, peak_growth) > GROWTH_LIMIT:
+        print(f"❌ The streaming renderer's first row or peak memory grows with the row count "
+              f"(limit x{GROWTH_LIMIT:g}).")
+        return 1
+    print("✅ First row and peak memory are independent of the row count.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
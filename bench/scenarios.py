@@ -0,0 +1,271 @@
+# bench/scenarios.py
+import random
+
+from search_index import SearchIndex
+from services import LibraryService
+
+# name -> (function, repeat). A scenario gets the run context and performs one
+# timed iteration; it may return a callable that undoes its writes (untimed).
+SCENARIOS = {}
+
+
+def scenario(name, repeat=20):
+    def register(fn):
+        SCENARIOS[name] = (fn, repeat)
+        return fn
+    return register
+
+
+class Context:
+    # Shared state for one benchmark run
+    def __init__(self, service, params, seed=7):
+        self.service = service
+        self.params = params
+        self.rng = random.Random(seed)
+
+        conn = service.conn
+        # Same connection without the lookup cache: what every call cost before it
+        self.uncached = LibraryService(conn, cache_size=0)
+
+        self.max_book = conn.execute("SELECT MAX(book_id) FROM books").fetchone()[0] or 0
+        self.max_user = conn.execute("SELECT MAX(user_id) FROM users").fetchone()[0] or 0
+        self.max_loan = conn.execute("SELECT MAX(loan_id) FROM loans").fetchone()[0] or 0
+        self.max_notification = conn.execute("SELECT MAX(id) FROM notifications").fetchone()[0] or 0
+
+        # A few catalog words to search for, taken from real titles
+        titles = [r[0] for r in conn.execute("SELECT title FROM books ORDER BY book_id LIMIT 200")]
+        self.words = sorted({w.lower() for t in titles for w in t.split()}) or ["book"]
+
+        # Books with stock on the shelf, for issue/return
+        self.in_stock = [
+            r[0] for r in conn.execute("SELECT book_id FROM books WHERE available_copies > 0 LIMIT 100")
+        ]
+
+        # Titles with a hold queue, one open loan of each and one queued student
+        self.queued = conn.execute(
+            """
+            SELECT h.book_id, MIN(l.loan_id), MAX(h.user_id) FROM holds h
+            JOIN loans l ON l.book_id = h.book_id AND l.return_date IS NULL
+            WHERE h.status = 'waiting'
+            GROUP BY h.book_id
+            """
+        ).fetchall()
+
+    # Keyset cursor roughly halfway through a table
+    def deep(self, max_id):
+        return max_id // 2
+
+
+# ========================== LOGIN ==========================
+
+@scenario("login.admin")
+def login_admin(ctx):
+    ctx.service.authenticate("admin", "admin")
+
+
+@scenario("login.student")
+def login_student(ctx):
+    i = ctx.rng.randint(1, max(ctx.max_user - 1, 1))
+    ctx.service.authenticate(f"user{i}", f"pw{i}")
+
+
+# ========================== SEARCH ==========================
+
+@scenario("search.fts.prefix")
+def search_prefix(ctx):
+    ctx.service.search(ctx.rng.choice(ctx.words)[:3])
+
+
+@scenario("search.fts.two_words")
+def search_two_words(ctx):
+    ctx.service.search(f"{ctx.rng.choice(ctx.words)} {ctx.rng.choice(ctx.words)[:2]}")
+
+
+@scenario("search.index.build", repeat=3)
+def search_index_build(ctx):
+    SearchIndex.from_connection(ctx.service.conn)
+
+
+@scenario("search.index.query", repeat=50)
+def search_index_query(ctx):
+    ctx.service.search_index().search(ctx.rng.choice(ctx.words)[:3], limit=15)
+
+
+@scenario("search.all_labels", repeat=3)
+def search_all_labels(ctx):
+    ctx.uncached.all_search_labels(include_users=True)
+
+
+@scenario("search.all_labels.cached", repeat=3)
+def search_all_labels_cached(ctx):
+    ctx.service.all_search_labels(include_users=True)
+
+
+# ========================== LOOKUPS ==========================
+
+# Detail screens re-reading the same few rows while an admin navigates
+@scenario("lookup.book_user", repeat=200)
+def lookup_book_user(ctx):
+    ctx.service.get_book(ctx.rng.randint(1, min(ctx.max_book, 20)))
+    ctx.service.get_user(ctx.rng.randint(1, min(ctx.max_user, 20)))
+
+
+@scenario("lookup.book_user.uncached", repeat=200)
+def lookup_book_user_uncached(ctx):
+    ctx.uncached.get_book(ctx.rng.randint(1, min(ctx.max_book, 20)))
+    ctx.uncached.get_user(ctx.rng.randint(1, min(ctx.max_user, 20)))
+
+
+# ========================== ALERTS ==========================
+
+@scenario("alerts.generate", repeat=5)
+def alerts_generate(ctx):
+    ctx.service.generate_daily_alerts(force=True)
+
+
+@scenario("alerts.unread_count", repeat=50)
+def alerts_unread_count(ctx):
+    ctx.service.unread_count()
+
+
+# ========================== FINES ==========================
+
+@scenario("fines.accrue", repeat=5)
+def fines_accrue(ctx):
+    ctx.service.accrue_fines(force=True)
+
+
+@scenario("fines.balance", repeat=50)
+def fines_balance(ctx):
+    ctx.service.outstanding_balance(ctx.rng.randint(1, max(ctx.max_user, 1)))
+
+
+@scenario("fines.report", repeat=5)
+def fines_report(ctx):
+    ctx.service.fines_report()
+
+
+# ========================== STATISTICS ==========================
+
+@scenario("stats.dashboard", repeat=50)
+def stats_dashboard(ctx):
+    ctx.service.circulation_stats()
+
+
+# ========================== CIRCULATION ==========================
+
+@scenario("loans.issue_return")
+def loans_issue_return(ctx):
+    if not ctx.in_stock:
+        return None
+    service = ctx.service
+    loan = service.issue(ctx.rng.choice(ctx.in_stock), ctx.rng.randint(2, max(ctx.max_user, 2)))
+    service.return_loan(loan.loan_id)
+    # Leave the dataset as generated
+    return lambda: service.delete_loan(loan.loan_id)
+
+
+# ========================== HOLDS ==========================
+
+@scenario("holds.place_cancel")
+def holds_place_cancel(ctx):
+    if not ctx.queued:
+        return None
+    service = ctx.service
+    book_id = ctx.rng.choice(ctx.queued)[0]
+    # Admin accounts never queue in the generated data
+    hold = service.place_hold(book_id, 1)
+    service.cancel_hold(hold.hold_id)
+
+    def undo():
+        service.conn.execute("DELETE FROM holds WHERE hold_id = ?", (hold.hold_id,))
+        service.conn.commit()
+    return undo
+
+
+# A return on a title with a queue pops the front hold in the same transaction
+@scenario("holds.return_pops_queue")
+def holds_return_pops_queue(ctx):
+    if not ctx.queued:
+        return None
+    service = ctx.service
+    loan_id = ctx.rng.choice(ctx.queued)[1]
+    hold = service.return_loan(loan_id).hold
+
+    def undo():
+        conn = service.conn
+        conn.execute("UPDATE holds SET status = 'waiting', expires_on = NULL WHERE hold_id = ?", (hold.hold_id,))
+        conn.execute("DELETE FROM notifications WHERE hold_id = ?", (hold.hold_id,))
+        conn.execute("UPDATE loans SET return_date = NULL WHERE loan_id = ?", (loan_id,))
+        conn.commit()
+    return undo
+
+
+@scenario("holds.queue_page")
+def holds_queue_page(ctx):
+    if ctx.queued:
+        ctx.service.hold_queue(ctx.rng.choice(ctx.queued)[0])
+
+
+@scenario("holds.user_holds")
+def holds_user_holds(ctx):
+    if ctx.queued:
+        ctx.service.list_user_holds(ctx.rng.choice(ctx.queued)[2])
+
+
+# ========================== LISTINGS ==========================
+
+@scenario("list.books.first")
+def list_books_first(ctx):
+    ctx.service.list_books()
+
+
+@scenario("list.books.deep")
+def list_books_deep(ctx):
+    ctx.service.list_books(cursor=ctx.deep(ctx.max_book))
+
+
+@scenario("list.users.first")
+def list_users_first(ctx):
+    ctx.service.list_users()
+
+
+@scenario("list.users.deep")
+def list_users_deep(ctx):
+    ctx.service.list_users(cursor=ctx.deep(ctx.max_user))
+
+
+@scenario("list.loans.first")
+def list_loans_first(ctx):
+    ctx.service.list_loans()
+
+
+@scenario("list.loans.deep")
+def list_loans_deep(ctx):
+    ctx.service.list_loans(cursor=ctx.deep(ctx.max_loan))
+
+
+@scenario("list.loans.active.first")
+def list_active_loans_first(ctx):
+    ctx.service.list_loans(active_only=True)
+
+
+@scenario("list.loans.active.deep")
+def list_active_loans_deep(ctx):
+    ctx.service.list_loans(cursor=ctx.deep(ctx.max_loan), active_only=True)
+
+
+@scenario("list.user_loans")
+def list_user_loans(ctx):
+    # Low user IDs are the heaviest borrowers in the generated data
+    ctx.service.list_user_loans(ctx.rng.randint(2, min(ctx.max_user, 12)))
+
+
+@scenario("list.notifications.first")
+def list_notifications_first(ctx):
+    ctx.service.list_notifications()
+
+
+@scenario("list.notifications.deep")
+def list_notifications_deep(ctx):
+    ctx.service.list_notifications(cursor=ctx.deep(ctx.max_notification))
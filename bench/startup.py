@@ -0,0 +1,123 @@
+# bench/startup.py
+#
+# Cold-start budget check: how long `python main.py` takes to show the first
+# menu, plus an -X importtime breakdown of what `import main` loads.
+#
+# Usage:
+#   python -m bench.startup --runs 10
+#   python -m bench.startup --budget-ms 300 --top 15
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median time-to-first-menu allowed before the check fails
+FIRST_MENU_BUDGET_MS = 150
+
+# UI libraries that must only load when a screen needs them
+DEFERRED_MODULES = ("questionary", "prompt_toolkit", "tabulate")
+
+PROMPT = b"Choice: "
+
+
+# ========================== TIME TO FIRST MENU ==========================
+
+# Start the app, wait for the guest menu prompt, then choose Exit
+def first_menu_ms(workdir):
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py")],
+        cwd=workdir,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    output = b""
+    while PROMPT not in output:
+        chunk = os.read(proc.stdout.fileno(), 4096)
+        if not chunk:
+            proc.wait()
+            raise RuntimeError(f"main.py exited before the first menu:\n{output.decode(errors='replace')}")
+        output += chunk
+    elapsed = (time.perf_counter() - started) * 1000
+
+    proc.communicate(b"2\n", timeout=30)
+    return elapsed
+
+
+# ========================== IMPORT PROFILE ==========================
+
+# (module, self_us, cumulative_us, depth) for every import made by `import main`
+def import_profile():
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:   449 |   43951 |   models" (two spaces per nesting level)
+        head, cumulative_us, name = line.split("|")
+        self_us = int(head.split(":")[1])
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), self_us, int(cumulative_us), depth))
+    return rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description="Startup time budget check")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=FIRST_MENU_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports to list")
+    args = parser.parse_args(argv)
+
+    print("--- 🚀 STARTUP ---")
+    failed = False
+
+    profile = import_profile()
+    total_us = next(cum for name, _, cum, depth in profile if name == "main" and depth == 0)
+    print(f"  import main: {total_us / 1000:.1f} ms")
+    for name, self_us, cumulative_us, depth in sorted(profile, key=lambda r: r[2], reverse=True)[1:args.top + 1]:
+        print(f"    {cumulative_us / 1000:>8.1f} ms  {'  ' * (depth - 1)}{name}")
+
+    loaded = {name.split(".")[0] for name, *_ in profile}
+    eager = [m for m in DEFERRED_MODULES if m in loaded]
+    if eager:
+        print(f"❌ Imported at startup but should be deferred: {', '.join(eager)}")
+        failed = True
+
+    # Private copy of the database; the first (untimed) run brings its schema
+    # up to date so the timed runs measure the normal already-current path
+    workdir = tempfile.mkdtemp(prefix="libtrack-startup-")
+    try:
+        shutil.copy(os.path.join(ROOT, "test.db"), workdir)
+        first_menu_ms(workdir)
+        samples = sorted(first_menu_ms(workdir) for _ in range(args.runs))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    median = statistics.median(samples)
+    print(f"  first menu: median {median:.1f} ms, min {samples[0]:.1f} ms, max {samples[-1]:.1f} ms "
+          f"({args.runs} runs, budget {args.budget_ms:g} ms)")
+
+    if median > args.budget_ms:
+        print(f"❌ Time to first menu is over budget by {median - args.budget_ms:.1f} ms.")
+        failed = True
+    if failed:
+        return 1
+    print("✅ Startup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
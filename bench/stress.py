@@ -0,0 +1,155 @@
+# bench/stress.py
+#
+# Several desks (processes) working on one database file at the same time.
+#
+# Usage:
+#   python -m bench.stress --desks 1,2,4,8 --seconds 5
+#   python -m bench.stress --desks 1,4 --journal delete   # old rollback-journal behaviour
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import time
+
+from bench.datagen import SCALES, ensure_dataset
+from db import BUSY_TIMEOUT_MS, Database, is_locked_error
+from services import BusyError, LibraryError, LibraryService
+
+# Share of operations that write (issue + return); the rest are kiosk reads
+DEFAULT_WRITE_RATIO = 0.3
+
+
+# ========================== WORKER ==========================
+
+def _open(path, journal):
+    if journal == "wal":
+        return Database(path).connection()
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def desk(path, journal, seconds, write_ratio, seed, start_at, results):
+    conn = _open(path, journal)
+    service = LibraryService(conn)
+    rng = random.Random(seed)
+
+    max_user = conn.execute("SELECT MAX(user_id) FROM users").fetchone()[0]
+    in_stock = [r[0] for r in conn.execute("SELECT book_id FROM books WHERE available_copies > 0 LIMIT 500")]
+    words = ["ka", "mi", "ten", "vor", "del", "mar"]
+
+    counts = {"reads": 0, "writes": 0, "busy": 0, "conflicts": 0, "errors": 0}
+    latencies = []
+
+    # All desks start together
+    time.sleep(max(0.0, start_at - time.time()))
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                loan = service.issue(rng.choice(in_stock), rng.randint(2, max_user))
+                service.return_loan(loan.loan_id)
+                counts["writes"] += 1
+            else:
+                op = rng.randrange(3)
+                if op == 0:
+                    service.search(rng.choice(words))
+                elif op == 1:
+                    service.list_loans(cursor=rng.randint(0, 1000), active_only=True)
+                else:
+                    service.unread_count()
+                counts["reads"] += 1
+        except BusyError:
+            counts["busy"] += 1
+        except LibraryError:
+            counts["conflicts"] += 1
+        except sqlite3.OperationalError as e:
+            if conn.in_transaction:
+                conn.rollback()
+            counts["busy" if is_locked_error(e) else "errors"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    conn.close()
+    latencies.sort()
+    counts["p95_ms"] = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    results.put(counts)
+
+
+# ========================== DRIVER ==========================
+
+# Fresh copy of the dataset so every round starts from the same state
+def _prepare(source, target, journal):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    src.backup(dst)
+    src.close()
+    dst.execute(f"PRAGMA journal_mode = {'WAL' if journal == 'wal' else 'DELETE'}")
+    dst.close()
+
+
+def run_round(path, journal, desks, seconds, write_ratio):
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    procs = [
+        multiprocessing.Process(
+            target=desk, args=(path, journal, seconds, write_ratio, 1000 + i, start_at, results)
+        )
+        for i in range(desks)
+    ]
+    for p in procs:
+        p.start()
+    per_desk = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    total = {key: sum(c[key] for c in per_desk) for key in ("reads", "writes", "busy", "conflicts", "errors")}
+    total["p95_ms"] = max(c["p95_ms"] for c in per_desk)
+    return total
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python -m bench.stress", description="Multi-desk stress test")
+    parser.add_argument("--desks", default="1,2,4,8", help="comma-separated desk counts")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="tiny")
+    parser.add_argument("--write-ratio", type=float, default=DEFAULT_WRITE_RATIO)
+    parser.add_argument("--journal", choices=("wal", "delete"), default="wal")
+    args = parser.parse_args(argv)
+
+    books, users, loans = SCALES[args.scale]
+    source = f"bench/{args.scale}.db"
+    ensure_dataset(source, books, users, loans)
+    path = f"bench/stress-{args.scale}.db"
+
+    print(f"--- 🏋️  STRESS TEST ({args.journal} journal, {args.seconds:g}s per round, "
+          f"{args.write_ratio:.0%} writes) ---")
+    print(f"  {'desks':>5} {'ops/s':>10} {'reads/s':>10} {'writes/s':>10} {'busy':>6} {'errors':>6} {'p95 ms':>9} {'scaling':>8}")
+
+    baseline = None
+    for desks in [int(d) for d in args.desks.split(",")]:
+        _prepare(source, path, args.journal)
+        total = run_round(path, args.journal, desks, args.seconds, args.write_ratio)
+
+        ops = (total["reads"] + total["writes"]) / args.seconds
+        baseline = baseline or ops
+        print(
+            f"  {desks:>5} {ops:>10,.0f} {total['reads'] / args.seconds:>10,.0f} "
+            f"{total['writes'] / args.seconds:>10,.0f} {total['busy']:>6} {total['errors']:>6} "
+            f"{total['p95_ms']:>9.1f} {ops / baseline:>7.2f}x"
+        )
+
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,127 @@
+# db.py
+import os
+import pathlib
+import random
+import sqlite3
+import threading
+import time
+
+import sqlstats
+
+DEFAULT_DB = "test.db"
+
+# How long SQLite itself waits on a locked database before giving up
+BUSY_TIMEOUT_MS = 5000
+
+# Extra attempts (with backoff) after the busy timeout has expired
+RETRY_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 2.0
+
+# Prepared statements kept per connection; room for every entry in
+# queries.QUERIES plus the few ad-hoc statements (PRAGMAs, migrations)
+STATEMENT_CACHE_SIZE = 256
+
+# Rows pulled per fetchmany call by stream_rows
+STREAM_CHUNK = 1000
+
+
+# ========================== CONNECTIONS ==========================
+
+# Open a connection configured for several desks sharing one file:
+# WAL lets readers run alongside the single writer, synchronous=NORMAL is
+# durable against application crashes in WAL mode, busy_timeout makes
+# SQLite wait for the write lock instead of failing at once.
+# With LIBTRACK_SQL_STATS set, every statement is timed (see sqlstats.py).
+# readonly=True opens the file with mode=ro for reader pools: the connection
+# can never take the write lock, and may be handed between threads (one at
+# a time). The file must already exist and be in WAL mode.
+def connect(path=DEFAULT_DB, readonly=False):
+    factory = sqlstats.InstrumentedConnection if sqlstats.enabled() else sqlite3.Connection
+    if readonly:
+        conn = sqlite3.connect(
+            pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False,
+            timeout=BUSY_TIMEOUT_MS / 1000, factory=factory, cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA query_only = ON")
+    else:
+        conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_MS / 1000, factory=factory, cached_statements=STATEMENT_CACHE_SIZE
+        )
+    conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_MS)}")
+    if path != ":memory:" and not readonly:
+        # Persistent: stored in the file, later connections inherit it
+        retry_locked(lambda: conn.execute("PRAGMA journal_mode = WAL"))
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+class Database:
+    # Hands out one connection per thread and per process.
+    # sqlite3 connections must not cross threads, and a connection inherited
+    # through fork() shares lock state with the parent, so both get a fresh one.
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = connect(self.path)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # Close this thread's connection (others are closed by their own thread)
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+
+# ========================== LOCK RETRIES ==========================
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
+
+
+# Call fn(), retrying with jittered exponential backoff while the database
+# stays locked. Re-raises the last error once the attempts run out.
+def retry_locked(fn, attempts=RETRY_ATTEMPTS, base_delay=RETRY_BASE_DELAY):
+    for attempt in range(attempts + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == attempts:
+                raise
+            delay = min(RETRY_MAX_DELAY, base_delay * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+# Take the write lock up front. A deferred transaction that reads first can
+# fail with SQLITE_BUSY when it later upgrades to write (the busy handler is
+# not used for that case); BEGIN IMMEDIATE waits in one place and is safe
+# to retry because nothing has run yet.
+def begin_immediate(conn):
+    retry_locked(lambda: conn.execute("BEGIN IMMEDIATE"))
+
+
+# ========================== STREAMING ==========================
+
+# Yield the rows of one SELECT in fetchmany chunks, so memory does not grow
+# with the result. One statement, so the rows are a single snapshot, held
+# until the generator finishes or is closed (closing also closes the cursor).
+def stream_rows(conn, sql, params=(), chunk_size=STREAM_CHUNK):
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
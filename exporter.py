@@ -0,0 +1,205 @@
+# exporter.py
+#
+# Streams books, users or loans to a file without loading the table into memory.
+#   python exporter.py loans loans-2025.csv.gz --since 2025-01-01 --until 2025-12-31
+#   python exporter.py users borrowers.jsonl --active
+import argparse
+import csv
+import gzip
+import json
+import sqlite3
+import sys
+import time
+
+from archiver import loan_history
+from db import DEFAULT_DB, Database, stream_rows
+from migrations import ACTIVE_LOAN, apply_migrations
+from utils import from_day, to_day
+
+# Rows pulled from SQLite per fetchmany call (large: exports read everything)
+CHUNK_SIZE = 5000
+
+# Rows between progress updates
+PROGRESS_EVERY = 50000
+
+FORMATS = ("csv", "jsonl")
+
+# gzip's default (9) costs several times the CPU for a few percent smaller files
+GZIP_LEVEL = 6
+
+
+# ========================== QUERIES ==========================
+
+# Each builder returns (columns, sql, params, converters). Rows come out in
+# primary-key order, so SQLite walks the table instead of sorting it.
+# `source` is the loans table or the archive's loan_history view.
+
+def _books_query(active_only, since, until, source):
+    where = "WHERE b.total_copies > b.available_copies" if active_only else ""
+    sql = f"""
+        SELECT b.book_id, b.title, b.author, b.total_copies, b.available_copies
+        FROM books b {where}
+        ORDER BY b.book_id
+    """
+    return ["book_id", "title", "author", "total_copies", "available_copies"], sql, (), {}
+
+
+def _users_query(active_only, since, until, source):
+    # Passwords are never exported
+    where = "WHERE u.user_id IN (SELECT user_id FROM stats_user WHERE active > 0)" if active_only else ""
+    sql = f"""
+        SELECT u.user_id, u.name, u.username, u.phone, u.role, u.fines_outstanding
+        FROM users u {where}
+        ORDER BY u.user_id
+    """
+    return ["user_id", "name", "username", "phone", "role", "fines_outstanding"], sql, (), {}
+
+
+def _loans_query(active_only, since, until, source):
+    conditions, params = [], []
+    if active_only:
+        conditions.append(ACTIVE_LOAN)
+    if since is not None:
+        conditions.append("l.issue_date >= ?")
+        params.append(since)
+    if until is not None:
+        conditions.append("l.issue_date <= ?")
+        params.append(until)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    sql = f"""
+        SELECT l.loan_id, l.book_id, b.title, l.user_id, u.username,
+               l.issue_date, l.due_date, l.return_date
+        FROM {source} l
+        LEFT JOIN books b ON b.book_id = l.book_id
+        LEFT JOIN users u ON u.user_id = l.user_id
+        {where}
+        ORDER BY l.loan_id
+    """
+    columns = ["loan_id", "book_id", "title", "user_id", "username", "issue_date", "due_date", "return_date"]
+    # Day numbers -> "YYYY-MM-DD"
+    converters = {5: from_day, 6: from_day, 7: from_day}
+    return columns, sql, params, converters
+
+
+EXPORTS = {
+    "books": _books_query,
+    "users": _users_query,
+    "loans": _loans_query,
+}
+
+
+# ========================== STREAMING ==========================
+
+# "csv"/"jsonl" from the file name; a trailing .gz means compress
+def detect_format(path):
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    for fmt in FORMATS:
+        if name.endswith("." + fmt):
+            return fmt, compressed
+    raise ValueError(f"Cannot tell the format of '{path}'. Use .csv, .jsonl, .csv.gz or .jsonl.gz")
+
+
+def _open_output(path, compressed):
+    if compressed:
+        return gzip.open(path, "wt", compresslevel=GZIP_LEVEL, newline="", encoding="utf-8")
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+# Write one query result to a file; returns a stats dict
+def export_table(conn, kind, path, fmt=None, active_only=False, since=None, until=None,
+                 source="loans", chunk_size=CHUNK_SIZE, quiet=False):
+    compressed = path.lower().endswith(".gz")
+    if fmt is None:
+        fmt, compressed = detect_format(path)
+
+    columns, sql, params, converters = EXPORTS[kind](active_only, since, until, source)
+    written = 0
+    started = time.perf_counter()
+
+    with _open_output(path, compressed) as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            write = writer.writerow
+        else:
+            write = lambda row: f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n")
+
+        for row in stream_rows(conn, sql, params, chunk_size):
+            if converters:
+                row = list(row)
+                for i, convert in converters.items():
+                    row[i] = convert(row[i])
+            write(row)
+            written += 1
+
+            if not quiet and written % PROGRESS_EVERY == 0:
+                elapsed = time.perf_counter() - started
+                print(f"\r  {written:,} rows written ({written / elapsed:,.0f} rows/s)", end="")
+
+    elapsed = time.perf_counter() - started
+    if not quiet and written >= PROGRESS_EVERY:
+        print()
+
+    return {"written": written, "seconds": elapsed, "format": fmt, "compressed": compressed}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Export LibTrack data to CSV or JSONL (optionally gzipped)")
+    parser.add_argument("kind", choices=sorted(EXPORTS))
+    parser.add_argument("path", help="output file: .csv, .jsonl, .csv.gz or .jsonl.gz")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--format", choices=FORMATS, help="override the format implied by the file name")
+    parser.add_argument("--active", action="store_true",
+                        help="loans still out / books with copies out / users with books out")
+    parser.add_argument("--since", help="loans issued on or after YYYY-MM-DD")
+    parser.add_argument("--until", help="loans issued on or before YYYY-MM-DD")
+    parser.add_argument("--history", action="store_true", help="include loans moved to the archive database")
+    args = parser.parse_args(argv)
+
+    if (args.since or args.until or args.history) and args.kind != "loans":
+        print("❌ Error: --since/--until/--history only apply to loans.")
+        return 1
+    try:
+        since = to_day(args.since) if args.since else None
+        until = to_day(args.until) if args.until else None
+        if args.format is None:
+            detect_format(args.path)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    db = Database(args.db)
+    print(f"--- 📤 EXPORTING {args.kind.upper()} to {args.path} ---")
+
+    try:
+        conn = db.connection()
+        apply_migrations(conn)
+        if args.history:
+            with loan_history(conn, args.db) as source:
+                stats = export_table(conn, args.kind, args.path, fmt=args.format,
+                                     active_only=args.active, since=since, until=until, source=source)
+        else:
+            stats = export_table(conn, args.kind, args.path, fmt=args.format,
+                                 active_only=args.active, since=since, until=until)
+    except OSError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    except sqlite3.Error as e:
+        # e.g. a locked or corrupt database
+        print(f"❌ Database Error: {e}")
+        return 1
+    finally:
+        db.close()
+
+    rate = stats["written"] / stats["seconds"] if stats["seconds"] else 0
+    print("-" * 30)
+    print(f"✅ Exported {stats['written']:,} rows in {stats['seconds']:.2f}s ({rate:,.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
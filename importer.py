@@ -0,0 +1,277 @@
+# importer.py
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from itertools import islice
+
+from db import begin_immediate
+from models import LibraryManager
+from utils import validate_phone_format, validate_username_format
+
+# Rows validated and written per transaction
+CHUNK_SIZE = 5000
+
+BOOK_FIELDS = ["title", "author", "copies"]
+USER_FIELDS = ["name", "username", "phone", "password", "role"]
+
+
+# ========================== READERS ==========================
+
+# Yield dict rows from a .csv or .jsonl file without loading it whole
+def read_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+
+    # utf-8-sig: spreadsheet exports start with a BOM that would otherwise
+    # become part of the first header ("\ufefftitle")
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            for row in csv.DictReader(f):
+                yield row
+        elif ext in (".jsonl", ".ndjson"):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    yield {"_raw": line, "_error": "Invalid JSON"}
+                    continue
+                yield row if isinstance(row, dict) else {"_raw": line, "_error": "Not an object"}
+        else:
+            raise ValueError(f"Unsupported file type '{ext}'. Use .csv or .jsonl")
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ========================== VALIDATION ==========================
+
+def _text(row, key):
+    value = row.get(key)
+    return str(value).strip() if value is not None else ""
+
+
+# Returns (values tuple, None) or (None, reason)
+def validate_book(row):
+    if "_error" in row:
+        return None, row["_error"]
+
+    title = _text(row, "title")
+    author = _text(row, "author")
+    if not title or not author:
+        return None, "Title and author are required."
+
+    copies = _text(row, "copies") or "1"
+    try:
+        copies = int(copies)
+    except ValueError:
+        return None, "Copies must be a number."
+    if copies < 0:
+        return None, "Copies cannot be negative."
+
+    return (title, author, copies, copies), None
+
+
+def validate_user(row):
+    if "_error" in row:
+        return None, row["_error"]
+
+    name = _text(row, "name")
+    username = _text(row, "username").lower()
+    phone = _text(row, "phone")
+    password = _text(row, "password")
+    role = _text(row, "role").lower() or "student"
+
+    if not name or not password:
+        return None, "Name and password are required."
+
+    result = validate_username_format(username)
+    if result is not True:
+        return None, result
+
+    result = validate_phone_format(phone)
+    if result is not True:
+        return None, result
+
+    if role not in ("student", "admin"):
+        return None, f"Invalid role '{role}'."
+
+    return (name, username, phone, password, role), None
+
+
+# ========================== REJECT LOG ==========================
+
+class RejectWriter:
+    # Side file next to the input: <name>.rejects.csv, opened on first reject
+    def __init__(self, source_path, fields):
+        self.path = os.path.splitext(source_path)[0] + ".rejects.csv"
+        self.fields = fields + ["reason"]
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, row, reason):
+        if self._writer is None:
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction="ignore")
+            self._writer.writeheader()
+        record = dict(row)
+        if "_raw" in record:
+            record[self.fields[0]] = record["_raw"]
+        record["reason"] = reason
+        self._writer.writerow(record)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+# ========================== IMPORT JOBS ==========================
+
+def _insert_books(cursor, batch, rejects):
+    values = []
+    for row in batch:
+        book, reason = validate_book(row)
+        if reason:
+            rejects.write(row, reason)
+        else:
+            values.append(book)
+
+    # The FTS insert trigger stays on: dropping it is a schema change that
+    # makes every other connection re-prepare its statements, and an
+    # unindexed row breaks the external-content index on its next edit
+    cursor.executemany(
+        "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)",
+        values,
+    )
+    return len(values)
+
+
+def _insert_users(cursor, batch, rejects):
+    values = []
+    seen = set()
+    for row in batch:
+        user, reason = validate_user(row)
+        if not reason and user[1] in seen:
+            reason = "Duplicate username in file."
+        if reason:
+            rejects.write(row, reason)
+        else:
+            seen.add(user[1])
+            values.append((row, user))
+
+    # One lookup per chunk for usernames that already exist; the list is
+    # bound as a single JSON array, so chunk size never meets the variable limit
+    taken = set()
+    if values:
+        taken = {
+            r[0] for r in cursor.execute(
+                "SELECT username FROM users WHERE username IN (SELECT value FROM json_each(?))",
+                (json.dumps([user[1] for _, user in values]),),
+            )
+        }
+
+    fresh = []
+    for row, user in values:
+        if user[1] in taken:
+            rejects.write(row, "Username already exists.")
+        else:
+            fresh.append(user)
+
+    cursor.executemany(
+        "INSERT INTO users (name, username, phone, password, role) VALUES (?, ?, ?, ?, ?)",
+        fresh,
+    )
+    return len(fresh)
+
+
+IMPORTERS = {
+    "books": (_insert_books, BOOK_FIELDS),
+    "users": (_insert_users, USER_FIELDS),
+}
+
+
+# Stream a file into the database, one transaction per chunk
+def import_file(conn, kind, path, chunk_size=CHUNK_SIZE, quiet=False):
+    insert_chunk, fields = IMPORTERS[kind]
+    rejects = RejectWriter(path, fields)
+    cursor = conn.cursor()
+
+    read = 0
+    imported = 0
+    started = time.perf_counter()
+
+    try:
+        for batch in chunks(read_rows(path), chunk_size):
+            try:
+                begin_immediate(conn)
+                imported += insert_chunk(cursor, batch, rejects)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            read += len(batch)
+
+            if not quiet:
+                elapsed = time.perf_counter() - started
+                print(f"\r  {read:,} rows read, {imported:,} imported ({read / elapsed:,.0f} rows/s)", end="")
+    finally:
+        rejects.close()
+
+    elapsed = time.perf_counter() - started
+    if not quiet:
+        print()
+
+    return {
+        "read": read,
+        "imported": imported,
+        "rejected": rejects.count,
+        "rejects_path": rejects.path if rejects.count else None,
+        "seconds": elapsed,
+    }
+
+
+def main(argv):
+    if len(argv) != 3 or argv[1] not in IMPORTERS:
+        print("Usage: python importer.py <books|users> <file.csv|file.jsonl>")
+        print("  books columns: title, author, copies")
+        print("  users columns: name, username, phone, password[, role]")
+        return 1
+
+    kind, path = argv[1], argv[2]
+    db = LibraryManager()
+    print(f"--- 📦 IMPORTING {kind.upper()} from {path} ---")
+
+    try:
+        stats = import_file(db.conn, kind, path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error: {e}")
+        return 1
+    except sqlite3.Error as e:
+        # e.g. a desk held the write lock past every retry
+        print(f"❌ Database Error: {e}")
+        return 1
+    finally:
+        db.conn.close()
+
+    rate = stats["read"] / stats["seconds"] if stats["seconds"] else 0
+    print("-" * 30)
+    print(f"✅ Imported {stats['imported']:,} of {stats['read']:,} rows in {stats['seconds']:.2f}s ({rate:,.0f} rows/s)")
+    if stats["rejected"]:
+        print(f"⚠️  {stats['rejected']:,} rejected rows written to {stats['rejects_path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
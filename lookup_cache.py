@@ -0,0 +1,81 @@
+# lookup_cache.py
+#
+# Read-through LRU cache for rows that are read far more often than they
+# change: book and user rows and the search label lists.
+#
+# Entries belong to one connection and one database state. Before every
+# lookup the cache compares PRAGMA data_version (bumped when any other
+# connection or process commits) and the connection's own total_changes
+# (bumped by its own writes); if either moved, everything is dropped.
+# Nothing is cached inside an open transaction, whose reads may still be
+# rolled back.
+from collections import OrderedDict
+
+# Entries kept per connection (a label list counts as one entry)
+LOOKUP_CACHE_SIZE = 1024
+
+
+class LookupCache:
+
+    def __init__(self, conn, maxsize=LOOKUP_CACHE_SIZE):
+        self.conn = conn
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._version = None
+        # Reused for every poll: cheaper than a new cursor per lookup
+        self._version_cursor = conn.cursor()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _current_version(self):
+        return self._version_cursor.execute("PRAGMA data_version").fetchone()[0], self.conn.total_changes
+
+    # Cached value for key, or loader()'s result (cached unless it is None)
+    def get(self, key, loader):
+        if self.maxsize <= 0 or self.conn.in_transaction:
+            self.misses += 1
+            return loader()
+
+        version = self._current_version()
+        if version != self._version:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._version = version
+
+        try:
+            value = self._entries[key]
+        except KeyError:
+            pass
+        else:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self._entries[key] = value
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+    # Counters for sizing: a low hit ratio with many evictions means too small
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -1,5 +1,6 @@
 import sys
 from models import LibraryManager
+import sqlstats
 import views
 from utils import clear_screen, get_valid_choice
 
@@ -18,21 +19,21 @@ def main(app):
             choice = get_valid_choice("Choice: ", ["1", "2"])
 
             if choice == "1":
-                app.login()
+                if app.login() and app.current_user_role == "admin":
+                    # Self-heal the badge counter once per admin session
+                    app.check_unread_counter()
+                    # Only admin sessions run the jobs; student sessions just
+                    # read what they (or scheduler.py) precomputed
+                    app.start_scheduler()
             elif choice == "2":
                 break
 
         # --- ADMIN MENU ---
         elif app.current_user_role == "admin":
 
-            # Trigger daily checks
-            app.generate_daily_alerts()
+            # Alerts are precomputed by the scheduler thread; just read the badge
+            unread_count = app.get_unread_count()
 
-            # Get notification badge
-            unread_count = app.cursor.execute(
-                "SELECT COUNT(*) FROM notifications WHERE status='unread'"
-            ).fetchone()[0]
-            
             badge = f"({unread_count} NEW)" if unread_count > 0 else ""
 
             print(f"\n=== 🛡️  ADMIN MENU ({app.current_user_name}) {badge} ===")
@@ -41,6 +42,7 @@ def main(app):
             print("3. 🛠️  Manage Loans (Issue/Return/View-All)")
             print(f"4. 🔔 Notifications {badge}")
             print("5. 🔍 Smart Search")
+            print("6. 📊 Statistics")
             print("0. 🔓 Logout")
 
             choice = input("\nChoice: ").strip()
@@ -55,6 +57,8 @@ def main(app):
                 app.view_notifications()
             elif choice == "5":
                 views.show_smart_search(app)
+            elif choice == "6":
+                app.show_statistics()
             elif choice == "0":
                 app.logout()
 
@@ -66,6 +70,7 @@ def main(app):
             print("3. 🎒 My Borrowed Books")
             print("4. ✨ Newly Arrived Books")
             print("5. 🔐 Change Password")
+            print("6. 📌 My Holds")
             print("0. 🔓 Logout")
 
             choice = input("\nChoice: ").strip()
@@ -80,13 +85,15 @@ def main(app):
                 app.list_new_arrivals()
             elif choice == "5": 
                 app.change_own_password(app.current_user_id)
+            elif choice == "6":
+                app.view_my_holds()
             elif choice == "0":
                 app.logout()
 
 
 if __name__ == "__main__":
     app = LibraryManager()
-    
+
     try:
         main(app)
 
@@ -95,6 +102,9 @@ if __name__ == "__main__":
 
     finally:
         if 'app' in locals():
+            app.stop_scheduler()
+            if sqlstats.enabled():
+                sqlstats.print_report()
             print("🔒 Closing database connection...")
             app.conn.close()
             print("👋 Goodbye!")
\ No newline at end of file
@@ -0,0 +1,662 @@
+# migrations.py
+import sqlite3
+
+from db import begin_immediate
+from utils import FINE_PER_DAY
+
+# Active-loan predicate. Partial indexes are only picked by SQLite when the
+# query repeats this exact expression, so every query must use it verbatim.
+ACTIVE_LOAN = "return_date IS NULL"
+
+# Before version 8 dates were TEXT and '' also meant "not returned".
+# Steps 1-7 are frozen against that schema.
+_TEXT_ACTIVE_LOAN = "(return_date = '' OR return_date IS NULL)"
+
+
+# ========================== SCHEMA STEPS ==========================
+
+# Version 1: original tables (no-op on databases created before migrations)
+def _base_schema(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS books (
+            book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            total_copies INTEGER DEFAULT 1,
+            available_copies INTEGER DEFAULT 1
+        )"""
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            username TEXT UNIQUE NOT NULL,
+            phone TEXT NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL
+        )"""
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS loans (
+            loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            issue_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (book_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )"""
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id INTEGER NOT NULL,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            status TEXT DEFAULT 'unread',
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (loan_id) REFERENCES loans (loan_id)
+        )"""
+    )
+
+
+# Version 2: indexes for loan history, active-loan checks and alert lookups
+def _loan_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_book ON loans (book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_loans_user ON loans (user_id)")
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_loans_active_book ON loans (book_id) WHERE {_TEXT_ACTIVE_LOAN}"
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_loans_active_user ON loans (user_id) WHERE {_TEXT_ACTIVE_LOAN}"
+    )
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_loans_active_due ON loans (due_date) WHERE {_TEXT_ACTIVE_LOAN}"
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notifications_loan ON notifications (loan_id, type, status)"
+    )
+
+
+# Version 3: one open alert per (loan, type) and a key/value table for job state
+def _alert_dedupe(cursor):
+    # Resolve duplicate open alerts left by older versions, keeping the oldest
+    cursor.execute(
+        """
+        UPDATE notifications SET status = 'resolved'
+        WHERE status != 'resolved'
+          AND id NOT IN (
+            SELECT MIN(id) FROM notifications
+            WHERE status != 'resolved'
+            GROUP BY loan_id, type
+          )"""
+    )
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_notifications_open
+        ON notifications (loan_id, type) WHERE status != 'resolved'"""
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS app_state (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        )"""
+    )
+
+
+# Version 4: unread-notification counter kept current by triggers
+def _unread_counter(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO counters (name, value)
+        SELECT 'unread_notifications', COUNT(*) FROM notifications WHERE status = 'unread'"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_insert
+        AFTER INSERT ON notifications WHEN NEW.status = 'unread'
+        BEGIN
+            UPDATE counters SET value = value + 1 WHERE name = 'unread_notifications';
+        END"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_update
+        AFTER UPDATE OF status ON notifications
+        WHEN (OLD.status IS 'unread') != (NEW.status IS 'unread')
+        BEGIN
+            UPDATE counters
+            SET value = value + (NEW.status IS 'unread') - (OLD.status IS 'unread')
+            WHERE name = 'unread_notifications';
+        END"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_notifications_unread_delete
+        AFTER DELETE ON notifications WHEN OLD.status = 'unread'
+        BEGIN
+            UPDATE counters SET value = value - 1 WHERE name = 'unread_notifications';
+        END"""
+    )
+
+
+# Version 5: FTS5 catalog index over books, kept in sync by triggers
+
+# Kept as a constant so bulk loaders can drop it and index a whole batch at once
+BOOKS_FTS_INSERT_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_books_fts_insert AFTER INSERT ON books
+    BEGIN
+        INSERT INTO books_fts (rowid, title, author)
+        VALUES (NEW.book_id, NEW.title, NEW.author);
+    END"""
+
+
+def _catalog_fts(cursor):
+    cursor.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5 (
+            title, author,
+            content = 'books', content_rowid = 'book_id',
+            prefix = '2 3'
+        )"""
+    )
+    cursor.execute(BOOKS_FTS_INSERT_TRIGGER)
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_fts_delete AFTER DELETE ON books
+        BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author)
+            VALUES ('delete', OLD.book_id, OLD.title, OLD.author);
+        END"""
+    )
+    # Stock changes on issue/return do not touch the text index
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_fts_update AFTER UPDATE OF title, author ON books
+        BEGIN
+            INSERT INTO books_fts (books_fts, rowid, title, author)
+            VALUES ('delete', OLD.book_id, OLD.title, OLD.author);
+            INSERT INTO books_fts (rowid, title, author)
+            VALUES (NEW.book_id, NEW.title, NEW.author);
+        END"""
+    )
+    rebuild_catalog_fts(cursor)
+
+
+# Version 6: stock can never go negative
+def _stock_check(cursor):
+    cursor.execute("UPDATE books SET available_copies = 0 WHERE available_copies < 0")
+    cursor.execute("UPDATE books SET total_copies = 0 WHERE total_copies < 0")
+
+    # SQLite cannot add a CHECK to an existing table, so the table is rebuilt
+    # (foreign keys are off during migrations; rows and IDs are unchanged)
+    triggers = [
+        row[0] for row in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'books'"
+        )
+    ]
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'books'").fetchone()
+
+    cursor.execute(
+        """
+        CREATE TABLE books_new (
+            book_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            author TEXT NOT NULL,
+            total_copies INTEGER DEFAULT 1 CHECK (total_copies >= 0),
+            available_copies INTEGER DEFAULT 1 CHECK (available_copies >= 0)
+        )"""
+    )
+    cursor.execute(
+        """
+        INSERT INTO books_new (book_id, title, author, total_copies, available_copies)
+        SELECT book_id, title, author, total_copies, available_copies FROM books
+        """
+    )
+    cursor.execute("DROP TABLE books")
+    cursor.execute("ALTER TABLE books_new RENAME TO books")
+
+    # Keep AUTOINCREMENT from reusing IDs of deleted books
+    if seq:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'books'", (seq[0],)
+        )
+    for sql in triggers:
+        cursor.execute(sql)
+
+
+# Version 7: fines ledger (one row per late loan) and per-user balances
+def _fines_ledger(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fines (
+            fine_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id INTEGER NOT NULL UNIQUE,
+            user_id INTEGER NOT NULL,
+            days_overdue INTEGER NOT NULL,
+            amount REAL NOT NULL CHECK (amount >= 0),
+            updated_at TEXT NOT NULL,
+            FOREIGN KEY (loan_id) REFERENCES loans (loan_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fines_user ON fines (user_id)")
+
+    # Outstanding balance kept on the user row, so "does this student owe
+    # money" is a primary-key lookup
+    cursor.execute("ALTER TABLE users ADD COLUMN fines_outstanding REAL NOT NULL DEFAULT 0")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_owing ON users (fines_outstanding) WHERE fines_outstanding > 0"
+    )
+
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fines_balance_insert AFTER INSERT ON fines
+        BEGIN
+            UPDATE users SET fines_outstanding = fines_outstanding + NEW.amount
+            WHERE user_id = NEW.user_id;
+        END"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fines_balance_update AFTER UPDATE OF amount ON fines
+        WHEN NEW.amount != OLD.amount
+        BEGIN
+            UPDATE users SET fines_outstanding = fines_outstanding + NEW.amount - OLD.amount
+            WHERE user_id = NEW.user_id;
+        END"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_fines_balance_delete AFTER DELETE ON fines
+        BEGIN
+            UPDATE users SET fines_outstanding = fines_outstanding - OLD.amount
+            WHERE user_id = OLD.user_id;
+        END"""
+    )
+
+    # Backfill open overdue loans only, as of today. Loans returned before
+    # the ledger existed are settled history: charging them now would put
+    # old late returns on balances with no way to pay them off.
+    cursor.execute(
+        f"""
+        INSERT INTO fines (loan_id, user_id, days_overdue, amount, updated_at)
+        SELECT loan_id, user_id, days, days * {FINE_PER_DAY}, date('now', 'localtime')
+        FROM (
+            SELECT loan_id, user_id,
+                   CAST(julianday(date('now', 'localtime')) - julianday(due_date) AS INTEGER) AS days
+            FROM loans
+            WHERE {_TEXT_ACTIVE_LOAN}
+        )
+        WHERE days > 0
+        """
+    )
+
+
+# Version 8: loan dates as integer day numbers, NULL return_date = active
+def _loan_day_numbers(cursor):
+    # "YYYY-MM-DD" -> days since 1970-01-01 (NULL if unparseable)
+    def day(column):
+        return f"CAST(julianday(NULLIF({column}, '')) - 2440587.5 AS INTEGER)"
+
+    triggers = [
+        row[0] for row in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'loans'"
+        )
+    ]
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'loans'").fetchone()
+
+    cursor.execute(
+        """
+        CREATE TABLE loans_new (
+            loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            issue_date INTEGER NOT NULL,
+            due_date INTEGER NOT NULL,
+            return_date INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (book_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )"""
+    )
+    # Hand-edited rows with a bad date fall back to the loan period
+    # around the other date rather than blocking the upgrade
+    cursor.execute(
+        f"""
+        INSERT INTO loans_new (loan_id, book_id, user_id, issue_date, due_date, return_date)
+        SELECT loan_id, book_id, user_id,
+               COALESCE({day('issue_date')}, {day('due_date')} - 14, {day("date('now', 'localtime')")}),
+               COALESCE({day('due_date')}, {day('issue_date')} + 14, {day("date('now', 'localtime')")}),
+               CASE WHEN {_TEXT_ACTIVE_LOAN} THEN NULL
+                    ELSE COALESCE({day('return_date')}, {day('due_date')}, {day('issue_date')}) END
+        FROM loans
+        """
+    )
+    cursor.execute("DROP TABLE loans")
+    cursor.execute("ALTER TABLE loans_new RENAME TO loans")
+    if seq:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'loans'", (seq[0],)
+        )
+
+    cursor.execute("CREATE INDEX idx_loans_book ON loans (book_id)")
+    cursor.execute("CREATE INDEX idx_loans_user ON loans (user_id)")
+    cursor.execute(f"CREATE INDEX idx_loans_active_book ON loans (book_id) WHERE {ACTIVE_LOAN}")
+    cursor.execute(f"CREATE INDEX idx_loans_active_user ON loans (user_id) WHERE {ACTIVE_LOAN}")
+    cursor.execute(f"CREATE INDEX idx_loans_active_due ON loans (due_date) WHERE {ACTIVE_LOAN}")
+    for sql in triggers:
+        cursor.execute(sql)
+
+
+# Version 9: circulation statistics kept current by triggers on loans
+
+# Statements adding (sign=+1) or removing (sign=-1) one loan row's share
+# of every summary table; `row` is NEW or OLD
+def _stats_delta(row, sign):
+    active = f"({row}.return_date IS NULL)"
+    # Drop emptied due days so the overdue range sum stays short
+    prune = f"\n            DELETE FROM stats_due WHERE due_date = {row}.due_date AND active = 0;" if sign < 0 else ""
+    return f"""
+            INSERT INTO stats_daily (day, issued, returned) VALUES ({row}.issue_date, {sign}, 0)
+            ON CONFLICT (day) DO UPDATE SET issued = issued + {sign};
+            INSERT INTO stats_daily (day, issued, returned)
+            SELECT {row}.return_date, 0, {sign} WHERE {row}.return_date IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET returned = returned + {sign};
+            INSERT INTO stats_book (book_id, loans, active) VALUES ({row}.book_id, {sign}, {sign} * {active})
+            ON CONFLICT (book_id) DO UPDATE SET loans = loans + {sign}, active = active + {sign} * {active};
+            INSERT INTO stats_user (user_id, loans, active) VALUES ({row}.user_id, {sign}, {sign} * {active})
+            ON CONFLICT (user_id) DO UPDATE SET loans = loans + {sign}, active = active + {sign} * {active};
+            INSERT INTO stats_due (due_date, active)
+            SELECT {row}.due_date, {sign} WHERE {active}
+            ON CONFLICT (due_date) DO UPDATE SET active = active + {sign};{prune}"""
+
+
+# Kept as a list so bulk loaders can drop them and rebuild the tables once
+CIRCULATION_STATS_TRIGGERS = [
+    ("trg_loans_stats_insert", f"""
+        CREATE TRIGGER IF NOT EXISTS trg_loans_stats_insert AFTER INSERT ON loans
+        BEGIN{_stats_delta("NEW", 1)}
+        END"""),
+    ("trg_loans_stats_delete", f"""
+        CREATE TRIGGER IF NOT EXISTS trg_loans_stats_delete AFTER DELETE ON loans
+        BEGIN{_stats_delta("OLD", -1)}
+        END"""),
+    ("trg_loans_stats_update", f"""
+        CREATE TRIGGER IF NOT EXISTS trg_loans_stats_update
+        AFTER UPDATE OF book_id, user_id, issue_date, due_date, return_date ON loans
+        BEGIN{_stats_delta("OLD", -1)}{_stats_delta("NEW", 1)}
+        END"""),
+]
+
+
+def _circulation_stats(cursor):
+    # Issues and returns per day (day numbers, like loans)
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats_daily (
+            day INTEGER PRIMARY KEY,
+            issued INTEGER NOT NULL DEFAULT 0,
+            returned INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats_book (
+            book_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_book_loans ON stats_book (loans)")
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats_user (
+            user_id INTEGER PRIMARY KEY,
+            loans INTEGER NOT NULL DEFAULT 0,
+            active INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_user_active ON stats_user (active)")
+    # Open loans per due day: overdue count is a short range sum, not a loans scan
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stats_due (
+            due_date INTEGER PRIMARY KEY,
+            active INTEGER NOT NULL DEFAULT 0
+        )"""
+    )
+
+    for _, sql in CIRCULATION_STATS_TRIGGERS:
+        cursor.execute(sql)
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_books_stats_delete AFTER DELETE ON books
+        BEGIN
+            DELETE FROM stats_book WHERE book_id = OLD.book_id;
+        END"""
+    )
+    cursor.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_users_stats_delete AFTER DELETE ON users
+        BEGIN
+            DELETE FROM stats_user WHERE user_id = OLD.user_id;
+        END"""
+    )
+    rebuild_circulation_stats(cursor)
+
+
+# Version 10: partial indexes for the last full scans found by
+# bench.query_plans (admin count, unread badge and mark-all-read)
+def _hot_path_indexes(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_admin ON users (role) WHERE role = 'admin'")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications (status) WHERE status = 'unread'"
+    )
+
+
+# Version 11: hold queue per book; notifications may point at a hold instead of a loan
+def _holds_queue(cursor):
+    # status: waiting (in the queue) -> ready (copy set aside until expires_on)
+    # -> fulfilled / cancelled / expired
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS holds (
+            hold_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            book_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'waiting'
+                CHECK (status IN ('waiting', 'ready', 'fulfilled', 'cancelled', 'expired')),
+            placed_on INTEGER NOT NULL,
+            expires_on INTEGER,
+            FOREIGN KEY (book_id) REFERENCES books (book_id),
+            FOREIGN KEY (user_id) REFERENCES users (user_id)
+        )"""
+    )
+    # The queue itself: front-of-queue pop and next position are one seek,
+    # however much fulfilled history the title has
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_holds_queue ON holds (book_id, position) WHERE status = 'waiting'"
+    )
+    # One open hold per student per title
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_holds_open
+        ON holds (book_id, user_id) WHERE status IN ('waiting', 'ready')"""
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_holds_pickup ON holds (expires_on) WHERE status = 'ready'"
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_holds_book ON holds (book_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_holds_user ON holds (user_id)")
+
+    # HOLD_READY alerts have no loan: loan_id becomes nullable and hold_id is
+    # added. SQLite cannot drop NOT NULL, so the table is rebuilt as in version 6.
+    dependents = [
+        row[0] for row in cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE tbl_name = 'notifications' AND type IN ('index', 'trigger') AND sql IS NOT NULL"
+        )
+    ]
+    seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'notifications'").fetchone()
+
+    cursor.execute(
+        """
+        CREATE TABLE notifications_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            loan_id INTEGER,
+            hold_id INTEGER,
+            type TEXT NOT NULL,
+            message TEXT NOT NULL,
+            status TEXT DEFAULT 'unread',
+            created_at TEXT NOT NULL,
+            FOREIGN KEY (loan_id) REFERENCES loans (loan_id),
+            FOREIGN KEY (hold_id) REFERENCES holds (hold_id)
+        )"""
+    )
+    cursor.execute(
+        """
+        INSERT INTO notifications_new (id, loan_id, type, message, status, created_at)
+        SELECT id, loan_id, type, message, status, created_at FROM notifications
+        """
+    )
+    cursor.execute("DROP TABLE notifications")
+    cursor.execute("ALTER TABLE notifications_new RENAME TO notifications")
+
+    if seq:
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'notifications'", (seq[0],)
+        )
+    for sql in dependents:
+        cursor.execute(sql)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notifications_hold ON notifications (hold_id) WHERE hold_id IS NOT NULL"
+    )
+
+
+# Version 12: keyset pages over open rows only. Active loans and unresolved
+# alerts sit at the tail of tables full of history; a primary-key walk
+# filtering them reads every closed row in front of the first match.
+def _open_row_pages(cursor):
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_loans_active_id ON loans (loan_id) WHERE {ACTIVE_LOAN}")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_notifications_open_id ON notifications (id) WHERE status != 'resolved'"
+    )
+
+
+# Recompute every summary table from loans (full rebuild); `source` may be a
+# view that also covers archived loans
+def rebuild_circulation_stats(cursor, source="loans"):
+    for table in ("stats_daily", "stats_book", "stats_user", "stats_due"):
+        cursor.execute(f"DELETE FROM {table}")
+
+    cursor.execute(
+        f"""
+        INSERT INTO stats_daily (day, issued, returned)
+        SELECT day, SUM(issued), SUM(returned) FROM (
+            SELECT issue_date AS day, COUNT(*) AS issued, 0 AS returned FROM {source} GROUP BY issue_date
+            UNION ALL
+            SELECT return_date, 0, COUNT(*) FROM {source} WHERE return_date IS NOT NULL GROUP BY return_date
+        )
+        GROUP BY day
+        """
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO stats_book (book_id, loans, active)
+        SELECT book_id, COUNT(*), SUM({ACTIVE_LOAN}) FROM {source} GROUP BY book_id
+        """
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO stats_user (user_id, loans, active)
+        SELECT user_id, COUNT(*), SUM({ACTIVE_LOAN}) FROM {source} GROUP BY user_id
+        """
+    )
+    cursor.execute(
+        f"""
+        INSERT INTO stats_due (due_date, active)
+        SELECT due_date, COUNT(*) FROM {source} WHERE {ACTIVE_LOAN} GROUP BY due_date
+        """
+    )
+
+
+# Repopulate the FTS index from the books table
+def rebuild_catalog_fts(cursor):
+    cursor.execute("INSERT INTO books_fts (books_fts) VALUES ('rebuild')")
+
+# Ordered list of (version, description, step). Append only, never reorder.
+MIGRATIONS = [
+    (1, "base schema", _base_schema),
+    (2, "loan and notification indexes", _loan_indexes),
+    (3, "unique open alerts and app state", _alert_dedupe),
+    (4, "unread notification counter", _unread_counter),
+    (5, "FTS5 catalog index", _catalog_fts),
+    (6, "non-negative stock check", _stock_check),
+    (7, "fines ledger and user balances", _fines_ledger),
+    (8, "integer day-number loan dates", _loan_day_numbers),
+    (9, "circulation statistics tables", _circulation_stats),
+    (10, "admin and unread notification indexes", _hot_path_indexes),
+    (11, "hold queue and hold notifications", _holds_queue),
+    (12, "active loan and open notification page indexes", _open_row_pages),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ========================== RUNNER ==========================
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Apply pending steps in order, one transaction per step
+def apply_migrations(conn):
+    current = get_schema_version(conn)
+    applied = []
+    if current >= LATEST_VERSION:
+        return applied
+
+    # Table rebuilds drop and recreate referenced tables; SQLite's documented
+    # procedure is to run them with foreign keys off (can't change mid-transaction)
+    foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+    conn.execute("PRAGMA foreign_keys = OFF")
+
+    try:
+        for version, description, step in MIGRATIONS:
+            if version <= current:
+                continue
+
+            cursor = conn.cursor()
+            try:
+                # Another desk may be starting up at the same moment: take the
+                # write lock, then check the step was not applied meanwhile
+                begin_immediate(conn)
+                if get_schema_version(conn) >= version:
+                    cursor.execute("COMMIT")
+                    continue
+                step(cursor)
+                # PRAGMA values cannot be bound as parameters
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+                cursor.execute("COMMIT")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+
+            applied.append((version, description))
+    finally:
+        conn.execute(f"PRAGMA foreign_keys = {'ON' if foreign_keys else 'OFF'}")
+
+    return applied
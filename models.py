@@ -1,24 +1,35 @@
 import sqlite3
-from datetime import date, timedelta, datetime
+from datetime import datetime
 import time
-from tabulate import tabulate
+from archiver import loan_history
+from db import DEFAULT_DB, Database
+from migrations import apply_migrations
+from scheduler import ALERT_INTERVAL, AlertScheduler
+import sqlstats
+from services import LibraryService, LibraryError, NotFoundError, OutOfStockError, SEARCH_LIMIT
+from tables import render_table
 from utils import (
     clear_screen,
+    tabulate,
     get_valid_string,
     get_valid_int,
     get_valid_choice,
     validate_phone_format,
-    calculate_fine,
     get_validated_input,
     validate_username_format
 )
 
+
 class LibraryManager:
+    # Terminal front-end: prompts, prints and session state.
+    # Every rule lives in services.LibraryService, every statement in queries.py.
+
     # Initialize connection
-    def __init__(self, db_name="test.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.cursor = self.conn.cursor()
-        self.cursor.execute("PRAGMA foreign_keys = ON;")
+    def __init__(self, db_name=DEFAULT_DB):
+        # One connection per process (WAL, busy timeout, foreign keys on)
+        self.db_name = db_name
+        self.db = Database(db_name)
+        self.conn = self.db.connection()
 
         # Session State
         self.current_user_id = None
@@ -26,57 +37,14 @@ class LibraryManager:
         self.current_user_name = None
 
         self.initialize_db()
+        self.service = LibraryService(self.conn)
 
-    # Create tables if missing
+        # Background alert/fine jobs (started for admin sessions only)
+        self.scheduler = None
+
+    # Bring schema up to date (tables, indexes)
     def initialize_db(self):
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS books (
-                book_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                author TEXT NOT NULL,
-                total_copies INTEGER DEFAULT 1,    
-                available_copies INTEGER DEFAULT 1 
-            )"""
-        )
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                username TEXT UNIQUE NOT NULL,
-                phone TEXT NOT NULL,
-                password TEXT NOT NULL,
-                role TEXT NOT NULL
-            )"""
-        )
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS loans (
-                loan_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                book_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                issue_date TEXT NOT NULL,
-                due_date TEXT NOT NULL,
-                return_date TEXT,
-                FOREIGN KEY (book_id) REFERENCES books (book_id),
-                FOREIGN KEY (user_id) REFERENCES users (user_id)
-            )"""
-        )
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS notifications (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                loan_id INTEGER NOT NULL,
-                type TEXT NOT NULL,
-                message TEXT NOT NULL,
-                status TEXT DEFAULT 'unread',
-                created_at TEXT NOT NULL,
-                FOREIGN KEY (loan_id) REFERENCES loans (loan_id)
-            );
-        """
-        )
-        self.conn.commit()
+        apply_migrations(self.conn)
 
     # ========================== USER MANAGEMENT ==========================
 
@@ -87,25 +55,23 @@ class LibraryManager:
         username = get_valid_string("Username: ").lower()
         password = get_valid_string("Password: ")
 
-        user = self.cursor.execute(
-            "SELECT user_id, role, name FROM users WHERE username = ? AND password = ?",
-            (username, password),
-        ).fetchone()
-
-        if user:
-            self.current_user_id = user[0]
-            self.current_user_role = user[1]
-            self.current_user_name = user[2]
-            print(f"✅ Logged in as {user[2]}")
-            time.sleep(3)
-            return True
-        else:
-            print("❌ Invalid credentials.")
+        try:
+            user = self.service.authenticate(username, password)
+        except LibraryError as e:
+            print(f"❌ {e}")
             input("Press Enter...")
             return False
 
-    # Handle Logout
+        self.current_user_id = user.user_id
+        self.current_user_role = user.role
+        self.current_user_name = user.name
+        print(f"✅ Logged in as {user.name}")
+        time.sleep(3)
+        return True
+
+    # Handle Logout (ends the admin session's scheduler too)
     def logout(self):
+        self.stop_scheduler()
         self.current_user_id = None
         self.current_user_role = None
         self.current_user_name = None
@@ -120,30 +86,21 @@ class LibraryManager:
         password = get_valid_string("Password: ")
 
         try:
-            self.cursor.execute(
-                "INSERT INTO users (name, username, phone, password, role) VALUES (?, ?, ?, ?, 'student')",
-                (name, username, phone, password),
-            )
-            self.conn.commit()
+            self.service.register_user(name, username, phone, password)
             print(f"✨ User {name} registered successfully.")
-        except sqlite3.IntegrityError:
-            print("❌ Error: Username already exists.")
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
         input("Press Enter...")
 
-    # List users table
+    # List users table (paginated)
     def list_all_users(self):
-        clear_screen()
-        users = self.cursor.execute(
-            "SELECT user_id, name, username, phone, role FROM users"
-        ).fetchall()
-        print(
-            tabulate(
-                users,
-                headers=["ID", "Name", "Username", "Phone", "Role"],
-                tablefmt="fancy_grid",
-            )
+        self._browse_pages(
+            "👥 All Users",
+            self.service.list_users,
+            lambda u: [u.user_id, u.name, u.username, u.phone, u.role],
+            ["ID", "Name", "Username", "Phone", "Role"],
+            empty_message="No users found.",
         )
-        input("Press Enter...")
 
     # Update user details
     def update_user(self, prefilled_username=None):
@@ -156,73 +113,57 @@ class LibraryManager:
         else:
             target_username = get_valid_string("Enter username to update: ").lower()
 
-        user = self.cursor.execute(
-            "SELECT * FROM users WHERE username=?", (target_username,)
-        ).fetchone()
-
-        if not user:
-            print(f"❌ User '{target_username}' not found.")
+        try:
+            user = self.service.get_user_by_username(target_username)
+        except LibraryError as e:
+            print(f"❌ {e}")
             input("Press Enter...")
             return
 
-        u_id, u_name, u_username, u_phone, u_pass, u_role = user
-
-        print(f"\nUpdating: {u_name} ({u_role})")
+        print(f"\nUpdating: {user.name} ({user.role})")
         print("(Press Enter to keep current value)")
 
-        new_name = input(f"New Name [{u_name}]: ").strip() or u_name
-        new_username = input(f"New Username [{u_username}]: ").strip().lower() or u_username
-        print(f"Current Phone: {u_phone}")
+        new_name = input(f"New Name [{user.name}]: ").strip() or user.name
+        new_username = input(f"New Username [{user.username}]: ").strip().lower() or user.username
+        print(f"Current Phone: {user.phone}")
         while True:
             p_input = input(f"New Phone (Leave empty to keep current): ").strip()
             if not p_input:
-                new_phone = u_phone
+                new_phone = user.phone
                 break
-            
+
             validation_msg = validate_phone_format(p_input)
             if validation_msg is True:
                 new_phone = p_input
                 break
             else:
                 print(f"Error: {validation_msg}")
-        
-        new_pass = input(f"New Password [{u_pass}]: ").strip() or u_pass
 
-        print(f"Current Role: {u_role}")
-        new_role = input(f"New Role (student/admin) [{u_role}]: ").strip().lower()
+        new_pass = input(f"New Password (Press Enter to keep): ").strip() or None
+
+        print(f"Current Role: {user.role}")
+        new_role = input(f"New Role (student/admin) [{user.role}]: ").strip().lower()
 
         if not new_role:
-            new_role = u_role
+            new_role = user.role
 
         if new_role not in ['student', 'admin']:
             print("Invalid role. Keeping old role.")
-            new_role = u_role
-
-        # Prevent removing last admin
-        if u_role == 'admin' and new_role == 'student':
-            admin_count = self.cursor.execute(
-                "SELECT COUNT(*) FROM users WHERE role='admin'"
-            ).fetchone()[0]
-
-            if admin_count <= 1:
-                print("\n❌ CRITICAL: You cannot downgrade the last Administrator.")
-                input("Press Enter to cancel...")
-                return
+            new_role = user.role
 
         try:
-            self.cursor.execute(
-                "UPDATE users SET name=?, username=?, phone=?, password=?, role=? WHERE user_id=?",
-                (new_name, new_username, new_phone, new_pass, new_role, u_id),
+            self.service.update_user(
+                user.user_id, name=new_name, username=new_username,
+                phone=new_phone, password=new_pass, role=new_role,
             )
-            self.conn.commit()
             print("✅ User updated successfully.")
 
-            if u_id == self.current_user_id and new_role == 'student':
+            if user.user_id == self.current_user_id and new_role == 'student':
                 print("⚠️ You have downgraded your own account. Logging out...")
                 self.logout()
 
-        except sqlite3.IntegrityError:
-            print("❌ Error: Username taken.")
+        except LibraryError as e:
+            print(f"\n❌ Error: {e}")
 
         input("Press Enter...")
 
@@ -232,49 +173,21 @@ class LibraryManager:
         print("\n---------- 🗑️  Delete User ----------")
         username = get_valid_string("Enter username to delete: ").lower()
 
-        user = self.cursor.execute(
-            "SELECT user_id, role FROM users WHERE username=?", (username,)
-        ).fetchone()
-
-        if not user:
-            print("❌ User not found.")
-            input("Press Enter...")
-            return
-
-        target_user_id, target_user_role = user
-
-        if target_user_id == self.current_user_id:
-            print("❌ Error: You cannot delete your own account while logged in.")
-            input("Press Enter...")
-            return
-
-        if target_user_role == 'admin':
-            admin_count = self.cursor.execute(
-                "SELECT COUNT(*) FROM users WHERE role='admin'"
-            ).fetchone()[0]
-
-            if admin_count <= 1:
-                print("❌ Error: Cannot delete the last Administrator.")
-                input("Press Enter...")
-                return
-
-        active_loans = self.cursor.execute(
-            "SELECT COUNT(*) FROM loans WHERE user_id=? AND (return_date='' OR return_date IS NULL)",
-            (target_user_id,)
-        ).fetchone()[0]
-
-        if active_loans > 0:
-            print(f"❌ Error: This user has {active_loans} active loan(s).")
-            print("They must return all books before deletion.")
+        try:
+            user = self.service.get_user_by_username(username)
+            self.service.check_user_deletable(user.user_id, self.current_user_id)
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
             input("Press Enter...")
             return
 
         confirm = input(f"⚠️ Are you sure you want to delete {username}? (yes/no): ")
         if confirm.lower() == "yes":
-            self.cursor.execute("DELETE FROM loans WHERE user_id=?", (target_user_id,))
-            self.cursor.execute("DELETE FROM users WHERE user_id=?", (target_user_id,))
-            self.conn.commit()
-            print("✅ User deleted successfully.")
+            try:
+                self.service.delete_user(user.user_id, self.current_user_id)
+                print("✅ User deleted successfully.")
+            except LibraryError as e:
+                print(f"❌ Error: {e}")
         else:
             print("Operation cancelled.")
 
@@ -283,40 +196,35 @@ class LibraryManager:
     # Student change password
     def change_own_password(self, current_user_id):
         print("\n--- 🔐 Change Password ---")
-        
+
         old_password = input("Enter your CURRENT password: ").strip()
-        
-        self.cursor.execute("SELECT password FROM users WHERE user_id = ?", (current_user_id,))
-        stored_password = self.cursor.fetchone()
-        
-        if stored_password is None:
-            print("Error: User record not found.")
+
+        try:
+            if not self.service.verify_password(current_user_id, old_password):
+                print("❌ Incorrect current password.")
+                input("Press Enter...")
+                return
+        except LibraryError as e:
+            print(f"Error: {e}")
             input("Press Enter...")
             return
 
-        if old_password == stored_password[0]:
-            new_password = input("Enter NEW password: ").strip()
-            confirm_password = input("Confirm NEW password: ").strip()
-            
-            if new_password == confirm_password:
-                if new_password:
-                    try:
-                        self.cursor.execute("UPDATE users SET password = ? WHERE user_id = ?", (new_password, current_user_id))
-                        self.conn.commit()
-                        print("✅ Password updated successfully!")
-                        input("Press Enter...")
-                    except sqlite3.Error as e:
-                        print(f"Database error: {e}")
-                        input("Press Enter...")
-                else:
-                    print("❌ Password cannot be empty.")
-                    input("Press Enter...")
-            else:
-                print("❌ New passwords do not match.")
-                input("Press Enter...")
-        else:
-            print("❌ Incorrect current password.")
+        new_password = input("Enter NEW password: ").strip()
+        confirm_password = input("Confirm NEW password: ").strip()
+
+        if new_password != confirm_password:
+            print("❌ New passwords do not match.")
             input("Press Enter...")
+            return
+
+        try:
+            self.service.change_password(current_user_id, old_password, new_password)
+            print("✅ Password updated successfully!")
+        except LibraryError as e:
+            print(f"❌ {e}")
+        except sqlite3.Error as e:
+            print(f"Database error: {e}")
+        input("Press Enter...")
 
     # ========================== BOOK OPERATIONS ==========================
 
@@ -326,56 +234,40 @@ class LibraryManager:
         print("\n---------- 📖 Add Book ----------")
         title = get_valid_string("Title: ")
         author = get_valid_string("Author: ")
-        
+
         qty = get_valid_int("Total Quantity: ")
 
         try:
-            self.cursor.execute(
-                "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)",
-                (title, author, qty, qty),
-            )
-            self.conn.commit()
+            self.service.add_book(title, author, qty)
             print(f"✨ Success! Added {qty} copies of '{title}'.")
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
         except sqlite3.Error as e:
             print(f"Database Error: {e}")
-        
+
         input("Press Enter...")
 
-    # List all books
+    # List all books (paginated)
     def list_all_books(self):
-        clear_screen()
-        books = self.cursor.execute("SELECT * FROM books").fetchall()
-        
-        if books:
-            print(
-                tabulate(
-                    books,
-                    headers=["ID", "Title", "Author", "Total", "Available"],
-                    tablefmt="fancy_grid",
-                )
-            )
-        else:
-            print("No books found.")
-        input("Press Enter...")
+        self._browse_pages(
+            "📚 All Books",
+            self.service.list_books,
+            _book_row,
+            ["ID", "Title", "Author", "Total", "Available"],
+            empty_message="No books found.",
+        )
+
+    # Ranked full-text catalog lookup, as table rows
+    def search_catalog(self, keyword, limit=SEARCH_LIMIT):
+        return [_book_row(b) for b in self.service.search(keyword, limit)]
 
     # Search logic
     def search_books(self):
         clear_screen()
         print("\n---------- 🔍 Search Books ----------")
-        kw = get_valid_string("Enter keyword: ").lower()
-        books = self.cursor.execute(
-            "SELECT * FROM books WHERE lower(title) LIKE ? OR lower(author) LIKE ?",
-            (f"%{kw}%", f"%{kw}%"),
-        ).fetchall()
-        if books:
-            print(
-                tabulate(
-                    books,
-                    headers=["ID", "Title", "Author", "Total", "Available"],
-                    tablefmt="fancy_grid",
-                )
-            )
-        else:
+        kw = get_valid_string("Enter keyword: ")
+        books = self.search_catalog(kw)
+        if not render_table(books, ["ID", "Title", "Author", "Total", "Available"]):
             print("No matches found.")
         input("Press Enter...")
 
@@ -383,101 +275,65 @@ class LibraryManager:
     def update_book(self, prefilled_book_id=None):
         clear_screen()
         print("\n---------- ✏️  Update Book ----------")
-        
+
         if prefilled_book_id:
             book_id = prefilled_book_id
             print(f"Editing Book ID: {book_id}")
         else:
             book_id = get_valid_int("Book ID: ")
 
-        book = self.cursor.execute(
-            "SELECT * FROM books WHERE book_id=?", (book_id,)
-        ).fetchone()
-
-        if not book:
-            print("❌ Book not found.")
+        try:
+            book = self.service.get_book(book_id)
+        except LibraryError as e:
+            print(f"❌ {e}")
             input("Press Enter...")
             return
 
-        curr_title, curr_author, curr_total, curr_avail = book[1], book[2], book[3], book[4]
-
-        print(f"Current Title: {curr_title}")
-        new_title = input(f"New Title (Press Enter to keep): ").strip()
-        if not new_title:
-            new_title = curr_title
-
-        print(f"Current Author: {curr_author}")
-        new_author = input(f"New Author (Press Enter to keep): ").strip()
-        if not new_author:
-            new_author = curr_author
-        
-        print(f"Current Stock: {curr_total} (Available: {curr_avail})")
-        new_total_str = input(f"New Total Quantity [{curr_total}]: ").strip()
-        
+        print(f"Current Title: {book.title}")
+        new_title = input(f"New Title (Press Enter to keep): ").strip() or None
+
+        print(f"Current Author: {book.author}")
+        new_author = input(f"New Author (Press Enter to keep): ").strip() or None
+
+        print(f"Current Stock: {book.total_copies} (Available: {book.available_copies})")
+        new_total_str = input(f"New Total Quantity [{book.total_copies}]: ").strip()
+
+        new_total = None
         if new_total_str:
             try:
                 new_total = int(new_total_str)
-                issued_count = curr_total - curr_avail
-                if new_total < issued_count:
-                    print(f"❌ Error: Cannot reduce total below currently issued count ({issued_count}).")
-                    input("Press Enter...")
-                    return
-                
-                diff = new_total - curr_total
-                new_avail = curr_avail + diff
             except ValueError:
                 print("Invalid number. Keeping old quantity.")
-                new_total = curr_total
-                new_avail = curr_avail
-        else:
-            new_total = curr_total
-            new_avail = curr_avail
 
         try:
-            self.cursor.execute(
-                "UPDATE books SET title=?, author=?, total_copies=?, available_copies=? WHERE book_id=?",
-                (new_title, new_author, new_total, new_avail, book_id),
-            )
-            self.conn.commit()
+            self.service.update_book(book_id, title=new_title, author=new_author, total_copies=new_total)
             print("✅ Book details updated successfully.")
-        except Exception as e:
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
+        except sqlite3.Error as e:
             print(f"❌ Database Error: {e}")
-            
+
         input("Press Enter...")
 
     # Remove book
     def remove_book(self, prefilled_book_id=None):
         clear_screen()
         print("\n---------- 🗑️  Delete Book ----------")
-        
+
         if prefilled_book_id:
             book_id = prefilled_book_id
             print(f"Deleting Book ID: {book_id}")
         else:
             book_id = get_valid_int("Book ID to delete: ")
 
-        book = self.cursor.execute(
-            "SELECT title, total_copies, available_copies FROM books WHERE book_id = ?", (book_id,)
-        ).fetchone()
-        
-        if not book:
-            print("❌ Book not found")
-            input("Press Enter...")
-            return
-
-        title, total, avail = book
-
-        if total != avail:
-            issued = total - avail
-            print(f"❌ Error: Cannot delete '{title}'.")
-            print(f"There are still {issued} copy(s) issued to students.")
+        try:
+            book = self.service.get_book(book_id)
+            history_count = self.service.check_book_deletable(book_id)
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
             input("Press Enter...")
             return
 
-        history_count = self.cursor.execute(
-            "SELECT COUNT(*) FROM loans WHERE book_id = ?", (book_id,)
-        ).fetchone()[0]
-
         if history_count > 0:
             print(f"⚠️  This book has {history_count} past loan records.")
             print("Deleting it will erase this history forever.")
@@ -487,15 +343,11 @@ class LibraryManager:
                 print("Deletion cancelled.")
                 input("Press Enter...")
                 return
-            
-            self.cursor.execute("DELETE FROM loans WHERE book_id = ?", (book_id,))
 
         try:
-            self.cursor.execute("DELETE FROM books WHERE book_id = ?", (book_id,))
-            self.conn.commit()
-            print(f"✅ Book '{title}' deleted successfully.")
-        except sqlite3.Error as e:
-            self.conn.rollback()
+            self.service.delete_book(book_id)
+            print(f"✅ Book '{book.title}' deleted successfully.")
+        except (LibraryError, sqlite3.Error) as e:
             print(f"Error: {e}")
 
         input("Press Enter...")
@@ -506,59 +358,32 @@ class LibraryManager:
     def issue_book(self, prefilled_book_id=None):
         clear_screen()
         print("\n---------- 📚 Issue Book ----------")
-        
+
         if prefilled_book_id:
             book_id = prefilled_book_id
             print(f"Selected Book ID: {book_id}")
         else:
             book_id = get_valid_int("Book ID: ")
-        
-        user_id = get_valid_int("User ID: ")
-
-        book = self.cursor.execute(
-            "SELECT title, available_copies FROM books WHERE book_id=?", (book_id,)
-        ).fetchone()
-        
-        if not book:
-            print("❌ Error: Book not found.")
-            input("Press Enter...")
-            return
-            
-        if book[1] <= 0:
-            print(f"❌ Error: '{book[0]}' is out of stock.")
-            input("Press Enter...")
-            return
 
-        user = self.cursor.execute(
-            "SELECT name FROM users WHERE user_id=?", (user_id,)
-        ).fetchone()
-        
-        if not user:
-            print("❌ Error: User not found.")
-            input("Press Enter...")
-            return  
+        user_id = get_valid_int("User ID: ")
 
         try:
-            today = date.today()
-            due = today + timedelta(days=14)
-
-            self.cursor.execute(
-                "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = ?", 
-                (book_id,)
-            )
-            
-            self.cursor.execute(
-                "INSERT INTO loans (book_id, user_id, issue_date, due_date, return_date) VALUES (?, ?, ?, ?, '')",
-                (book_id, user_id, today.strftime("%Y-%m-%d"), due.strftime("%Y-%m-%d")),
-            )
-            
-            self.conn.commit()
-            print(f"✅ Success! Book issued to {user[0]}. Remaining Stock: {book[1] - 1}")
-            
-        except Exception as e:
-            self.conn.rollback()
+            loan = self.service.issue(book_id, user_id)
+            remaining = self.service.get_book(book_id).available_copies
+            print(f"✅ Success! Book issued to {loan.user_name}. Remaining Stock: {remaining}")
+
+            owed = self.service.outstanding_balance(user_id)
+            if owed > 0:
+                print(f"⚠️  {loan.user_name} has ${owed:.2f} in unpaid fines.")
+        except OutOfStockError as e:
+            print(f"❌ Error: {e}")
+            if input("Place a hold for this student? (y/N): ").strip().lower() == "y":
+                self._place_hold(book_id, user_id)
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
+        except sqlite3.Error as e:
             print(f"Database Error: {e}")
-            
+
         input("Press Enter...")
 
     # Return book from student
@@ -567,87 +392,101 @@ class LibraryManager:
         print("\n---------- 📥 Return Book ----------")
         book_id = get_valid_int("Book ID to return: ")
 
-        loan = self.cursor.execute(
-            "SELECT loan_id, due_date, user_id FROM loans WHERE book_id=? AND (return_date='' OR return_date IS NULL)",
-            (book_id,),
-        ).fetchone()
+        try:
+            result = self.service.return_book(book_id)
+            print("✅ Book returned successfully.")
+
+            if result.fine > 0:
+                print(f"⚠️  OVERDUE by {result.days_overdue} days. Fine: ${result.fine:.2f}")
+            else:
+                print("Returned on time. No fine.")
+
+            if result.hold:
+                print(f"📌 Set this copy aside for {result.hold.user_name} "
+                      f"(hold #{result.hold.hold_id}, pick up by {result.hold.expires_on}).")
+
+        except LibraryError as e:
+            print(f"❌ {e}")
+        except sqlite3.Error as e:
+            print(f"Error during return: {e}")
+
+        input("Press Enter...")
+
+    # ========================== BATCH DESK OPERATIONS ==========================
 
-        if not loan:
-            print("❌ No active loan found for this book ID.")
+    # Desk screen: one student, many books
+    def batch_issue_books(self):
+        clear_screen()
+        print("\n---------- 📚 Batch Issue ----------")
+        user_id = get_valid_int("User ID: ")
+        book_ids = _parse_id_list(get_valid_string("Book IDs (comma separated): "))
+
+        if book_ids is None:
+            print("❌ Error: Book IDs must be numbers separated by commas.")
             input("Press Enter...")
             return
 
-        loan_id, due_date, user_id = loan
-        fine, days = calculate_fine(due_date)
+        results = self.service.issue_batch([(b, user_id) for b in book_ids])
+        rows = [
+            [r.book_id, "✅" if r.ok else "❌", r.loan_id or "", r.due_date or r.error]
+            for r in results
+        ]
+        print(tabulate(rows, headers=["Book ID", "OK", "Loan ID", "Due / Error"], tablefmt="fancy_grid"))
+        print(f"Issued {sum(r.ok for r in results)} of {len(results)} book(s).")
+        input("Press Enter...")
 
-        try:
-            self.cursor.execute(
-                "UPDATE loans SET return_date=? WHERE loan_id=?",
-                (date.today().strftime("%Y-%m-%d"), loan_id),
-            )
-            self.cursor.execute(
-                "UPDATE books SET available_copies = available_copies + 1 WHERE book_id=?", 
-                (book_id,)
-            )
-            self.cursor.execute(
-                "UPDATE notifications SET status = 'resolved' WHERE loan_id = ?",
-                (loan_id,)
-            )
-            
-            self.conn.commit()
-            print("✅ Book returned successfully.")
-                
-            if fine > 0:
-                print(f"⚠️  OVERDUE by {days} days. Fine: ${fine:.2f}")
+    # Desk screen: one student returns a stack
+    def batch_return_books(self):
+        clear_screen()
+        print("\n---------- 📥 Batch Return ----------")
+        user_id = get_valid_int("User ID: ")
+        book_ids = _parse_id_list(get_valid_string("Book IDs (comma separated): "))
+
+        if book_ids is None:
+            print("❌ Error: Book IDs must be numbers separated by commas.")
+            input("Press Enter...")
+            return
+
+        results = self.service.return_batch([(b, user_id) for b in book_ids])
+        rows = []
+        for r in results:
+            if r.ok:
+                note = f"Overdue {r.days_overdue} days" if r.fine > 0 else "On time"
+                rows.append([r.book_id, "✅", r.loan_id, f"${r.fine:.2f}", note])
             else:
-                print("Returned on time. No fine.")
+                rows.append([r.book_id, "❌", "", "", r.error])
+        print(tabulate(rows, headers=["Book ID", "OK", "Loan ID", "Fine", "Note"], tablefmt="fancy_grid"))
 
-        except Exception as e:
-            self.conn.rollback()
-            print(f"Error during return: {e}")
-            
+        total_fine = sum(r.fine for r in results)
+        print(f"Returned {sum(r.ok for r in results)} of {len(results)} book(s). Total fine: ${total_fine:.2f}")
         input("Press Enter...")
 
     # Show new arrivals
     def list_new_arrivals(self):
         clear_screen()
         print("\n--- ✨ NEW ARRIVALS ---")
-        books = self.cursor.execute("SELECT * FROM books ORDER BY book_id DESC LIMIT 5").fetchall()
+        books = [_book_row(b) for b in self.service.new_arrivals(5)]
         print(tabulate(books, headers=["ID", "Title", "Author", "Total", "Available"], tablefmt="fancy_grid"))
         input("Press Enter...")
 
-    # List all loans (Admin)
+    # List all loans (Admin, paginated)
     def list_all_loans(self):
         clear_screen()
         print("\n----------- All Loan Records ----------")
-
-        query = """
-            SELECT 
-                l.loan_id, 
-                b.title, 
-                u.name, 
-                l.issue_date, 
-                l.due_date, 
-                l.return_date 
-            FROM loans l
-            JOIN books b ON l.book_id = b.book_id
-            JOIN users u ON l.user_id = u.user_id
-        """
-
-        loans = self.cursor.execute(query).fetchall()
-
-        if loans:
-            headers = ["ID", "Book Title", "Student Name", "Issued", "Due", "Returned"]
-            print(tabulate(
-                loans,
-                headers=headers,
-                tablefmt="fancy_grid",
-                maxcolwidths=[None, 25, 20, None, None, None]
-            ))
-        else:
-            print("No loan records found.")
-
-        input("Press Enter...")
+        active_only = input("Show active loans only? (y/N): ").strip().lower() == "y"
+
+        def fetch_page(cursor):
+            return self.service.list_loans(cursor, active_only=active_only)
+
+        title = "Active Loans" if active_only else "All Loan Records"
+        self._browse_pages(
+            title,
+            fetch_page,
+            lambda l: [l.loan_id, l.title, l.user_name, l.issue_date, l.due_date, l.return_date],
+            ["ID", "Book Title", "Student Name", "Issued", "Due", "Returned"],
+            empty_message="No loan records found.",
+            maxcolwidths=[None, 25, 20, None, None, None],
+        )
 
     # View personal loans
     def view_my_loans(self):
@@ -655,25 +494,93 @@ class LibraryManager:
         if not self.current_user_id:
             return
 
-        query = """
-            SELECT b.title, b.author, l.issue_date, l.due_date, l.return_date 
-            FROM loans l 
-            JOIN books b ON l.book_id = b.book_id 
-            WHERE l.user_id = ?
-        """
-        loans = self.cursor.execute(query, (self.current_user_id,)).fetchall()
-        if loans:
-            print(
-                tabulate(
-                    loans,
-                    headers=["Title", "Author", "Borrowed", "Due", "Returned"],
-                    tablefmt="fancy_grid",
-                )
-            )
-        else:
+        # Fetched before paging: a cursor left open while the student reads
+        # would hold a read snapshot (and block WAL checkpoints) meanwhile
+        loans = [
+            [l.title, l.author, l.issue_date, l.due_date, l.return_date]
+            for l in self.service.list_user_loans(self.current_user_id)
+        ]
+        if not render_table(loans, ["Title", "Author", "Borrowed", "Due", "Returned"]):
             print("No loans found.")
+
+        owed = self.service.outstanding_balance(self.current_user_id)
+        if owed > 0:
+            print(f"⚠️  Outstanding fines: ${owed:.2f}")
+        input("Press Enter...")
+
+    # Fines owed by every student, highest first (Admin)
+    def fines_report(self):
+        clear_screen()
+        print("\n---------- 💰 Fines Report ----------")
+        # Streamed: rows are read in keyset chunks only as the admin scrolls
+        # (no cursor stays open in between), and totals add up as they pass
+        totals = {"owed": 0.0, "students": 0}
+
+        def rows():
+            for f in self.service.iter_fines_report():
+                totals["owed"] += f.outstanding
+                totals["students"] += 1
+                yield [f.user_id, f.name, f.username, f"${f.outstanding:.2f}", f.late_loans, f.days_overdue, f.accruing]
+
+        shown = render_table(
+            rows(),
+            ["ID", "Name", "Username", "Owes", "Late Loans", "Days Late", "Still Out"],
+            footer=lambda: [f"Total outstanding: ${totals['owed']:.2f} across {totals['students']} student(s)"],
+        )
+        if not shown:
+            print("No outstanding fines.")
         input("Press Enter...")
 
+    # Circulation dashboard from the summary tables (Admin)
+    def show_statistics(self):
+        while True:
+            clear_screen()
+            print("\n---------- 📊 Circulation Statistics ----------")
+            stats = self.service.circulation_stats()
+
+            print(f"Today: {stats.issued_today} issued, {stats.returned_today} returned")
+            print(f"On loan now: {stats.active_loans}   ⚠️  Overdue: {stats.overdue_loans}")
+
+            print("\nLast 7 days:")
+            print(tabulate(stats.daily, headers=["Date", "Issued", "Returned"], tablefmt="simple"))
+
+            print("\nMost borrowed titles:")
+            if stats.top_books:
+                print(tabulate(stats.top_books, headers=["ID", "Title", "Author", "Loans", "Out Now"], tablefmt="simple"))
+            else:
+                print("No loans recorded yet.")
+
+            print("\nMost books out (per user):")
+            if stats.top_borrowers:
+                print(tabulate(stats.top_borrowers, headers=["ID", "Name", "Username", "Active"], tablefmt="simple"))
+            else:
+                print("No active loans.")
+
+            cache = self.service.cache_stats()
+            print(f"\nLookup cache: {cache['hit_ratio']:.0%} hits ({cache['hits']:,} hits, {cache['misses']:,} misses), "
+                  f"{cache['size']}/{cache['maxsize']} entries, {cache['evictions']:,} evicted, "
+                  f"{cache['invalidations']:,} invalidations")
+
+            prompt = "\n'r' to rebuild from loan records"
+            if sqlstats.enabled():
+                prompt += ", 's' for SQL timings"
+            choice = input(prompt + ", Enter to go back: ").strip().lower()
+
+            if choice == "s" and sqlstats.enabled():
+                sqlstats.print_report()
+                input("Press Enter...")
+                continue
+            if choice != "r":
+                return
+            try:
+                # Archived loans are still part of the history being summarised
+                with loan_history(self.conn, self.db_name) as source:
+                    self.service.rebuild_statistics(source)
+                print("✅ Statistics rebuilt.")
+            except (LibraryError, sqlite3.Error) as e:
+                print(f"❌ Error: {e}")
+            input("Press Enter...")
+
     # Manually update loan
     def update_loan(self):
         clear_screen()
@@ -683,86 +590,56 @@ class LibraryManager:
         print("-" * 50)
         loan_id = get_valid_int("Enter Loan ID to update: ")
 
-        loan = self.cursor.execute(
-            "SELECT due_date, return_date, book_id FROM loans WHERE loan_id = ?", (loan_id,)
-        ).fetchone()
-
-        if not loan:
-            print("❌ Error: Loan ID not found.")
+        try:
+            loan = self.service.get_loan(loan_id)
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
             input("Press Enter...")
             return
 
-        current_due, current_return, book_id = loan
         print(f"\nUpdating Loan #{loan_id}")
         print("(Press Enter to keep current values)")
 
-        new_due_input = input(f"New Due Date (YYYY-MM-DD) [{current_due}]: ").strip()
-        
-        if not new_due_input:
-            final_due_date = current_due
-        else:
+        new_due_input = input(f"New Due Date (YYYY-MM-DD) [{loan.due_date}]: ").strip()
+
+        new_due_date = None
+        if new_due_input:
             try:
-                dt_obj = datetime.strptime(new_due_input, "%Y-%m-%d")
-                final_due_date = dt_obj.strftime("%Y-%m-%d")
+                new_due_date = datetime.strptime(new_due_input, "%Y-%m-%d").strftime("%Y-%m-%d")
             except ValueError:
                 print("❌ Error: Invalid date format. Use YYYY-MM-DD.")
                 input("Press Enter...")
                 return
 
-        display_ret = current_return if current_return else "Active/Empty"
+        display_ret = loan.return_date if loan.return_date else "Active/Empty"
         new_ret_input = input(f"New Return Date (YYYY-MM-DD) [{display_ret}]: ").strip()
 
-        final_return_date = current_return 
-
+        new_return_date = None
         if new_ret_input.lower() == "clear":
-            final_return_date = ""
+            new_return_date = ""
         elif new_ret_input:
             try:
-                dt_ret = datetime.strptime(new_ret_input, "%Y-%m-%d")
-                final_return_date = dt_ret.strftime("%Y-%m-%d")
+                new_return_date = datetime.strptime(new_ret_input, "%Y-%m-%d").strftime("%Y-%m-%d")
             except ValueError:
                 print("❌ Error: Invalid return date format.")
                 input("Press Enter...")
                 return
 
-        is_unreturning = (final_return_date == "" and current_return)
-        
-        # Check stock before removing return date
-        if is_unreturning:
-            current_avail = self.cursor.execute(
-                "SELECT available_copies FROM books WHERE book_id=?", (book_id,)
-            ).fetchone()[0]
-            
-            if current_avail <= 0:
-                print(f"❌ Error: Cannot mark as borrowed. Book stock is 0.")
-                input("Press Enter to cancel...")
-                return
-
         try:
-            self.cursor.execute(
-                "UPDATE loans SET due_date = ?, return_date = ? WHERE loan_id = ?",
-                (final_due_date, final_return_date, loan_id),
-            )
-            
-            if is_unreturning:
-                self.cursor.execute(
-                    "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = ?", 
-                    (book_id,)
-                )
-                print("Note: Book count adjusted (Stock -1).")
+            updated = self.service.update_loan(loan_id, due_date=new_due_date, return_date=new_return_date)
 
-            self.conn.commit()
-            print(f"✅ Loan updated. New Due Date: {final_due_date}")
+            if updated.is_active and not loan.is_active:
+                print("Note: Book count adjusted (Stock -1).")
+            elif loan.is_active and not updated.is_active:
+                print("Note: Book count adjusted (Stock +1).")
 
-            self.cursor.execute(
-                "UPDATE notifications SET status = 'resolved' WHERE loan_id = ?",
-                (loan_id,)
-            )
-            self.conn.commit()
-            self.generate_daily_alerts()
+            print(f"✅ Loan updated. New Due Date: {updated.due_date}")
 
-        except Exception as e:
-            self.conn.rollback()
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
+            input("Press Enter to cancel...")
+            return
+        except sqlite3.Error as e:
             print(f"Database Error: {e}")
 
         input("Press Enter...")
@@ -773,142 +650,284 @@ class LibraryManager:
         print("\n---------- 🗑️  DELETE LOAN (ADMIN) ----------")
         loan_id = get_valid_int("Loan ID to delete: ")
 
-        loan = self.cursor.execute(
-            "SELECT book_id, return_date FROM loans WHERE loan_id=?", (loan_id,)
-        ).fetchone()
-        if not loan:
+        try:
+            loan = self.service.get_loan(loan_id)
+        except LibraryError:
             print("Loan not found.")
             input("Press Enter...")
             return
 
-        book_id, return_date = loan
-
-        if return_date == "" or return_date is None:
+        if loan.is_active:
             print("⚠️  WARNING: This is an ACTIVE loan.")
             conf = input(
                 "Deleting this will reset the book to 'Available'. Proceed? (yes/no): "
             )
             if conf.lower() != "yes":
                 return
-            
-            self.cursor.execute(
-                "UPDATE books SET available_copies = available_copies + 1 WHERE book_id = ?", 
-                (book_id,)
-            )
 
-        self.cursor.execute("DELETE FROM loans WHERE loan_id=?", (loan_id,))
-        self.conn.commit()
-        print("✅ Loan deleted.")
+        try:
+            self.service.delete_loan(loan_id)
+            print("✅ Loan deleted.")
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
+        except sqlite3.Error as e:
+            print(f"Database Error: {e}")
         input("Press Enter...")
-        
+
     # ========================== NOTIFICATIONS & UTILS ==========================
 
-    # Create daily alerts
-    def generate_daily_alerts(self):
-        today = date.today().strftime("%Y-%m-%d")
-        
-        query = """
-        SELECT l.loan_id, b.title, u.name 
-        FROM loans l 
-        JOIN books b ON l.book_id = b.book_id 
-        JOIN users u ON l.user_id = u.user_id 
-        WHERE l.due_date = ? AND (l.return_date = '' OR l.return_date IS NULL)
-        """
-
-        due_loans = self.cursor.execute(query, (today,)).fetchall()
-
-        count_new = 0
-        for loan in due_loans:
-            loan_id, title, user_name = loan
-
-            exists = self.cursor.execute(
-                "SELECT 1 FROM notifications WHERE loan_id = ? AND type = 'DUE_TODAY' AND status != 'resolved'",
-                (loan_id,),
-            ).fetchone()
-
-            if not exists:
-                msg = f"Book '{title}' is expected today from {user_name}."
-                self.cursor.execute(
-                    "INSERT INTO notifications (loan_id, type, message, status, created_at) VALUES (?, 'DUE_TODAY', ?, 'unread', ?)",
-                    (loan_id, msg, today),
-                )
-                count_new += 1
-                self.conn.commit()
-        
-        if count_new > 0:
-            print(f"🔔 System generated {count_new} new notifications.")
-
-    # View alerts inbox
-    def view_notifications(self):
-        clear_screen()
-        print("\n=== 🔔 NOTIFICATION CENTER ===")
+    # Alerts and fines are computed off the UI path; menus only read results
+    def start_scheduler(self, interval=ALERT_INTERVAL):
+        if self.scheduler is None:
+            self.scheduler = AlertScheduler(self.db_name, interval=interval)
+            self.scheduler.start()
 
-        alerts = self.cursor.execute(
-            "SELECT id, created_at, message, status FROM notifications WHERE status != 'resolved'"
-        ).fetchall()
+    def stop_scheduler(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
 
-        if not alerts:
-            print("No active notifications.")
-            input("Press Enter...")
+    # Run the alert pass now (all tiers) and report what it created
+    def generate_daily_alerts(self, force=True):
+        try:
+            count_new = self.service.generate_daily_alerts(force=force)
+        except (LibraryError, sqlite3.Error) as e:
+            print(f"Alert generation failed: {e}")
             return
 
-        table_data = []
-        for row in alerts:
-            n_id, created, msg, status = row
-            icon = "🔴" if status == 'unread' else "⚪"
-            table_data.append([n_id, created, icon, msg])
-
-        print(tabulate(
-            table_data, 
-            headers=["ID", "Date", "Stat", "Message"], 
-            tablefmt="fancy_grid"
-        ))
-
-        print("\nOptions:")
-        print(" [ID]   -> Mark read")
-        print(" 'all'  -> Mark ALL read")
-        print(" 'd ID' -> Dismiss/Resolve (e.g., 'd 5')")
-        print(" [Enter]-> Back")
-
-        choice = input("\nAction: ").strip().lower()
-
-        if choice == 'all':
-            self.cursor.execute("UPDATE notifications SET status = 'read' WHERE status = 'unread'")
-            self.conn.commit()
-            print("All notifications marked as read.")
-        
-        elif choice.isdigit():
-            self.cursor.execute("UPDATE notifications SET status = 'read' WHERE id = ?", (choice,))
-            self.conn.commit()
-            print(f"Notification #{choice} marked as read.")
-
-        elif choice.startswith('d '):
+        print(f"🔔 System generated {count_new} new notifications.")
+
+    # Unread badge count (maintained by triggers)
+    def get_unread_count(self):
+        return self.service.unread_count()
+
+    # Rebuild the unread counter if it drifted from the notifications table
+    def check_unread_counter(self):
+        return self.service.check_unread_counter()
+
+    # View alerts inbox (paginated)
+    def view_notifications(self):
+        def to_row(n):
+            icon = "🔴" if n.status == 'unread' else "⚪"
+            return [n.id, n.created_at, icon, n.message]
+
+        def handle_action(choice):
             try:
-                _, target_id = choice.split(maxsplit=1)
-                if target_id.isdigit():
-                    self.cursor.execute("UPDATE notifications SET status = 'resolved' WHERE id = ?", (target_id,))
-                    self.conn.commit()
-                    print(f"Notification #{target_id} dismissed.")
+                if choice == 'all':
+                    self.service.mark_all_read()
+                    print("All notifications marked as read.")
+
+                elif choice.isdigit():
+                    self.service.mark_read(int(choice))
+                    print(f"Notification #{choice} marked as read.")
+
+                elif choice == 'r':
+                    self.generate_daily_alerts()
+
+                elif choice.startswith('d '):
+                    _, target_id = choice.split(maxsplit=1)
+                    if target_id.isdigit():
+                        self.service.dismiss(int(target_id))
+                        print(f"Notification #{target_id} dismissed.")
+                    else:
+                        print("Error: Use 'd <ID>'.")
+
                 else:
-                    print("Error: Invalid ID.")
-            except ValueError:
-                print("Error: Use 'd <ID>'.")
-        
-        if choice: 
+                    return False
+            except LibraryError as e:
+                print(f"❌ Error: {e}")
+            except sqlite3.Error as e:
+                print(f"Database Error: {e}")
+
+            input("Press Enter...")
+            return True
+
+        self._browse_pages(
+            "=== 🔔 NOTIFICATION CENTER ===",
+            self.service.list_notifications,
+            to_row,
+            ["ID", "Date", "Stat", "Message"],
+            empty_message="No active notifications.",
+            extra_help=[
+                " [ID]   -> Mark read",
+                " 'all'  -> Mark ALL read",
+                " 'd ID' -> Dismiss/Resolve (e.g., 'd 5')",
+                " 'r'    -> Check for new alerts now",
+            ],
+            on_command=handle_action,
+        )
+
+    # ========================== HOLDS ==========================
+
+    # Queue a student for a title with no copy on the shelf
+    def place_hold(self, prefilled_book_id=None):
+        clear_screen()
+        print("\n---------- 📌 Place Hold ----------")
+        book_id = prefilled_book_id or get_valid_int("Book ID: ")
+
+        if self.current_user_role == 'admin':
+            user_id = get_valid_int("User ID: ")
+        else:
+            user_id = self.current_user_id
+
+        self._place_hold(book_id, user_id)
+        input("Press Enter...")
+
+    def _place_hold(self, book_id, user_id):
+        try:
+            hold = self.service.place_hold(book_id, user_id)
+            print(f"✅ Hold #{hold.hold_id} placed on '{hold.title}' for {hold.user_name}. "
+                  f"{hold.ahead} student(s) ahead in the queue.")
+        except (LibraryError, sqlite3.Error) as e:
+            print(f"❌ Error: {e}")
+
+    def cancel_hold(self):
+        clear_screen()
+        print("\n---------- ❎ Cancel Hold ----------")
+        self._cancel_hold(get_valid_int("Hold ID: "))
+        input("Press Enter...")
+
+    def _cancel_hold(self, hold_id):
+        try:
+            # Students may only cancel their own holds
+            if self.current_user_role != 'admin' and self.service.get_hold(hold_id).user_id != self.current_user_id:
+                raise NotFoundError("Hold not found.")
+            hold = self.service.cancel_hold(hold_id)
+            print(f"✅ Hold #{hold_id} on '{hold.title}' cancelled.")
+        except (LibraryError, sqlite3.Error) as e:
+            print(f"❌ Error: {e}")
+
+    # Copies kept for pickup, then the waiting queue front first (Admin, paginated)
+    def view_hold_queue(self):
+        clear_screen()
+        book_id = get_valid_int("Book ID: ")
+        try:
+            book = self.service.get_book(book_id)
+        except LibraryError as e:
+            print(f"❌ Error: {e}")
             input("Press Enter...")
+            return
+
+        title = f"=== 📌 HOLD QUEUE: {book.title} ==="
+        ready = self.service.ready_holds(book_id)
+        if ready:
+            title += "\nKept for pickup: " + ", ".join(
+                f"#{h.hold_id} {h.user_name} (until {h.expires_on})" for h in ready
+            )
+
+        self._browse_pages(
+            title,
+            lambda cursor: self.service.hold_queue(book_id, cursor),
+            lambda h: [h.position, h.hold_id, h.user_id, h.user_name, h.placed_on],
+            ["Pos", "Hold ID", "User ID", "Student Name", "Placed"],
+            empty_message="Nobody is waiting for this title.",
+        )
+
+    # Open holds of the logged-in student (or of a student, for admins)
+    def view_my_holds(self, user_id=None):
+        user_id = user_id or self.current_user_id
+        while True:
+            clear_screen()
+            print("\n---------- 📌 Holds ----------")
+            holds = self.service.list_user_holds(user_id)
+            if holds:
+                rows = [
+                    [h.hold_id, h.title, h.placed_on,
+                     f"Ready until {h.expires_on}" if h.status == "ready" else f"{h.ahead} ahead"]
+                    for h in holds
+                ]
+                print(tabulate(rows, headers=["Hold ID", "Title", "Placed", "Status"], tablefmt="fancy_grid"))
+            else:
+                print("No open holds.")
+
+            choice = input("\n'c ID' to cancel a hold, [Enter] to go back: ").strip().lower()
+            if not choice:
+                return
+            if choice.startswith('c ') and choice[2:].strip().isdigit():
+                self._cancel_hold(int(choice[2:].strip()))
+                input("Press Enter...")
+
+    def view_user_holds(self):
+        clear_screen()
+        self.view_my_holds(get_valid_int("User ID: "))
+
+    # Expire ready holds past their pickup date now (the scheduler also does this)
+    def sweep_expired_holds(self):
+        try:
+            count = self.service.expire_holds()
+            print(f"✅ {count} expired hold(s) released.")
+        except (LibraryError, sqlite3.Error) as e:
+            print(f"❌ Error: {e}")
+        input("Press Enter...")
+
+    # ========================== PAGINATION ==========================
+
+    # Keyset pager over a service listing: fetch_page(cursor) -> services.Page
+    def _browse_pages(self, title, fetch_page, to_row, headers, empty_message="No records found.",
+                      extra_help=None, on_command=None, **table_opts):
+        # Cursor of every page visited so far; the last one is on screen
+        page_starts = [0]
+
+        while True:
+            clear_screen()
+            print(f"\n{title}")
+
+            page = fetch_page(page_starts[-1])
+
+            # One page fits the screen and has its own navigation: no pager
+            if not render_table((to_row(item) for item in page.items), headers, pager=False, **table_opts):
+                print(empty_message)
+
+            print(f"\nPage {len(page_starts)}")
+            print("\nOptions:")
+            for line in extra_help or []:
+                print(line)
+            if page.next_cursor is not None:
+                print(" 'n'    -> Next page")
+            if len(page_starts) > 1:
+                print(" 'p'    -> Previous page")
+            print(" 'j ID' -> Jump to ID (e.g., 'j 500')")
+            print(" [Enter]-> Back")
+
+            choice = input("\nAction: ").strip().lower()
+
+            if not choice:
+                return
+            elif choice == 'n' and page.next_cursor is not None:
+                page_starts.append(page.next_cursor)
+            elif choice == 'p' and len(page_starts) > 1:
+                page_starts.pop()
+            elif choice.startswith('j '):
+                target = choice[2:].strip()
+                if target.isdigit():
+                    page_starts.append(int(target) - 1)
+            elif on_command is not None:
+                on_command(choice)
+
+    # ========================== SMART SEARCH ==========================
 
     # Data for autocomplete search
     def get_all_search_data(self):
-        search_list = []
-        books = self.cursor.execute("SELECT book_id, title, author FROM books").fetchall()
-        for b in books:
-            label = f"📖 Book: {b[1]} ({b[2]}) | ID: {b[0]}"
-            search_list.append(label)
-            
+        return self.service.all_search_labels(include_users=self.current_user_role == 'admin')
+
+    # Smart Search index (built once per process, updated on every write)
+    def get_search_index(self):
+        return self.service.search_index()
+
+    # Entry kinds the current role may search
+    def search_kinds(self):
         if self.current_user_role == 'admin':
-            users = self.cursor.execute("SELECT user_id, name, username FROM users").fetchall()
-            for u in users:
-                label = f"👤 User: {u[1]} (@{u[2]}) | ID: {u[0]}"
-                search_list.append(label)
+            return ("book", "user")
+        return ("book",)
+
+
+def _book_row(book):
+    return [book.book_id, book.title, book.author, book.total_copies, book.available_copies]
+
 
-        return search_list
\ No newline at end of file
+# "3, 5,7" -> [3, 5, 7]; None if any part is not a number
+def _parse_id_list(text):
+    parts = [p.strip() for p in text.split(",") if p.strip()]
+    if not all(p.isdigit() for p in parts):
+        return None
+    return [int(p) for p in parts]
@@ -0,0 +1,450 @@
+# queries.py
+#
+# Every statement the application runs, by name. services.py and
+# search_index.py use these constants instead of inline SQL, so
+#   - the whole set fits the per-connection statement cache (db.STATEMENT_CACHE_SIZE)
+#   - bench.query_plans can EXPLAIN each one against a large dataset.
+# Schema steps (migrations.py) and the one-off tools keep their own SQL.
+#
+# Lists of IDs are bound as one JSON array (`IN (SELECT value FROM json_each(?))`),
+# so a batch of any size reuses the same prepared statement.
+
+# ========================== USERS ==========================
+
+USER_LOGIN = "SELECT user_id, name, username, phone, role FROM users WHERE username = ? AND password = ?"
+
+USER_BY_ID = "SELECT user_id, name, username, phone, role FROM users WHERE user_id = ?"
+
+USER_BY_USERNAME = "SELECT user_id, name, username, phone, role FROM users WHERE username = ?"
+
+USER_PASSWORD = "SELECT password FROM users WHERE user_id = ?"
+
+ADMIN_COUNT = "SELECT COUNT(*) FROM users WHERE role = 'admin'"
+
+USER_INSERT = "INSERT INTO users (name, username, phone, password, role) VALUES (?, ?, ?, ?, ?)"
+
+USER_UPDATE = "UPDATE users SET name = ?, username = ?, phone = ?, role = ? WHERE user_id = ?"
+
+USER_UPDATE_WITH_PASSWORD = "UPDATE users SET name = ?, username = ?, phone = ?, password = ?, role = ? WHERE user_id = ?"
+
+USER_SET_PASSWORD = "UPDATE users SET password = ? WHERE user_id = ?"
+
+USER_ACTIVE_LOAN_COUNT = "SELECT COUNT(*) FROM loans WHERE user_id = ? AND return_date IS NULL"
+
+USER_DELETE_NOTIFICATIONS = "DELETE FROM notifications WHERE loan_id IN (SELECT loan_id FROM loans WHERE user_id = ?)"
+
+USER_DELETE_FINES = "DELETE FROM fines WHERE loan_id IN (SELECT loan_id FROM loans WHERE user_id = ?)"
+
+USER_DELETE_LOANS = "DELETE FROM loans WHERE user_id = ?"
+
+USER_DELETE = "DELETE FROM users WHERE user_id = ?"
+
+USERS_PAGE = "SELECT user_id, name, username, phone, role FROM users WHERE user_id > ? ORDER BY user_id LIMIT ?"
+
+USERS_EXISTING = "SELECT user_id FROM users WHERE user_id IN (SELECT value FROM json_each(?))"
+
+USERS_ALL_LABELS = "SELECT user_id, name, username FROM users"
+
+USER_BALANCE = "SELECT fines_outstanding FROM users WHERE user_id = ?"
+
+
+# ========================== BOOKS ==========================
+
+BOOK_BY_ID = "SELECT book_id, title, author, total_copies, available_copies FROM books WHERE book_id = ?"
+
+BOOK_AVAILABLE = "SELECT available_copies FROM books WHERE book_id = ?"
+
+BOOK_INSERT = "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)"
+
+# Stock moves relative to the current row; refused if total would drop below issued
+BOOK_UPDATE = """
+    UPDATE books
+    SET title = ?, author = ?,
+        available_copies = available_copies + (? - total_copies),
+        total_copies = ?
+    WHERE book_id = ? AND total_copies - available_copies <= ?
+"""
+
+# Check and decrement in one statement: two desks can never both take the last copy
+BOOK_TAKE_COPY = "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = ? AND available_copies > 0"
+
+BOOK_PUT_BACK_COPY = "UPDATE books SET available_copies = available_copies + 1 WHERE book_id = ?"
+
+BOOK_TAKE_COPIES = "UPDATE books SET available_copies = available_copies - ? WHERE book_id = ?"
+
+BOOK_PUT_BACK_COPIES = "UPDATE books SET available_copies = available_copies + ? WHERE book_id = ?"
+
+BOOK_LOAN_COUNT = "SELECT COUNT(*) FROM loans WHERE book_id = ?"
+
+BOOK_DELETE_NOTIFICATIONS = "DELETE FROM notifications WHERE loan_id IN (SELECT loan_id FROM loans WHERE book_id = ?)"
+
+BOOK_DELETE_FINES = "DELETE FROM fines WHERE loan_id IN (SELECT loan_id FROM loans WHERE book_id = ?)"
+
+BOOK_DELETE_LOANS = "DELETE FROM loans WHERE book_id = ?"
+
+BOOK_DELETE = "DELETE FROM books WHERE book_id = ?"
+
+BOOKS_PAGE = """
+    SELECT book_id, title, author, total_copies, available_copies
+    FROM books WHERE book_id > ? ORDER BY book_id LIMIT ?
+"""
+
+BOOKS_NEWEST = "SELECT book_id, title, author, total_copies, available_copies FROM books ORDER BY book_id DESC LIMIT ?"
+
+BOOKS_STOCK = "SELECT book_id, title, available_copies FROM books WHERE book_id IN (SELECT value FROM json_each(?))"
+
+# Ranked full-text lookup (title matches weigh double)
+BOOKS_SEARCH = """
+    SELECT b.book_id, b.title, b.author, b.total_copies, b.available_copies
+    FROM books_fts f
+    JOIN books b ON b.book_id = f.rowid
+    WHERE books_fts MATCH ?
+    ORDER BY bm25(books_fts, 2.0, 1.0)
+    LIMIT ?
+"""
+
+BOOKS_ALL_LABELS = "SELECT book_id, title, author FROM books"
+
+
+# ========================== LOANS ==========================
+
+LOAN_BY_ID = "SELECT loan_id, book_id, user_id, issue_date, due_date, return_date FROM loans WHERE loan_id = ?"
+
+LOAN_INSERT = "INSERT INTO loans (book_id, user_id, issue_date, due_date) VALUES (?, ?, ?, ?)"
+
+LOAN_OLDEST_ACTIVE_FOR_BOOK = "SELECT loan_id FROM loans WHERE book_id = ? AND return_date IS NULL ORDER BY loan_id"
+
+# Only the desk that actually closes the loan gets a row count of 1
+LOAN_CLOSE = "UPDATE loans SET return_date = ? WHERE loan_id = ? AND return_date IS NULL"
+
+LOANS_CLOSE = "UPDATE loans SET return_date = ? WHERE loan_id IN (SELECT value FROM json_each(?))"
+
+LOAN_DATES = "SELECT book_id, user_id, issue_date, due_date, return_date FROM loans WHERE loan_id = ?"
+
+LOAN_SET_DATES = "UPDATE loans SET due_date = ?, return_date = ? WHERE loan_id = ?"
+
+LOAN_DELETE = "DELETE FROM loans WHERE loan_id = ?"
+
+# CROSS JOIN pins loans as the outer loop: the page walks loan_id from the
+# cursor and stops at LIMIT. Left free, ANALYZE statistics lead the planner to
+# drive from users and sort every active loan for one page.
+_LOANS_PAGE = """
+    SELECT l.loan_id, l.book_id, l.user_id, l.issue_date, l.due_date, l.return_date,
+           b.title, b.author, u.name
+    FROM loans l {index}
+    CROSS JOIN books b ON l.book_id = b.book_id
+    CROSS JOIN users u ON l.user_id = u.user_id
+    WHERE l.loan_id > ? {active}
+    ORDER BY l.loan_id LIMIT ?
+"""
+
+LOANS_PAGE = _LOANS_PAGE.format(index="", active="")
+
+# Walks idx_loans_active_id, which holds open loans only: a page costs the
+# same however many returned loans come before it
+LOANS_PAGE_ACTIVE = _LOANS_PAGE.format(index="INDEXED BY idx_loans_active_id", active="AND l.return_date IS NULL")
+
+LOANS_FOR_USER = """
+    SELECT l.loan_id, l.book_id, l.user_id, l.issue_date, l.due_date, l.return_date,
+           b.title, b.author
+    FROM loans l
+    JOIN books b ON l.book_id = b.book_id
+    WHERE l.user_id = ?
+    ORDER BY l.loan_id
+"""
+
+LOANS_ACTIVE_FOR_USERS = """
+    SELECT loan_id, book_id, user_id, due_date FROM loans
+    WHERE user_id IN (SELECT value FROM json_each(?)) AND return_date IS NULL
+    ORDER BY loan_id
+"""
+
+
+# ========================== FINES ==========================
+
+# Days between due date and return (or `?` = today for open loans)
+_DAYS_LATE = "COALESCE(return_date, ?) - due_date"
+
+# (amount per day, updated_at, today, loan IDs)
+FINES_SETTLE = f"""
+    INSERT INTO fines (loan_id, user_id, days_overdue, amount, updated_at)
+    SELECT loan_id, user_id, days, days * ?, ?
+    FROM (
+        SELECT loan_id, user_id, {_DAYS_LATE} AS days FROM loans
+        WHERE loan_id IN (SELECT value FROM json_each(?))
+    )
+    WHERE days > 0
+    ON CONFLICT (loan_id) DO UPDATE
+    SET days_overdue = excluded.days_overdue, amount = excluded.amount, updated_at = excluded.updated_at
+"""
+
+# (today, loan IDs)
+FINES_CLEAR_ON_TIME = f"""
+    DELETE FROM fines WHERE loan_id IN (
+        SELECT loan_id FROM loans
+        WHERE {_DAYS_LATE} <= 0 AND loan_id IN (SELECT value FROM json_each(?))
+    )
+"""
+
+FINES_FOR_LOANS = "SELECT loan_id, amount, days_overdue FROM fines WHERE loan_id IN (SELECT value FROM json_each(?))"
+
+FINE_DELETE_FOR_LOAN = "DELETE FROM fines WHERE loan_id = ?"
+
+# Every overdue loan still out (idx_loans_active_due); rows whose day count
+# did not change are left alone. (today, today, amount per day, updated_at, today)
+FINES_ACCRUE = """
+    INSERT INTO fines (loan_id, user_id, days_overdue, amount, updated_at)
+    SELECT loan_id, user_id, ? - due_date, (? - due_date) * ?, ?
+    FROM loans
+    WHERE return_date IS NULL AND due_date < ?
+    ON CONFLICT (loan_id) DO UPDATE
+    SET days_overdue = excluded.days_overdue, amount = excluded.amount, updated_at = excluded.updated_at
+    WHERE fines.days_overdue != excluded.days_overdue
+"""
+
+# One chunk of the students who owe, highest balance first, ties by user_id
+# as the report always listed them. Keyset: pass the last row's balance and
+# user_id (balance=inf, user_id=0 for the first chunk). idx_users_owing
+# gives the balance order, so only rows with the same balance are sorted
+# (RIGHT PART OF ORDER BY), and per-student totals come from idx_fines_user:
+# no ledger scan, and each chunk costs the same wherever it starts.
+FINES_REPORT_PAGE = """
+    SELECT u.user_id, u.name, u.username, u.fines_outstanding,
+           (SELECT COUNT(*) FROM fines f WHERE f.user_id = u.user_id),
+           (SELECT SUM(f.days_overdue) FROM fines f WHERE f.user_id = u.user_id),
+           (SELECT COUNT(*) FROM fines f JOIN loans l ON l.loan_id = f.loan_id
+            WHERE f.user_id = u.user_id AND l.return_date IS NULL)
+    FROM users u
+    WHERE u.fines_outstanding > 0 AND u.fines_outstanding <= :balance
+      AND (u.fines_outstanding < :balance OR u.user_id > :user_id)
+    ORDER BY u.fines_outstanding DESC, u.user_id
+    LIMIT :limit
+"""
+
+
+# ========================== NOTIFICATIONS ==========================
+
+NOTIFICATIONS_RESOLVE_FOR_LOAN = "UPDATE notifications SET status = 'resolved' WHERE loan_id = ?"
+
+NOTIFICATIONS_RESOLVE_FOR_LOANS = (
+    "UPDATE notifications SET status = 'resolved' WHERE loan_id IN (SELECT value FROM json_each(?))"
+)
+
+NOTIFICATIONS_DELETE_FOR_LOAN = "DELETE FROM notifications WHERE loan_id = ?"
+
+# DUE_SOON / DUE_TODAY alerts whose loan has moved to a later tier
+ALERTS_RESOLVE_SUPERSEDED = """
+    UPDATE notifications SET status = 'resolved'
+    WHERE status != 'resolved' AND type IN ('DUE_SOON', 'DUE_TODAY')
+      AND EXISTS (
+        SELECT 1 FROM loans l
+        WHERE l.loan_id = notifications.loan_id
+          AND (l.due_date < :today OR (notifications.type = 'DUE_SOON' AND l.due_date = :today))
+      )
+"""
+
+# One alert per loan per tier, ever; only open loans due by the horizon are
+# read (idx_loans_active_due)
+ALERTS_RAISE = """
+    INSERT OR IGNORE INTO notifications (loan_id, type, message, status, created_at)
+    SELECT loan_id, tier,
+        CASE tier
+            WHEN 'OVERDUE' THEN printf('OVERDUE: ''%s'' borrowed by %s was due %s.', title, name, due)
+            WHEN 'DUE_TODAY' THEN printf('Book ''%s'' is expected today from %s.', title, name)
+            ELSE printf('Book ''%s'' borrowed by %s is due on %s.', title, name, due)
+        END,
+        'unread', :created
+    FROM (
+        SELECT l.loan_id, b.title, u.name,
+               date(l.due_date * 86400, 'unixepoch') AS due,
+               CASE WHEN l.due_date < :today THEN 'OVERDUE'
+                    WHEN l.due_date = :today THEN 'DUE_TODAY'
+                    ELSE 'DUE_SOON' END AS tier
+        FROM loans l
+        JOIN books b ON l.book_id = b.book_id
+        JOIN users u ON l.user_id = u.user_id
+        WHERE l.due_date <= :horizon AND l.return_date IS NULL
+    ) t
+    WHERE NOT EXISTS (
+        SELECT 1 FROM notifications n WHERE n.loan_id = t.loan_id AND n.type = t.tier
+    )
+"""
+
+# Open alerts only, through idx_notifications_open_id (resolved history is
+# not in it)
+NOTIFICATIONS_PAGE = """
+    SELECT id, loan_id, type, message, status, created_at FROM notifications INDEXED BY idx_notifications_open_id
+    WHERE status != 'resolved' AND id > ? ORDER BY id LIMIT ?
+"""
+
+NOTIFICATION_MARK_READ = "UPDATE notifications SET status = 'read' WHERE id = ?"
+
+NOTIFICATIONS_MARK_ALL_READ = "UPDATE notifications SET status = 'read' WHERE status = 'unread'"
+
+NOTIFICATION_DISMISS = "UPDATE notifications SET status = 'resolved' WHERE id = ?"
+
+UNREAD_COUNTER = "SELECT value FROM counters WHERE name = 'unread_notifications'"
+
+UNREAD_COUNTER_SET = "INSERT OR REPLACE INTO counters (name, value) VALUES ('unread_notifications', ?)"
+
+UNREAD_RECOUNT = "SELECT COUNT(*) FROM notifications WHERE status = 'unread'"
+
+
+# ========================== HOLDS ==========================
+
+_HOLD_COLUMNS = """
+    h.hold_id, h.book_id, h.user_id, h.position, h.status, h.placed_on, h.expires_on,
+    b.title, u.name
+"""
+
+HOLD_BY_ID = f"""
+    SELECT {_HOLD_COLUMNS}
+    FROM holds h
+    JOIN books b ON b.book_id = h.book_id
+    JOIN users u ON u.user_id = h.user_id
+    WHERE h.hold_id = ?
+"""
+
+# Back of the queue; a single seek on idx_holds_queue
+HOLD_NEXT_POSITION = "SELECT COALESCE(MAX(position), 0) + 1 FROM holds WHERE book_id = ? AND status = 'waiting'"
+
+HOLD_INSERT = "INSERT INTO holds (book_id, user_id, position, placed_on) VALUES (?, ?, ?, ?)"
+
+# Front of the queue; a single seek on idx_holds_queue
+HOLD_NEXT_WAITING = "SELECT hold_id FROM holds WHERE book_id = ? AND status = 'waiting' ORDER BY position LIMIT 1"
+
+# (pickup deadline, hold)
+HOLD_SET_READY = "UPDATE holds SET status = 'ready', expires_on = ? WHERE hold_id = ?"
+
+HOLD_SET_STATUS = "UPDATE holds SET status = ? WHERE hold_id = ?"
+
+HOLD_OPEN_FOR = """
+    SELECT hold_id, status FROM holds
+    WHERE book_id = ? AND user_id = ? AND status IN ('waiting', 'ready')
+"""
+
+HOLD_READY_NOTIFY = """
+    INSERT INTO notifications (hold_id, type, message, status, created_at)
+    SELECT h.hold_id, 'HOLD_READY',
+           printf('HOLD READY: ''%s'' is set aside for %s until %s.',
+                  b.title, u.name, date(h.expires_on * 86400, 'unixepoch')),
+           'unread', :created
+    FROM holds h
+    JOIN books b ON b.book_id = h.book_id
+    JOIN users u ON u.user_id = h.user_id
+    WHERE h.hold_id = :hold_id
+"""
+
+# One page of a title's queue, front first
+HOLDS_QUEUE_PAGE = f"""
+    SELECT {_HOLD_COLUMNS}
+    FROM holds h
+    CROSS JOIN books b ON b.book_id = h.book_id
+    CROSS JOIN users u ON u.user_id = h.user_id
+    WHERE h.book_id = ? AND h.status = 'waiting' AND h.position > ?
+    ORDER BY h.position LIMIT ?
+"""
+
+# Holds being kept for pickup
+HOLDS_READY_FOR_BOOK = f"""
+    SELECT {_HOLD_COLUMNS}
+    FROM holds h
+    JOIN books b ON b.book_id = h.book_id
+    JOIN users u ON u.user_id = h.user_id
+    WHERE h.book_id = ? AND h.status = 'ready'
+    ORDER BY h.position
+"""
+
+# Open holds of one student, with the number of students ahead in each queue
+HOLDS_FOR_USER = f"""
+    SELECT {_HOLD_COLUMNS},
+           CASE WHEN h.status = 'waiting' THEN (
+               SELECT COUNT(*) FROM holds w
+               WHERE w.book_id = h.book_id AND w.status = 'waiting' AND w.position < h.position
+           ) END
+    FROM holds h
+    JOIN books b ON b.book_id = h.book_id
+    JOIN users u ON u.user_id = h.user_id
+    WHERE h.user_id = ? AND h.status IN ('waiting', 'ready')
+    ORDER BY h.hold_id
+"""
+
+HOLDS_WAITING_COUNT = "SELECT COUNT(*) FROM holds WHERE book_id = ? AND status = 'waiting'"
+
+# Ready holds whose pickup deadline has passed (idx_holds_pickup)
+HOLDS_PAST_PICKUP = "SELECT hold_id, book_id FROM holds WHERE status = 'ready' AND expires_on < ?"
+
+HOLDS_EXPIRE = "UPDATE holds SET status = 'expired' WHERE hold_id IN (SELECT value FROM json_each(?))"
+
+HOLDS_READY_BOOKS_FOR_USER = "SELECT book_id FROM holds WHERE user_id = ? AND status = 'ready'"
+
+# Ready holds on a batch's titles (idx_holds_book), matched to borrowers in Python
+HOLDS_READY_FOR_BOOKS = """
+    SELECT hold_id, book_id, user_id FROM holds
+    WHERE book_id IN (SELECT value FROM json_each(?)) AND status = 'ready'
+"""
+
+HOLDS_FULFIL = "UPDATE holds SET status = 'fulfilled' WHERE hold_id IN (SELECT value FROM json_each(?))"
+
+NOTIFICATIONS_RESOLVE_FOR_HOLD = "UPDATE notifications SET status = 'resolved' WHERE hold_id = ?"
+
+NOTIFICATIONS_RESOLVE_FOR_HOLDS = (
+    "UPDATE notifications SET status = 'resolved' WHERE hold_id IN (SELECT value FROM json_each(?))"
+)
+
+USER_DELETE_HOLD_NOTIFICATIONS = "DELETE FROM notifications WHERE hold_id IN (SELECT hold_id FROM holds WHERE user_id = ?)"
+
+USER_DELETE_HOLDS = "DELETE FROM holds WHERE user_id = ?"
+
+BOOK_DELETE_HOLD_NOTIFICATIONS = "DELETE FROM notifications WHERE hold_id IN (SELECT hold_id FROM holds WHERE book_id = ?)"
+
+BOOK_DELETE_HOLDS = "DELETE FROM holds WHERE book_id = ?"
+
+
+# ========================== APP STATE ==========================
+
+STATE_GET = "SELECT value FROM app_state WHERE key = ?"
+
+STATE_SET = "INSERT OR REPLACE INTO app_state (key, value) VALUES (?, ?)"
+
+
+# ========================== STATISTICS ==========================
+
+STATS_DAILY = "SELECT day, issued, returned FROM stats_daily WHERE day BETWEEN ? AND ?"
+
+STATS_ACTIVE_AND_OVERDUE = """
+    SELECT COALESCE(SUM(active), 0), COALESCE(SUM(CASE WHEN due_date < ? THEN active END), 0)
+    FROM stats_due
+"""
+
+STATS_TOP_BOOKS = """
+    SELECT s.book_id, b.title, b.author, s.loans, s.active
+    FROM stats_book s JOIN books b ON b.book_id = s.book_id
+    WHERE s.loans > 0
+    ORDER BY s.loans DESC LIMIT ?
+"""
+
+STATS_TOP_BORROWERS = """
+    SELECT s.user_id, u.name, u.username, s.active
+    FROM stats_user s JOIN users u ON u.user_id = s.user_id
+    WHERE s.active > 0
+    ORDER BY s.active DESC LIMIT ?
+"""
+
+STATS_USER_ACTIVE = "SELECT active FROM stats_user WHERE user_id = ?"
+
+
+# ========================== REGISTRY ==========================
+
+# name -> SQL for every statement above
+QUERIES = {
+    name: sql for name, sql in globals().items()
+    if name.isupper() and not name.startswith("_") and isinstance(sql, str)
+}
+
+# Statements allowed to walk a whole table, and why
+SCAN_OK = {
+    "BOOKS_ALL_LABELS": "builds the in-memory search index, once per process",
+    "USERS_ALL_LABELS": "builds the in-memory search index, once per process",
+    "STATS_ACTIVE_AND_OVERDUE": "stats_due holds one row per due day of open loans",
+}
@@ -0,0 +1,92 @@
+# scheduler.py
+#
+# Runs alert generation, fine accrual and the hold sweep off the UI path.
+#   In the app:  an admin session starts an AlertScheduler thread; student
+#                sessions only read the alerts it (or the daemon) wrote.
+#   Standalone:  python scheduler.py [--interval 300] [--due-soon 2] [--once]
+import sqlite3
+import sys
+import threading
+import time
+
+from db import DEFAULT_DB, Database
+from services import DUE_SOON_DAYS, LibraryError, LibraryService
+
+# Seconds between scheduler ticks
+ALERT_INTERVAL = 300
+
+
+class AlertScheduler(threading.Thread):
+    # Background thread with its own connection (sqlite3 connections are
+    # per thread). Every tick is idempotent, so running it next to a
+    # standalone daemon or another desk's scheduler is harmless.
+
+    def __init__(self, db_path=DEFAULT_DB, interval=ALERT_INTERVAL, due_soon_days=DUE_SOON_DAYS):
+        super().__init__(name="alert-scheduler", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.due_soon_days = due_soon_days
+        self.last_error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        db = Database(self.db_path)
+        service = LibraryService(db.connection())
+        try:
+            while not self._stop_event.is_set():
+                self.tick(service)
+                self._stop_event.wait(self.interval)
+        finally:
+            db.close()
+
+    # One pass; errors are kept for display and retried next tick
+    def tick(self, service):
+        try:
+            result = service.run_scheduled_jobs(self.due_soon_days)
+            self.last_error = None
+            return result
+        except (LibraryError, sqlite3.Error) as e:
+            self.last_error = str(e)
+        return None
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+def main(argv):
+    # Imported here: the app imports this module at startup, the CLI is rare
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LibTrack alert and fine scheduler")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--interval", type=float, default=ALERT_INTERVAL, help="seconds between runs")
+    parser.add_argument("--due-soon", type=int, default=DUE_SOON_DAYS, help="days ahead for DUE_SOON alerts")
+    parser.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+    service = LibraryService(db.connection())
+    print(f"--- ⏰ SCHEDULER ({args.db}, every {args.interval:g}s) ---")
+
+    try:
+        while True:
+            try:
+                alerts, fines, holds = service.run_scheduled_jobs(args.due_soon)
+                print(f"[{time.strftime('%H:%M:%S')}] 🔔 {alerts} new alert(s), 💰 {fines} fine(s) updated, "
+                      f"📌 {holds} hold(s) expired")
+            except (LibraryError, sqlite3.Error) as e:
+                print(f"[{time.strftime('%H:%M:%S')}] ⚠️  {e}")
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\n👋 Scheduler stopped.")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
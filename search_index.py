@@ -0,0 +1,145 @@
+# search_index.py
+import re
+from bisect import bisect_left, insort
+
+import queries
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+# ========================== LABELS ==========================
+
+def book_label(book_id, title, author):
+    return f"📖 Book: {title} ({author}) | ID: {book_id}"
+
+
+def user_label(user_id, name, username):
+    return f"👤 User: {name} (@{username}) | ID: {user_id}"
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+# FTS5 MATCH expression: every word as a quoted prefix term (implicit AND)
+def fts_query(text):
+    return " ".join(f'"{word}"*' for word in tokenize(text))
+
+
+# ========================== INDEX ==========================
+
+class SearchIndex:
+    # Word-prefix index over book and user labels.
+    # Distinct tokens are kept in a sorted list, so a query word maps to a
+    # contiguous run of tokens found with bisect; each token owns an ordered
+    # posting set of entry keys. Keys are ("book", id) or ("user", id).
+
+    def __init__(self):
+        self._vocab = []
+        self._postings = {}
+        self._labels = {}
+        self._tokens = {}
+
+    def __len__(self):
+        return len(self._labels)
+
+    # Build from the database in one pass per table
+    @classmethod
+    def from_connection(cls, conn):
+        index = cls()
+
+        for book_id, title, author in conn.execute(queries.BOOKS_ALL_LABELS):
+            index._add(("book", book_id), book_label(book_id, title, author), f"{title} {author} {book_id}")
+
+        for user_id, name, username in conn.execute(queries.USERS_ALL_LABELS):
+            index._add(("user", user_id), user_label(user_id, name, username), f"{name} {username} {user_id}")
+
+        index._vocab = sorted(index._postings)
+        return index
+
+    # ---------- incremental maintenance ----------
+
+    def put_book(self, book_id, title, author):
+        self._put(("book", book_id), book_label(book_id, title, author), f"{title} {author} {book_id}")
+
+    def put_user(self, user_id, name, username):
+        self._put(("user", user_id), user_label(user_id, name, username), f"{name} {username} {user_id}")
+
+    def remove_book(self, book_id):
+        self._remove(("book", book_id))
+
+    def remove_user(self, user_id):
+        self._remove(("user", user_id))
+
+    # Register an entry; returns tokens that were new to the vocabulary
+    def _add(self, key, label, text):
+        tokens = tuple(tokenize(text))
+        self._labels[key] = label
+        self._tokens[key] = tokens
+
+        new_tokens = []
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = {}
+                new_tokens.append(token)
+            posting[key] = None
+        return new_tokens
+
+    def _put(self, key, label, text):
+        self._remove(key)
+        for token in self._add(key, label, text):
+            insort(self._vocab, token)
+
+    def _remove(self, key):
+        tokens = self._tokens.pop(key, None)
+        if tokens is None:
+            return
+        del self._labels[key]
+        for token in set(tokens):
+            posting = self._postings[token]
+            posting.pop(key, None)
+            if not posting:
+                del self._postings[token]
+                del self._vocab[bisect_left(self._vocab, token)]
+
+    # ---------- queries ----------
+
+    # Tokens starting with prefix, in sorted order
+    def _matching_tokens(self, prefix):
+        lo = bisect_left(self._vocab, prefix)
+        hi = bisect_left(self._vocab, prefix + "\uffff")
+        return self._vocab[lo:hi]
+
+    # Top-`limit` labels whose tokens cover every query word as a prefix
+    def search(self, query, limit=10, kinds=("book", "user")):
+        words = tokenize(query)
+
+        if not words:
+            keys = (k for k in self._labels if k[0] in kinds)
+            return [self._labels[k] for _, k in zip(range(limit), keys)]
+
+        # Drive from the word with the fewest matching tokens,
+        # check the remaining words per candidate
+        candidates = sorted(
+            ((self._matching_tokens(w), w) for w in set(words)),
+            key=lambda c: len(c[0]),
+        )
+        driver_tokens = candidates[0][0]
+        others = [w for _, w in candidates[1:]]
+
+        results = []
+        seen = set()
+        for token in driver_tokens:
+            for key in self._postings[token]:
+                if key in seen or key[0] not in kinds:
+                    continue
+                seen.add(key)
+
+                tokens = self._tokens[key]
+                if all(any(t.startswith(w) for t in tokens) for w in others):
+                    results.append(self._labels[key])
+                    if len(results) >= limit:
+                        return results
+
+        return results
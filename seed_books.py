@@ -1,5 +1,6 @@
 import sqlite3
 from models import LibraryManager
+from services import LibraryError
 
 def seed_database():
     """
@@ -34,18 +35,14 @@ def seed_database():
     count = 0
     for title, author, qty in books_data:
         try:
-            # We insert directly using SQL to bypass the input() prompts in add_book()
-            db.cursor.execute(
-                "INSERT INTO books (title, author, total_copies, available_copies) VALUES (?, ?, ?, ?)",
-                (title, author, qty, qty)
-            )
+            # The headless service call, not the prompting add_book() screen
+            db.service.add_book(title, author, qty)
             count += 1
             print(f"Added: {title} (Qty: {qty})")
             
-        except sqlite3.Error as e:
+        except (LibraryError, sqlite3.Error) as e:
             print(f"Error adding '{title}': {e}")
 
-    db.conn.commit()
     print("-" * 30)
     print(f"✅ Successfully added {count} books to the library.")
     print("You can now run 'main.py' and select 'List All Books' or 'Smart Search' to see them.")
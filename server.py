@@ -0,0 +1,398 @@
+# server.py
+#
+# Local JSON-over-HTTP API on top of LibraryService, for self-checkout
+# kiosks and the web catalog.
+#   python server.py [--host 127.0.0.1] [--port 8080] [--workers 8] [--db test.db]
+#
+# Requests are handled by a fixed pool of worker threads. GET requests read
+# through a pool of read-only connections and run side by side (WAL); every
+# POST is queued to one writer thread that owns the only read-write
+# connection, so writes never wait on each other's locks. There is no login:
+# bind to localhost or put it behind something that authenticates.
+import json
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from db import DEFAULT_DB, connect
+from migrations import apply_migrations
+from scheduler import ALERT_INTERVAL
+from services import (
+    PAGE_SIZE, BusyError, ConflictError, LibraryError, LibraryService, NotFoundError, ValidationError,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Request threads, and read-only connections (one per thread)
+DEFAULT_WORKERS = 8
+
+# Largest page a client may ask for
+MAX_PAGE_SIZE = 100
+
+# Largest request body accepted
+MAX_BODY_BYTES = 64 * 1024
+
+# Idle keep-alive connections are dropped after this many seconds
+KEEP_ALIVE_TIMEOUT = 30
+
+
+# ========================== CONNECTIONS ==========================
+
+class ReadPool:
+    # Read-only services, one per connection; a request borrows one for
+    # its duration and hands it back
+
+    def __init__(self, path, size):
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(LibraryService(connect(path, readonly=True)))
+
+    @contextmanager
+    def service(self):
+        service = self._idle.get()
+        try:
+            yield service
+        finally:
+            # Never hand back a connection with a read transaction still open
+            if service.conn.in_transaction:
+                service.conn.rollback()
+            self._idle.put(service)
+
+    def close(self):
+        while not self._idle.empty():
+            self._idle.get_nowait().conn.close()
+
+
+class Writer:
+    # The single read-write connection, owned by one thread: writes queue up
+    # here and run one at a time, and their errors are raised to the caller
+
+    def __init__(self, path):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="libtrack-writer")
+        self._service = self._executor.submit(self._open, path).result()
+
+    @staticmethod
+    def _open(path):
+        conn = connect(path)
+        apply_migrations(conn)
+        return LibraryService(conn)
+
+    # Run fn(service, *args) on the writer thread and return its result
+    def submit(self, fn, *args):
+        return self._executor.submit(fn, self._service, *args).result()
+
+    def close(self):
+        self._executor.submit(lambda: self._service.conn.close()).result()
+        self._executor.shutdown()
+
+
+# ========================== ENDPOINTS ==========================
+
+# Each endpoint is fn(service, ids, query, body): ids are the integers
+# captured from the path, query the parsed query string, body the JSON
+# object sent with a POST. The return value is sent back as JSON.
+
+def _health(service, ids, query, body):
+    return {"status": "ok"}
+
+
+def _list_books(service, ids, query, body):
+    return service.list_books(_int_param(query, "cursor", 0), _limit(query))
+
+
+def _get_book(service, ids, query, body):
+    return service.get_book(ids[0])
+
+
+def _search(service, ids, query, body):
+    return service.search(query.get("q", [""])[0], _limit(query))
+
+
+def _list_loans(service, ids, query, body):
+    active = query.get("active", ["0"])[0] in ("1", "true")
+    return service.list_loans(_int_param(query, "cursor", 0), _limit(query), active_only=active)
+
+
+def _get_loan(service, ids, query, body):
+    return service.get_loan(ids[0])
+
+
+def _user_loans(service, ids, query, body):
+    return service.list_user_loans(ids[0])
+
+
+def _list_notifications(service, ids, query, body):
+    return service.list_notifications(_int_param(query, "cursor", 0), _limit(query))
+
+
+def _unread(service, ids, query, body):
+    return {"unread": service.unread_count()}
+
+
+def _issue(service, ids, query, body):
+    return service.issue(_int_field(body, "book_id"), _int_field(body, "user_id"))
+
+
+def _return_loan(service, ids, query, body):
+    return service.return_loan(ids[0])
+
+
+# Desk-style return: closes the oldest open loan of the scanned book
+def _return_book(service, ids, query, body):
+    return service.return_book(_int_field(body, "book_id"))
+
+
+def _mark_read(service, ids, query, body):
+    service.mark_read(ids[0])
+    return {"id": ids[0], "status": "read"}
+
+
+# (method, path pattern, endpoint, status on success). GET endpoints run on
+# the read pool, POST endpoints on the writer.
+ROUTES = [
+    ("GET", r"/health", _health, 200),
+    ("GET", r"/books", _list_books, 200),
+    ("GET", r"/books/(\d+)", _get_book, 200),
+    ("GET", r"/search", _search, 200),
+    ("GET", r"/loans", _list_loans, 200),
+    ("GET", r"/loans/(\d+)", _get_loan, 200),
+    ("GET", r"/users/(\d+)/loans", _user_loans, 200),
+    ("GET", r"/notifications", _list_notifications, 200),
+    ("GET", r"/notifications/unread", _unread, 200),
+    ("POST", r"/loans", _issue, 201),
+    ("POST", r"/loans/(\d+)/return", _return_loan, 200),
+    ("POST", r"/returns", _return_book, 200),
+    ("POST", r"/notifications/(\d+)/read", _mark_read, 200),
+]
+
+_ROUTES = [(method, re.compile(pattern + r"/?$"), fn, status) for method, pattern, fn, status in ROUTES]
+
+
+def _route(method, path):
+    allowed = False
+    for route_method, pattern, fn, status in _ROUTES:
+        match = pattern.match(path)
+        if not match:
+            continue
+        if route_method == method:
+            return fn, status, tuple(int(g) for g in match.groups())
+        allowed = True
+    if allowed:
+        raise _HTTPError(405, "Method not allowed.")
+    raise _HTTPError(404, "No such endpoint.")
+
+
+# ========================== REQUEST HANDLING ==========================
+
+class _HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Domain errors -> HTTP status (subclasses first)
+_ERROR_STATUS = [
+    (NotFoundError, 404),
+    (ValidationError, 400),
+    (ConflictError, 409),
+    (BusyError, 503),
+    (LibraryError, 400),
+]
+
+
+def _int_param(query, name, default):
+    value = query.get(name, [None])[0]
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError(f"'{name}' must be an integer.")
+
+
+def _limit(query):
+    return max(1, min(_int_param(query, "limit", PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def _int_field(body, name):
+    value = body.get(name)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValidationError(f"'{name}' must be an integer.")
+    return value
+
+
+# Result types are dataclasses (Page holds a list of them)
+def _jsonable(value):
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so kiosks reuse one socket; every response has a length
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_TIMEOUT
+    # Headers and body go out in separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK (~40 ms) on every keep-alive request
+    disable_nagle_algorithm = True
+    # Errors raised by http.server itself (bad request line, unknown method)
+    error_message_format = '{"error": "%(message)s"}'
+    error_content_type = "application/json"
+    server_version = "LibTrack"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        try:
+            # Read the body first so the connection stays usable after an error
+            body = self._read_body()
+            url = urlsplit(self.path)
+            fn, status, ids = _route(method, url.path)
+            query = parse_qs(url.query)
+
+            if method == "GET":
+                with self.server.readers.service() as service:
+                    result = fn(service, ids, query, body)
+            else:
+                result = self.server.writer.submit(fn, ids, query, body)
+            self._send(status, _jsonable(result))
+        except _HTTPError as e:
+            self._send(e.status, {"error": str(e)})
+        except LibraryError as e:
+            status = next(code for cls, code in _ERROR_STATUS if isinstance(e, cls))
+            self._send(status, {"error": str(e)})
+        except sqlite3.Error as e:
+            self.log_error("database error on %s %s: %s", method, self.path, e)
+            self._send(500, {"error": "Database error."})
+
+    def _read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise _HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            raise _HTTPError(413, "Request body too large.")
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise _HTTPError(400, "Request body is not valid JSON.")
+        if not isinstance(body, dict):
+            raise _HTTPError(400, "Request body must be a JSON object.")
+        return body
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if status == 503:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if self.server.access_log:
+            super().log_message(format, *args)
+
+
+class LibraryHTTPServer(HTTPServer):
+    # HTTPServer with a fixed pool of request threads instead of one thread
+    # per connection, so a burst of kiosks cannot open unbounded connections
+    daemon_threads = True
+
+    def __init__(self, address, readers, writer, workers=DEFAULT_WORKERS, access_log=False):
+        super().__init__(address, LibraryRequestHandler)
+        self.readers = readers
+        self.writer = writer
+        self.access_log = access_log
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="libtrack-http")
+
+    def process_request(self, request, client_address):
+        self._workers.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._workers.shutdown(wait=False, cancel_futures=True)
+
+
+# ========================== SCHEDULED JOBS ==========================
+
+# Alert generation, fine accrual and the hold sweep, queued to the writer
+# like any other write instead of opening a second writing connection
+def _run_jobs(writer, interval, stop):
+    while True:
+        try:
+            alerts, fines, holds = writer.submit(LibraryService.run_scheduled_jobs)
+            if alerts or fines or holds:
+                print(f"[{time.strftime('%H:%M:%S')}] 🔔 {alerts} new alert(s), 💰 {fines} fine(s) updated, "
+                      f"📌 {holds} hold(s) expired")
+        except (LibraryError, sqlite3.Error) as e:
+            print(f"[{time.strftime('%H:%M:%S')}] ⚠️  {e}")
+        if stop.wait(interval):
+            return
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="LibTrack JSON API server")
+    parser.add_argument("--db", default=DEFAULT_DB)
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="request threads (and read connections)")
+    parser.add_argument("--interval", type=float, default=ALERT_INTERVAL,
+                        help="seconds between scheduled jobs (0 to leave them to scheduler.py)")
+    parser.add_argument("--log", action="store_true", help="print an access log line per request")
+    args = parser.parse_args(argv)
+
+    # The writer opens (and migrates) the file before any reader connects
+    writer = Writer(args.db)
+    readers = ReadPool(args.db, args.workers)
+    server = LibraryHTTPServer((args.host, args.port), readers, writer, args.workers, args.log)
+
+    host, port = server.server_address[:2]
+    print(f"--- 🌐 LIBTRACK API on http://{host}:{port} ({args.db}, {args.workers} workers) ---", flush=True)
+
+    stop = threading.Event()
+    if args.interval > 0:
+        threading.Thread(target=_run_jobs, args=(writer, args.interval, stop), name="libtrack-jobs", daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Server stopped.")
+    finally:
+        stop.set()
+        server.server_close()
+        readers.close()
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,1036 @@
+# services.py
+import json
+import sqlite3
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+import queries
+from archiver import archive_attached, purge_archived
+from db import begin_immediate, is_locked_error
+from lookup_cache import LOOKUP_CACHE_SIZE, LookupCache
+from migrations import rebuild_circulation_stats
+from search_index import SearchIndex, book_label, user_label, fts_query
+from utils import FINE_PER_DAY, from_day, to_day, today_day, validate_phone_format, validate_username_format
+
+# Max rows returned by catalog searches
+SEARCH_LIMIT = 50
+
+# Rows per page in paginated listings
+PAGE_SIZE = 20
+
+# Rows per query when a whole report is read in keyset chunks
+REPORT_CHUNK = 200
+
+# Standard loan period
+LOAN_DAYS = 14
+
+# DUE_SOON alerts go out this many days before the due date
+DUE_SOON_DAYS = 2
+
+# Alert tiers, lowest first; a loan moving up a tier resolves its lower ones
+ALERT_TIERS = ("DUE_SOON", "DUE_TODAY", "OVERDUE")
+
+# Days a returned copy is kept aside for the student whose hold came up
+HOLD_PICKUP_DAYS = 3
+
+ROLES = ("student", "admin")
+
+
+# ========================== DOMAIN ERRORS ==========================
+
+class LibraryError(Exception):
+    # Base for every rule violation; str(error) is safe to show to users
+    pass
+
+
+class NotFoundError(LibraryError):
+    pass
+
+
+class ValidationError(LibraryError):
+    pass
+
+
+class ConflictError(LibraryError):
+    pass
+
+
+class OutOfStockError(ConflictError):
+    pass
+
+
+class AuthenticationError(LibraryError):
+    pass
+
+
+class BusyError(LibraryError):
+    # Another desk held the write lock for longer than every retry
+    pass
+
+
+# ========================== RESULT TYPES ==========================
+
+@dataclass
+class Book:
+    book_id: int
+    title: str
+    author: str
+    total_copies: int
+    available_copies: int
+
+    @property
+    def issued_copies(self):
+        return self.total_copies - self.available_copies
+
+
+@dataclass
+class User:
+    user_id: int
+    name: str
+    username: str
+    phone: str
+    role: str
+
+
+@dataclass
+class Loan:
+    # Dates are "YYYY-MM-DD" here; the table stores day numbers (utils.to_day)
+    loan_id: int
+    book_id: int
+    user_id: int
+    issue_date: str
+    due_date: str
+    return_date: Optional[str]
+    title: Optional[str] = None
+    author: Optional[str] = None
+    user_name: Optional[str] = None
+
+    @property
+    def is_active(self):
+        return self.return_date is None
+
+
+@dataclass
+class Notification:
+    id: int
+    loan_id: int
+    type: str
+    message: str
+    status: str
+    created_at: str
+
+
+@dataclass
+class Hold:
+    hold_id: int
+    book_id: int
+    user_id: int
+    position: int
+    # waiting -> ready (copy set aside until expires_on) -> fulfilled / cancelled / expired
+    status: str
+    placed_on: str
+    expires_on: Optional[str]
+    title: Optional[str] = None
+    user_name: Optional[str] = None
+    # Students ahead in the queue (waiting holds only)
+    ahead: Optional[int] = None
+
+
+@dataclass
+class ReturnResult:
+    loan_id: int
+    book_id: int
+    user_id: int
+    fine: float
+    days_overdue: int
+    # Hold the returned copy was set aside for, if the title had a queue
+    hold: Optional[Hold] = None
+
+
+@dataclass
+class BatchItemResult:
+    book_id: int
+    user_id: int
+    ok: bool = False
+    loan_id: Optional[int] = None
+    error: Optional[str] = None
+    title: Optional[str] = None
+    due_date: Optional[str] = None
+    fine: float = 0.0
+    days_overdue: int = 0
+
+
+@dataclass
+class FineSummary:
+    user_id: int
+    name: str
+    username: str
+    outstanding: float
+    late_loans: int
+    days_overdue: int
+    # Late loans still out, whose fine grows every night
+    accruing: int
+
+
+@dataclass
+class CirculationStats:
+    issued_today: int
+    returned_today: int
+    active_loans: int
+    overdue_loans: int
+    # (date, issued, returned) for each of the last N days, oldest first
+    daily: list = field(default_factory=list)
+    # (book_id, title, author, total loans, out now)
+    top_books: list = field(default_factory=list)
+    # (user_id, name, username, active loans)
+    top_borrowers: list = field(default_factory=list)
+
+
+@dataclass
+class Page:
+    items: list = field(default_factory=list)
+    # Pass back as `cursor` to fetch the following page; None on the last page
+    next_cursor: Optional[int] = None
+
+
+# ========================== SERVICE ==========================
+
+class LibraryService:
+    # Headless library operations: no input(), print() or terminal state.
+    # Methods return the types above and raise LibraryError subclasses.
+
+    def __init__(self, conn, cache_size=LOOKUP_CACHE_SIZE):
+        self.conn = conn
+
+        # Book/user rows and search labels; 0 turns caching off
+        self._cache = LookupCache(conn, cache_size)
+
+        # Date of the last alert run seen by this process
+        self._alerts_generated_on = None
+
+        # Smart Search index, built on first use
+        self._search_index = None
+
+    # Write transaction holding the write lock from the start (see db.begin_immediate)
+    @contextmanager
+    def _transaction(self):
+        cursor = self.conn.cursor()
+        if not self.conn.in_transaction:
+            try:
+                begin_immediate(self.conn)
+            except sqlite3.OperationalError as e:
+                if is_locked_error(e):
+                    raise BusyError("The database is busy at another desk. Please try again.") from e
+                raise
+        try:
+            yield cursor
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def _one(self, sql, params=()):
+        return self.conn.execute(sql, params).fetchone()
+
+    # ---------- users ----------
+
+    def authenticate(self, username, password):
+        row = self._one(queries.USER_LOGIN, (username.lower(), password))
+        if not row:
+            raise AuthenticationError("Invalid credentials.")
+        return User(*row)
+
+    def get_user(self, user_id):
+        row = self._cache.get(("user", user_id), lambda: self._one(queries.USER_BY_ID, (user_id,)))
+        if not row:
+            raise NotFoundError("User not found.")
+        return User(*row)
+
+    def get_user_by_username(self, username):
+        username = username.lower()
+        row = self._cache.get(("username", username), lambda: self._one(queries.USER_BY_USERNAME, (username,)))
+        if not row:
+            raise NotFoundError(f"User '{username}' not found.")
+        return User(*row)
+
+    def count_admins(self):
+        return self._one(queries.ADMIN_COUNT)[0]
+
+    def register_user(self, name, username, phone, password, role="student"):
+        username = username.lower()
+        for check in (validate_username_format(username), validate_phone_format(phone)):
+            if check is not True:
+                raise ValidationError(check)
+        if not name or not password:
+            raise ValidationError("Name and password are required.")
+        if role not in ROLES:
+            raise ValidationError(f"Invalid role '{role}'.")
+
+        try:
+            with self._transaction() as cur:
+                cur.execute(queries.USER_INSERT, (name, username, phone, password, role))
+                user_id = cur.lastrowid
+        except sqlite3.IntegrityError:
+            raise ConflictError("Username already exists.")
+
+        if self._search_index is not None:
+            self._search_index.put_user(user_id, name, username)
+        return User(user_id, name, username, phone, role)
+
+    # Fields left as None keep their current value
+    def update_user(self, user_id, name=None, username=None, phone=None, password=None, role=None):
+        current = self.get_user(user_id)
+
+        name = name or current.name
+        username = (username or current.username).lower()
+        role = role or current.role
+
+        if phone is not None and phone != current.phone:
+            check = validate_phone_format(phone)
+            if check is not True:
+                raise ValidationError(check)
+        phone = phone or current.phone
+
+        if role not in ROLES:
+            raise ValidationError(f"Invalid role '{role}'.")
+
+        # Prevent removing last admin
+        if current.role == "admin" and role == "student" and self.count_admins() <= 1:
+            raise ConflictError("You cannot downgrade the last Administrator.")
+
+        try:
+            with self._transaction() as cur:
+                if password:
+                    cur.execute(
+                        queries.USER_UPDATE_WITH_PASSWORD, (name, username, phone, password, role, user_id)
+                    )
+                else:
+                    cur.execute(queries.USER_UPDATE, (name, username, phone, role, user_id))
+        except sqlite3.IntegrityError:
+            raise ConflictError("Username taken.")
+
+        if self._search_index is not None:
+            self._search_index.put_user(user_id, name, username)
+        return User(user_id, name, username, phone, role)
+
+    # Raises if the account may not be deleted right now
+    def check_user_deletable(self, user_id, acting_user_id=None):
+        user = self.get_user(user_id)
+
+        if user_id == acting_user_id:
+            raise ConflictError("You cannot delete your own account while logged in.")
+
+        if user.role == "admin" and self.count_admins() <= 1:
+            raise ConflictError("Cannot delete the last Administrator.")
+
+        active_loans = self._one(queries.USER_ACTIVE_LOAN_COUNT, (user_id,))[0]
+        if active_loans > 0:
+            raise ConflictError(
+                f"This user has {active_loans} active loan(s). They must return all books before deletion."
+            )
+        return user
+
+    def delete_user(self, user_id, acting_user_id=None):
+        user = self.check_user_deletable(user_id, acting_user_id)
+
+        with archive_attached(self.conn) as archived, self._transaction() as cur:
+            ready_books = [row[0] for row in cur.execute(queries.HOLDS_READY_BOOKS_FOR_USER, (user_id,))]
+            cur.execute(queries.USER_DELETE_HOLD_NOTIFICATIONS, (user_id,))
+            cur.execute(queries.USER_DELETE_HOLDS, (user_id,))
+            cur.execute(queries.USER_DELETE_NOTIFICATIONS, (user_id,))
+            cur.execute(queries.USER_DELETE_FINES, (user_id,))
+            cur.execute(queries.USER_DELETE_LOANS, (user_id,))
+            if archived:
+                purge_archived(cur, "user_id", user_id)
+            cur.execute(queries.USER_DELETE, (user_id,))
+
+            # Copies kept aside for this student go to the next in line
+            for book_id in ready_books:
+                cur.execute(queries.BOOK_PUT_BACK_COPY, (book_id,))
+                self._fill_holds(cur, book_id, today_day())
+
+        if self._search_index is not None:
+            self._search_index.remove_user(user_id)
+        return user
+
+    def verify_password(self, user_id, password):
+        row = self._one(queries.USER_PASSWORD, (user_id,))
+        if row is None:
+            raise NotFoundError("User record not found.")
+        return row[0] == password
+
+    def change_password(self, user_id, old_password, new_password):
+        if not self.verify_password(user_id, old_password):
+            raise AuthenticationError("Incorrect current password.")
+        if not new_password:
+            raise ValidationError("Password cannot be empty.")
+
+        with self._transaction() as cur:
+            cur.execute(queries.USER_SET_PASSWORD, (new_password, user_id))
+
+    # ---------- books ----------
+
+    def get_book(self, book_id):
+        row = self._cache.get(("book", book_id), lambda: self._one(queries.BOOK_BY_ID, (book_id,)))
+        if not row:
+            raise NotFoundError("Book not found.")
+        return Book(*row)
+
+    def add_book(self, title, author, quantity):
+        if not title or not author:
+            raise ValidationError("Title and author are required.")
+        if quantity < 0:
+            raise ValidationError("Quantity cannot be negative.")
+
+        with self._transaction() as cur:
+            cur.execute(queries.BOOK_INSERT, (title, author, quantity, quantity))
+            book_id = cur.lastrowid
+
+        if self._search_index is not None:
+            self._search_index.put_book(book_id, title, author)
+        return Book(book_id, title, author, quantity, quantity)
+
+    # Fields left as None keep their current value
+    def update_book(self, book_id, title=None, author=None, total_copies=None):
+        book = self.get_book(book_id)
+
+        title = title or book.title
+        author = author or book.author
+        total = book.total_copies if total_copies is None else total_copies
+
+        with self._transaction() as cur:
+            # Stock moves relative to the current row, so loans issued since
+            # get_book() are kept
+            cur.execute(queries.BOOK_UPDATE, (title, author, total, total, book_id, total))
+            if cur.rowcount == 0:
+                book = self.get_book(book_id)
+                raise ConflictError(
+                    f"Cannot reduce total below currently issued count ({book.issued_copies})."
+                )
+            # Added copies go to the hold queue first
+            if total > book.total_copies:
+                self._fill_holds(cur, book_id, today_day())
+            available = self._one(queries.BOOK_AVAILABLE, (book_id,))[0]
+
+        if self._search_index is not None:
+            self._search_index.put_book(book_id, title, author)
+        return Book(book_id, title, author, total, available)
+
+    # Raises if copies are out; returns the number of past loans that would be erased
+    def check_book_deletable(self, book_id):
+        book = self.get_book(book_id)
+        if book.issued_copies:
+            raise ConflictError(
+                f"Cannot delete '{book.title}'. There are still {book.issued_copies} copy(s) issued to students."
+            )
+        return self._one(queries.BOOK_LOAN_COUNT, (book_id,))[0]
+
+    def delete_book(self, book_id):
+        book = self.get_book(book_id)
+        self.check_book_deletable(book_id)
+
+        with archive_attached(self.conn) as archived, self._transaction() as cur:
+            cur.execute(queries.BOOK_DELETE_HOLD_NOTIFICATIONS, (book_id,))
+            cur.execute(queries.BOOK_DELETE_HOLDS, (book_id,))
+            cur.execute(queries.BOOK_DELETE_NOTIFICATIONS, (book_id,))
+            cur.execute(queries.BOOK_DELETE_FINES, (book_id,))
+            cur.execute(queries.BOOK_DELETE_LOANS, (book_id,))
+            if archived:
+                purge_archived(cur, "book_id", book_id)
+            cur.execute(queries.BOOK_DELETE, (book_id,))
+
+        if self._search_index is not None:
+            self._search_index.remove_book(book_id)
+        return book
+
+    def list_books(self, cursor=0, limit=PAGE_SIZE):
+        rows = self.conn.execute(queries.BOOKS_PAGE, (cursor, limit + 1)).fetchall()
+        return _page([Book(*r) for r in rows], limit, lambda b: b.book_id)
+
+    def new_arrivals(self, limit=5):
+        rows = self.conn.execute(queries.BOOKS_NEWEST, (limit,)).fetchall()
+        return [Book(*r) for r in rows]
+
+    # Ranked full-text catalog lookup
+    def search(self, q, limit=SEARCH_LIMIT):
+        match = fts_query(q)
+        if not match:
+            return []
+
+        rows = self.conn.execute(queries.BOOKS_SEARCH, (match, limit)).fetchall()
+        return [Book(*r) for r in rows]
+
+    # ---------- users listing ----------
+
+    def list_users(self, cursor=0, limit=PAGE_SIZE):
+        rows = self.conn.execute(queries.USERS_PAGE, (cursor, limit + 1)).fetchall()
+        return _page([User(*r) for r in rows], limit, lambda u: u.user_id)
+
+    # ---------- loans ----------
+
+    def get_loan(self, loan_id):
+        row = self._one(queries.LOAN_BY_ID, (loan_id,))
+        if not row:
+            raise NotFoundError("Loan ID not found.")
+        return _loan(row)
+
+    def issue(self, book_id, user_id):
+        book = self.get_book(book_id)
+        user = self.get_user(user_id)
+
+        issue_day = today_day()
+        due_day = issue_day + LOAN_DAYS
+
+        with self._transaction() as cur:
+            hold = self._one(queries.HOLD_OPEN_FOR, (book_id, user_id))
+            if hold and hold[1] == "ready":
+                # The copy kept aside for this student's hold is already off the shelf
+                cur.execute(queries.HOLD_SET_STATUS, ("fulfilled", hold[0]))
+                cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_HOLD, (hold[0],))
+            else:
+                cur.execute(queries.BOOK_TAKE_COPY, (book_id,))
+                if cur.rowcount == 0:
+                    raise OutOfStockError(f"'{book.title}' is out of stock. A hold can be placed instead.")
+            cur.execute(queries.LOAN_INSERT, (book_id, user_id, issue_day, due_day))
+            loan_id = cur.lastrowid
+
+        return Loan(loan_id, book_id, user_id, from_day(issue_day), from_day(due_day), None,
+                    title=book.title, author=book.author, user_name=user.name)
+
+    # Desk return by book ID: closes the oldest active loan of that book
+    def return_book(self, book_id):
+        row = self._one(queries.LOAN_OLDEST_ACTIVE_FOR_BOOK, (book_id,))
+        if not row:
+            raise NotFoundError("No active loan found for this book ID.")
+        return self.return_loan(row[0])
+
+    def return_loan(self, loan_id):
+        loan = self.get_loan(loan_id)
+        today = today_day()
+
+        with self._transaction() as cur:
+            # Only the desk that actually closes the loan puts the copy back
+            cur.execute(queries.LOAN_CLOSE, (today, loan_id))
+            if cur.rowcount == 0:
+                raise ConflictError("This loan has already been returned.")
+            cur.execute(queries.BOOK_PUT_BACK_COPY, (loan.book_id,))
+            cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_LOAN, (loan_id,))
+            fine, days = self._settle_fines(cur, [loan_id], today).get(loan_id, (0.0, 0))
+            ready = self._fill_holds(cur, loan.book_id, today)
+
+        hold = self.get_hold(ready[0]) if ready else None
+        return ReturnResult(loan_id, loan.book_id, loan.user_id, fine, days, hold)
+
+    # Admin correction. Dates are "YYYY-MM-DD"; return_date="" re-opens a
+    # returned loan; None keeps a value.
+    def update_loan(self, loan_id, due_date=None, return_date=None):
+        try:
+            new_due = to_day(due_date) if due_date else None
+            new_return = to_day(return_date) if return_date else None
+        except ValueError:
+            raise ValidationError("Invalid date format. Use YYYY-MM-DD.")
+
+        with self._transaction() as cur:
+            # Read under the write lock so the return state cannot change underneath
+            row = self._one(queries.LOAN_DATES, (loan_id,))
+            if not row:
+                raise NotFoundError("Loan ID not found.")
+            book_id, user_id, issue_day, due_day, return_day = row
+
+            final_due = due_day if new_due is None else new_due
+            if return_date is None:
+                final_return = return_day
+            else:
+                final_return = new_return
+
+            is_unreturning = final_return is None and return_day is not None
+            is_returning = final_return is not None and return_day is None
+
+            if is_unreturning:
+                cur.execute(queries.BOOK_TAKE_COPY, (book_id,))
+                if cur.rowcount == 0:
+                    raise OutOfStockError("Cannot mark as borrowed. Book stock is 0.")
+            elif is_returning:
+                cur.execute(queries.BOOK_PUT_BACK_COPY, (book_id,))
+                self._fill_holds(cur, book_id, today_day())
+            cur.execute(queries.LOAN_SET_DATES, (final_due, final_return, loan_id))
+            if final_due != due_day or is_unreturning:
+                # Alerts are one per loan per tier; drop the ones raised for the
+                # old dates so the forced run below can raise them afresh
+                cur.execute(queries.NOTIFICATIONS_DELETE_FOR_LOAN, (loan_id,))
+            else:
+                cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_LOAN, (loan_id,))
+            # New dates may raise, lower or clear the fine
+            self._settle_fines(cur, [loan_id], today_day())
+
+        self.generate_daily_alerts(force=True)
+        return Loan(loan_id, book_id, user_id, from_day(issue_day), from_day(final_due), from_day(final_return))
+
+    # Deleting an active loan puts the copy back on the shelf
+    def delete_loan(self, loan_id):
+        with self._transaction() as cur:
+            loan = self.get_loan(loan_id)
+
+            cur.execute(queries.NOTIFICATIONS_DELETE_FOR_LOAN, (loan_id,))
+            cur.execute(queries.FINE_DELETE_FOR_LOAN, (loan_id,))
+            cur.execute(queries.LOAN_DELETE, (loan_id,))
+            if loan.is_active and cur.rowcount:
+                cur.execute(queries.BOOK_PUT_BACK_COPY, (loan.book_id,))
+                self._fill_holds(cur, loan.book_id, today_day())
+
+        return loan
+
+    def list_loans(self, cursor=0, limit=PAGE_SIZE, active_only=False):
+        query = queries.LOANS_PAGE_ACTIVE if active_only else queries.LOANS_PAGE
+        rows = self.conn.execute(query, (cursor, limit + 1)).fetchall()
+        return _page([_loan(r) for r in rows], limit, lambda l: l.loan_id)
+
+    def list_user_loans(self, user_id):
+        rows = self.conn.execute(queries.LOANS_FOR_USER, (user_id,)).fetchall()
+        return [_loan(r) for r in rows]
+
+    # Issue many (book_id, user_id) pairs in one transaction.
+    # Returns one BatchItemResult per pair, in input order.
+    def issue_batch(self, pairs):
+        pairs = [(int(b), int(u)) for b, u in pairs]
+        if not pairs:
+            return []
+
+        book_ids = sorted({b for b, _ in pairs})
+        user_ids = sorted({u for _, u in pairs})
+        results = [BatchItemResult(b, u) for b, u in pairs]
+
+        issue_day = today_day()
+        due_day = issue_day + LOAN_DAYS
+
+        try:
+            with self._transaction() as cur:
+                # Stock is read under the write lock, so it cannot change before the update
+                books = {
+                    row[0]: row for row in cur.execute(queries.BOOKS_STOCK, (_id_list(book_ids),)).fetchall()
+                }
+                users = {
+                    row[0] for row in cur.execute(queries.USERS_EXISTING, (_id_list(user_ids),)).fetchall()
+                }
+                # Copies set aside for ready holds are already off the shelf
+                # (not in available_copies); only their own student can take them
+                ready = {
+                    (book_id, user_id): hold_id
+                    for hold_id, book_id, user_id in cur.execute(
+                        queries.HOLDS_READY_FOR_BOOKS, (_id_list(book_ids),)
+                    ).fetchall()
+                }
+                fulfilled = []
+
+                # Validate against a running stock count so duplicates in the batch are honoured
+                stock = {book_id: row[2] for book_id, row in books.items()}
+                for result in results:
+                    book_id, user_id = result.book_id, result.user_id
+                    if book_id not in books:
+                        result.error = "Book not found."
+                        continue
+                    if user_id not in users:
+                        result.error = "User not found."
+                        continue
+                    hold_id = ready.pop((book_id, user_id), None)
+                    if hold_id is not None:
+                        # Same as issue(): the student collects their held copy
+                        fulfilled.append(hold_id)
+                    elif stock[book_id] <= 0:
+                        result.error = f"'{books[book_id][1]}' is out of stock."
+                        continue
+                    else:
+                        stock[book_id] -= 1
+                    result.ok = True
+                    result.title = books[book_id][1]
+
+                if fulfilled:
+                    cur.execute(queries.HOLDS_FULFIL, (_id_list(fulfilled),))
+                    cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_HOLDS, (_id_list(fulfilled),))
+
+                for r in results:
+                    if r.ok:
+                        cur.execute(queries.LOAN_INSERT, (r.book_id, r.user_id, issue_day, due_day))
+                        r.loan_id = cur.lastrowid
+                        r.due_date = from_day(due_day)
+
+                cur.executemany(
+                    queries.BOOK_TAKE_COPIES,
+                    [(books[b][2] - stock[b], b) for b in books if books[b][2] != stock[b]],
+                )
+        except (sqlite3.Error, BusyError) as e:
+            for r in results:
+                if r.ok or not r.error:
+                    r.ok, r.loan_id, r.due_date, r.error = False, None, None, f"Database Error: {e}"
+
+        return results
+
+    # Return many (book_id, user_id) pairs in one transaction, oldest loan first.
+    # Returns one BatchItemResult per pair with the fine owed.
+    def return_batch(self, pairs):
+        pairs = [(int(b), int(u)) for b, u in pairs]
+        if not pairs:
+            return []
+
+        user_ids = sorted({u for _, u in pairs})
+        results = [BatchItemResult(b, u) for b, u in pairs]
+
+        try:
+            with self._transaction() as cur:
+                # All active loans for these students in one indexed lookup,
+                # read under the write lock so no loan is returned twice
+                open_loans = {}
+                for loan_id, book_id, user_id, due_date in cur.execute(
+                    queries.LOANS_ACTIVE_FOR_USERS, (_id_list(user_ids),)
+                ).fetchall():
+                    open_loans.setdefault((book_id, user_id), []).append((loan_id, due_date))
+
+                for result in results:
+                    queue = open_loans.get((result.book_id, result.user_id))
+                    if not queue:
+                        result.error = "No active loan for this book and user."
+                    else:
+                        result.loan_id, _ = queue.pop(0)
+                        result.ok = True
+
+                accepted = [r for r in results if r.ok]
+                if accepted:
+                    loan_ids = [r.loan_id for r in accepted]
+                    returned = {}
+                    for r in accepted:
+                        returned[r.book_id] = returned.get(r.book_id, 0) + 1
+
+                    today = today_day()
+                    cur.execute(queries.LOANS_CLOSE, (today, _id_list(loan_ids)))
+                    cur.executemany(
+                        queries.BOOK_PUT_BACK_COPIES,
+                        [(count, book_id) for book_id, count in returned.items()],
+                    )
+                    for book_id in returned:
+                        self._fill_holds(cur, book_id, today)
+                    cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_LOANS, (_id_list(loan_ids),))
+                    fines = self._settle_fines(cur, loan_ids, today)
+                    for r in accepted:
+                        r.fine, r.days_overdue = fines.get(r.loan_id, (0.0, 0))
+        except (sqlite3.Error, BusyError) as e:
+            for r in results:
+                if r.ok or not r.error:
+                    r.ok, r.loan_id, r.fine, r.days_overdue, r.error = False, None, 0.0, 0, f"Database Error: {e}"
+
+        return results
+
+    # ---------- fines ----------
+
+    # Bring the ledger in line with the dates of the given loans: late loans
+    # get (or update) their row, loans no longer late lose it. `today` is a day number.
+    # Returns {loan_id: (amount, days_overdue)} for the late ones.
+    def _settle_fines(self, cur, loan_ids, today):
+        ids = _id_list(loan_ids)
+        cur.execute(queries.FINES_SETTLE, (FINE_PER_DAY, from_day(today), today, ids))
+        cur.execute(queries.FINES_CLEAR_ON_TIME, (today, ids))
+        return {
+            loan_id: (amount, days)
+            for loan_id, amount, days in cur.execute(queries.FINES_FOR_LOANS, (ids,)).fetchall()
+        }
+
+    # Nightly re-accrual: one statement over every overdue loan still out.
+    # Runs once per day unless forced; returns the number of fines changed.
+    def accrue_fines(self, force=False):
+        today = today_day()
+        today_text = from_day(today)
+
+        if not force:
+            last_run = self._one(queries.STATE_GET, ("fines_accrued_on",))
+            if last_run and last_run[0] == today_text:
+                return 0
+
+        with self._transaction() as cur:
+            changed = cur.execute(
+                queries.FINES_ACCRUE, (today, today, FINE_PER_DAY, today_text, today)
+            ).rowcount
+            cur.execute(queries.STATE_SET, ("fines_accrued_on", today_text))
+        return changed
+
+    # "Does this student owe money": a primary-key lookup on the maintained balance
+    def outstanding_balance(self, user_id):
+        row = self._one(queries.USER_BALANCE, (user_id,))
+        if row is None:
+            raise NotFoundError("User not found.")
+        return row[0]
+
+    # Every student with a balance, highest first, read REPORT_CHUNK rows at
+    # a time as the caller iterates. Each chunk is its own short query, so a
+    # slow consumer (the pager) holds no read snapshot in between; a balance
+    # that changes mid-report may move its student across a chunk boundary.
+    def iter_fines_report(self, chunk_size=REPORT_CHUNK):
+        after = {"balance": float("inf"), "user_id": 0, "limit": chunk_size}
+        while True:
+            rows = self.conn.execute(queries.FINES_REPORT_PAGE, after).fetchall()
+            for row in rows:
+                yield FineSummary(*row)
+            if len(rows) < chunk_size:
+                return
+            after["balance"], after["user_id"] = rows[-1][3], rows[-1][0]
+
+    def fines_report(self):
+        return list(self.iter_fines_report())
+
+    # ---------- notifications ----------
+
+    # Raise DUE_SOON / DUE_TODAY / OVERDUE alerts for open loans, at most one
+    # per loan per tier, and resolve alerts a loan has escalated past.
+    # Runs once per day unless forced; returns the number of alerts created.
+    def generate_daily_alerts(self, force=False, due_soon_days=DUE_SOON_DAYS):
+        today_num = today_day()
+        today = from_day(today_num)
+
+        # Cheap exits: already ran today in this process, or in another one
+        if not force:
+            if self._alerts_generated_on == today:
+                return 0
+            last_run = self._one(queries.STATE_GET, ("alerts_generated_on",))
+            if last_run and last_run[0] == today:
+                self._alerts_generated_on = today
+                return 0
+
+        params = {"today": today_num, "horizon": today_num + due_soon_days, "created": today}
+
+        with self._transaction() as cur:
+            cur.execute(queries.ALERTS_RESOLVE_SUPERSEDED, params)
+            count_new = cur.execute(queries.ALERTS_RAISE, params).rowcount
+            cur.execute(queries.STATE_SET, ("alerts_generated_on", today))
+
+        self._alerts_generated_on = today
+        return count_new
+
+    # One scheduler tick: alerts and the hold sweep every time, fine accrual
+    # once a day. Returns (alerts created, fines changed, holds expired).
+    def run_scheduled_jobs(self, due_soon_days=DUE_SOON_DAYS):
+        alerts = self.generate_daily_alerts(force=True, due_soon_days=due_soon_days)
+        fines = self.accrue_fines()
+        holds = self.expire_holds()
+        with self._transaction() as cur:
+            cur.execute(queries.STATE_SET, ("jobs_last_run", datetime.now().isoformat(timespec="seconds")))
+        return alerts, fines, holds
+
+    # Time of the last scheduler tick ("" if it never ran)
+    def jobs_last_run(self):
+        row = self._one(queries.STATE_GET, ("jobs_last_run",))
+        return row[0] if row else ""
+
+    # Unread badge count (maintained by triggers)
+    def unread_count(self):
+        row = self._one(queries.UNREAD_COUNTER)
+        return row[0] if row else 0
+
+    # Rebuild the unread counter if it drifted; returns (stored, actual)
+    def check_unread_counter(self):
+        stored = self.unread_count()
+        actual = self._one(queries.UNREAD_RECOUNT)[0]
+
+        if stored != actual:
+            with self._transaction() as cur:
+                cur.execute(queries.UNREAD_COUNTER_SET, (actual,))
+        return stored, actual
+
+    def list_notifications(self, cursor=0, limit=PAGE_SIZE):
+        rows = self.conn.execute(queries.NOTIFICATIONS_PAGE, (cursor, limit + 1)).fetchall()
+        return _page([Notification(*r) for r in rows], limit, lambda n: n.id)
+
+    def mark_read(self, notification_id):
+        with self._transaction() as cur:
+            cur.execute(queries.NOTIFICATION_MARK_READ, (notification_id,))
+
+    def mark_all_read(self):
+        with self._transaction() as cur:
+            cur.execute(queries.NOTIFICATIONS_MARK_ALL_READ)
+
+    def dismiss(self, notification_id):
+        with self._transaction() as cur:
+            cur.execute(queries.NOTIFICATION_DISMISS, (notification_id,))
+
+    # ---------- holds ----------
+
+    def get_hold(self, hold_id):
+        row = self._one(queries.HOLD_BY_ID, (hold_id,))
+        if not row:
+            raise NotFoundError("Hold not found.")
+        return _hold(row)
+
+    # Join the back of a title's queue; only when no copy is on the shelf
+    def place_hold(self, book_id, user_id):
+        book = self.get_book(book_id)
+        user = self.get_user(user_id)
+        today = today_day()
+
+        try:
+            with self._transaction() as cur:
+                # Read under the write lock: a copy returned meanwhile is issued, not queued
+                if self._one(queries.BOOK_AVAILABLE, (book_id,))[0] > 0:
+                    raise ConflictError(f"'{book.title}' has copies on the shelf. Issue it instead.")
+                position = self._one(queries.HOLD_NEXT_POSITION, (book_id,))[0]
+                cur.execute(queries.HOLD_INSERT, (book_id, user_id, position, today))
+                hold_id = cur.lastrowid
+                ahead = self._one(queries.HOLDS_WAITING_COUNT, (book_id,))[0] - 1
+        except sqlite3.IntegrityError:
+            raise ConflictError(f"{user.name} already has a hold on '{book.title}'.")
+
+        return Hold(hold_id, book_id, user_id, position, "waiting", from_day(today), None,
+                    title=book.title, user_name=user.name, ahead=ahead)
+
+    # A cancelled ready hold passes its copy to the next in line (or the shelf)
+    def cancel_hold(self, hold_id):
+        with self._transaction() as cur:
+            hold = self.get_hold(hold_id)
+            if hold.status not in ("waiting", "ready"):
+                raise ConflictError(f"Hold #{hold_id} is already {hold.status}.")
+
+            cur.execute(queries.HOLD_SET_STATUS, ("cancelled", hold_id))
+            cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_HOLD, (hold_id,))
+            if hold.status == "ready":
+                cur.execute(queries.BOOK_PUT_BACK_COPY, (hold.book_id,))
+                self._fill_holds(cur, hold.book_id, today_day())
+
+        hold.status = "cancelled"
+        return hold
+
+    # Keyset page over a title's waiting queue, front first (cursor = position)
+    def hold_queue(self, book_id, cursor=0, limit=PAGE_SIZE):
+        rows = self.conn.execute(queries.HOLDS_QUEUE_PAGE, (book_id, cursor, limit + 1)).fetchall()
+        return _page([_hold(r) for r in rows], limit, lambda h: h.position)
+
+    def ready_holds(self, book_id):
+        return [_hold(r) for r in self.conn.execute(queries.HOLDS_READY_FOR_BOOK, (book_id,))]
+
+    def list_user_holds(self, user_id):
+        return [_hold(r) for r in self.conn.execute(queries.HOLDS_FOR_USER, (user_id,))]
+
+    # Bulk sweep: ready holds past their pickup deadline expire together and
+    # their copies pass down the queue. Returns the number expired.
+    def expire_holds(self):
+        today = today_day()
+
+        with self._transaction() as cur:
+            expired = cur.execute(queries.HOLDS_PAST_PICKUP, (today,)).fetchall()
+            if not expired:
+                return 0
+
+            hold_ids = _id_list(hold_id for hold_id, _ in expired)
+            cur.execute(queries.HOLDS_EXPIRE, (hold_ids,))
+            cur.execute(queries.NOTIFICATIONS_RESOLVE_FOR_HOLDS, (hold_ids,))
+
+            freed = {}
+            for _, book_id in expired:
+                freed[book_id] = freed.get(book_id, 0) + 1
+            cur.executemany(queries.BOOK_PUT_BACK_COPIES, [(count, book_id) for book_id, count in freed.items()])
+            for book_id in freed:
+                self._fill_holds(cur, book_id, today)
+
+        return len(expired)
+
+    # Hand copies on the shelf to the front of the title's queue: each popped
+    # hold keeps a copy aside for HOLD_PICKUP_DAYS and raises HOLD_READY.
+    # Called inside the transaction that put the copies back; one indexed
+    # lookup when nobody is waiting. Returns the hold IDs made ready.
+    def _fill_holds(self, cur, book_id, today):
+        ready = []
+        while True:
+            row = cur.execute(queries.HOLD_NEXT_WAITING, (book_id,)).fetchone()
+            if row is None:
+                break
+            cur.execute(queries.BOOK_TAKE_COPY, (book_id,))
+            if cur.rowcount == 0:
+                break
+
+            cur.execute(queries.HOLD_SET_READY, (today + HOLD_PICKUP_DAYS, row[0]))
+            cur.execute(queries.HOLD_READY_NOTIFY, {"hold_id": row[0], "created": from_day(today)})
+            ready.append(row[0])
+        return ready
+
+    # ---------- statistics ----------
+
+    # Dashboard numbers, read from the summary tables the loans triggers
+    # maintain: every query is a primary-key or index range, never a loans scan
+    def circulation_stats(self, days=7, top=10):
+        today = today_day()
+        first = today - days + 1
+
+        counts = {
+            day: (issued, returned)
+            for day, issued, returned in self.conn.execute(queries.STATS_DAILY, (first, today))
+        }
+        daily = [(from_day(d),) + counts.get(d, (0, 0)) for d in range(first, today + 1)]
+
+        active, overdue = self._one(queries.STATS_ACTIVE_AND_OVERDUE, (today,))
+        top_books = self.conn.execute(queries.STATS_TOP_BOOKS, (top,)).fetchall()
+        top_borrowers = self.conn.execute(queries.STATS_TOP_BORROWERS, (top,)).fetchall()
+
+        return CirculationStats(
+            issued_today=daily[-1][1],
+            returned_today=daily[-1][2],
+            active_loans=active,
+            overdue_loans=overdue,
+            daily=daily,
+            top_books=top_books,
+            top_borrowers=top_borrowers,
+        )
+
+    # Active loans for one user, from the summary table
+    def active_loan_count(self, user_id):
+        row = self._one(queries.STATS_USER_ACTIVE, (user_id,))
+        return row[0] if row else 0
+
+    # Recompute the summary tables (after bulk imports or repairs); pass
+    # "loan_history" while the archive is attached to include archived loans
+    def rebuild_statistics(self, source="loans"):
+        with self._transaction() as cur:
+            rebuild_circulation_stats(cur, source)
+
+    # ---------- smart search ----------
+
+    # Built once per process, updated by every book/user write above
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = SearchIndex.from_connection(self.conn)
+        return self._search_index
+
+    # Flat label list (legacy autocomplete data)
+    def all_search_labels(self, include_users=False):
+        return list(self._cache.get(("labels", include_users), lambda: self._load_labels(include_users)))
+
+    def _load_labels(self, include_users):
+        labels = [book_label(*b) for b in self.conn.execute(queries.BOOKS_ALL_LABELS)]
+        if include_users:
+            labels += [user_label(*u) for u in self.conn.execute(queries.USERS_ALL_LABELS)]
+        return tuple(labels)
+
+    # Hit/miss counters of the lookup cache (see lookup_cache.py)
+    def cache_stats(self):
+        return self._cache.stats()
+
+
+# ========================== HELPERS ==========================
+
+# Loan from a (loan_id, book_id, user_id, issue, due, return, ...) row of day numbers
+def _loan(row):
+    return Loan(row[0], row[1], row[2], from_day(row[3]), from_day(row[4]), from_day(row[5]), *row[6:])
+
+
+# Hold from a (hold_id, book_id, user_id, position, status, placed, expires, title, name[, ahead]) row
+def _hold(row):
+    return Hold(row[0], row[1], row[2], row[3], row[4], from_day(row[5]), from_day(row[6]), *row[7:])
+
+
+# Trim the look-ahead row and compute the next keyset cursor
+def _page(items, limit, key):
+    if len(items) > limit:
+        items = items[:limit]
+        return Page(items, key(items[-1]))
+    return Page(items, None)
+
+
+# One JSON array parameter for an `IN (SELECT value FROM json_each(?))` list
+def _id_list(values):
+    return json.dumps(list(values))
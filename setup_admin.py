@@ -1,5 +1,5 @@
-import sqlite3
 from models import LibraryManager
+from services import ConflictError, LibraryError
 
 
 def create_admin_account():
@@ -16,18 +16,17 @@ def create_admin_account():
     default_phone = "0000000000"
 
     try:
-        # Force 'admin' role directly into DB
-        db.cursor.execute(
-            "INSERT INTO users (name, username, password, phone, role) VALUES (?, ?, ?, ?, 'admin')",
-            (name, username, password, default_phone),
-        )
-        db.conn.commit()
-        print(f"\n✅ Success! Admin '{username}' created.")
+        # Force 'admin' role
+        user = db.service.register_user(name, username, default_phone, password, role="admin")
+        print(f"\n✅ Success! Admin '{user.username}' created.")
         print("You may now run 'main.py' and log in.")
 
-    except sqlite3.IntegrityError:
+    except ConflictError:
         print(f"\n❌ Error: The username '{username}' is already taken.")
         print("Please choose a different username.")
+
+    except LibraryError as e:
+        print(f"\n❌ Error: {e}")
     
     except Exception as e:
         print(f"\n❌ Unexpected Error: {e}")
@@ -0,0 +1,252 @@
+# sqlstats.py
+#
+# Opt-in SQL instrumentation. Every connection opened through db.connect()
+# records per-statement latency while the flag is set:
+#   LIBTRACK_SQL_STATS=1 python main.py
+#   LIBTRACK_SQL_STATS=1 LIBTRACK_SLOW_MS=20 python main.py
+# The report is printed on exit and from the admin Statistics screen.
+import math
+import os
+import re
+import sqlite3
+import textwrap
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+
+ENV_FLAG = "LIBTRACK_SQL_STATS"
+SLOW_MS_ENV = "LIBTRACK_SLOW_MS"
+SLOW_LOG_ENV = "LIBTRACK_SLOW_LOG"
+
+# Statements slower than this (ms) go to the slow-query log
+DEFAULT_SLOW_MS = 50.0
+DEFAULT_SLOW_LOG = "slow_queries.log"
+
+# Histogram buckets grow by 2^(1/4) (~19%) from 1 µs, so memory per
+# statement is fixed and percentiles are accurate to one bucket
+BUCKETS_PER_DOUBLING = 4
+
+# Only these can be EXPLAINed
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+
+def enabled():
+    return os.environ.get(ENV_FLAG, "") not in ("", "0")
+
+
+# ========================== NORMALIZING ==========================
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+# One key per statement shape: literals become ?, IN (?, ?, ...) lists of
+# any length collapse, whitespace is squeezed
+@lru_cache(maxsize=1024)
+def normalize(sql):
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+# ========================== STATISTICS ==========================
+
+def _bucket(seconds):
+    micros = seconds * 1e6
+    if micros <= 1:
+        return 0
+    return int(math.log2(micros) * BUCKETS_PER_DOUBLING) + 1
+
+
+def _bucket_upper_ms(bucket):
+    return 2 ** (bucket / BUCKETS_PER_DOUBLING) / 1000
+
+
+class StatementStats:
+    __slots__ = ("calls", "exec_seconds", "fetch_seconds", "max_seconds", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.exec_seconds = 0.0
+        # Time spent stepping through rows after execute() returned
+        self.fetch_seconds = 0.0
+        self.max_seconds = 0.0
+        self.buckets = {}
+
+    @property
+    def total_seconds(self):
+        return self.exec_seconds + self.fetch_seconds
+
+    # Execute latency at percentile p (0-100), in ms
+    def percentile(self, p):
+        if not self.calls:
+            return 0.0
+        rank = math.ceil(self.calls * p / 100)
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(_bucket_upper_ms(bucket), self.max_seconds * 1000)
+        return self.max_seconds * 1000
+
+
+class QueryStats:
+    # Process-wide registry shared by every instrumented connection and thread
+
+    def __init__(self, slow_ms=None, slow_log=None):
+        self.slow_ms = float(os.environ.get(SLOW_MS_ENV, DEFAULT_SLOW_MS)) if slow_ms is None else slow_ms
+        self.slow_log = slow_log or os.environ.get(SLOW_LOG_ENV, DEFAULT_SLOW_LOG)
+        self.statements = {}
+        self.slow_count = 0
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        bucket = _bucket(seconds)
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats()
+            stats.calls += 1
+            stats.exec_seconds += seconds
+            stats.buckets[bucket] = stats.buckets.get(bucket, 0) + 1
+            if seconds > stats.max_seconds:
+                stats.max_seconds = seconds
+
+    def record_fetch(self, key, seconds):
+        with self._lock:
+            stats = self.statements.get(key)
+            if stats is not None:
+                stats.fetch_seconds += seconds
+
+    # Append one entry with the statement's current query plan. Parameters
+    # are left out on purpose: they include passwords.
+    def log_slow(self, sql, seconds, plan):
+        lines = [
+            f"# {datetime.now().isoformat(timespec='seconds')}  {seconds * 1000:.2f} ms",
+            textwrap.dedent(sql).strip(),
+        ]
+        if plan:
+            lines.append("QUERY PLAN")
+            lines.extend(plan)
+        with self._lock:
+            self.slow_count += 1
+            with open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n\n")
+
+    def reset(self):
+        with self._lock:
+            self.statements.clear()
+            self.slow_count = 0
+
+    # Statements by cumulative time, heaviest first
+    def top(self, limit=20):
+        with self._lock:
+            items = list(self.statements.items())
+        items.sort(key=lambda item: item[1].total_seconds, reverse=True)
+        return items[:limit]
+
+    def report_lines(self, limit=20, width=70):
+        items = self.top(limit)
+        if not items:
+            return ["No SQL recorded (set LIBTRACK_SQL_STATS=1 to enable)."]
+
+        grand_total = sum(s.total_seconds for s in self.statements.values()) or 1.0
+        lines = [
+            f"{'calls':>8} {'total ms':>10} {'share':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  statement",
+        ]
+        for key, s in items:
+            text = key if len(key) <= width else key[:width - 3] + "..."
+            lines.append(
+                f"{s.calls:>8,} {s.total_seconds * 1000:>10.1f} {s.total_seconds / grand_total:>6.1%} "
+                f"{s.percentile(50):>8.3f} {s.percentile(95):>8.3f} {s.percentile(99):>8.3f} "
+                f"{s.max_seconds * 1000:>8.3f}  {text}"
+            )
+        lines.append(f"(latency columns in ms; {self.slow_count} slow statement(s) logged to {self.slow_log})")
+        return lines
+
+
+SQL_STATS = QueryStats()
+
+
+# ========================== CONNECTION WRAPPERS ==========================
+
+def _plan(conn, sql, params):
+    if not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    try:
+        # Plain cursor: the EXPLAIN itself is not recorded
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error as e:
+        return [f"(no plan: {e})"]
+
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + "- " + detail)
+    return lines
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    _key = None
+
+    def _timed(self, run, sql, params, explain):
+        started = time.perf_counter()
+        try:
+            return run()
+        finally:
+            elapsed = time.perf_counter() - started
+            self._key = normalize(sql)
+            SQL_STATS.record(self._key, elapsed)
+            if elapsed * 1000 >= SQL_STATS.slow_ms:
+                SQL_STATS.log_slow(sql, elapsed, _plan(self.connection, sql, params) if explain else [])
+
+    def execute(self, sql, params=()):
+        return self._timed(lambda: super(InstrumentedCursor, self).execute(sql, params), sql, params, True)
+
+    def executemany(self, sql, seq_of_params):
+        return self._timed(lambda: super(InstrumentedCursor, self).executemany(sql, seq_of_params), sql, (), False)
+
+    def _fetch(self, fetch):
+        started = time.perf_counter()
+        try:
+            return fetch()
+        finally:
+            if self._key is not None:
+                SQL_STATS.record_fetch(self._key, time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._fetch(lambda: super(InstrumentedCursor, self).fetchmany(size or self.arraysize))
+
+    def fetchall(self):
+        return self._fetch(super().fetchall)
+
+    def __next__(self):
+        return self._fetch(super().__next__)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute() bypasses an overridden Cursor.execute, so
+    # the shortcuts are routed through cursor() here
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+def print_report(limit=20):
+    print("\n--- 🧪 SQL PROFILE (by total time) ---")
+    for line in SQL_STATS.report_lines(limit):
+        print(line)
@@ -0,0 +1,239 @@
+# tables.py
+#
+# Streaming grid renderer with the look of tabulate's "fancy_grid", for
+# listings of any length. tabulate needs every row before it prints
+# anything and builds the whole table as one string; here column widths are
+# fixed up front from `maxcolwidths` or the first SAMPLE_ROWS rows (longer
+# cells further down wrap inside their column), then rows are formatted and
+# written one at a time. The first row shows as soon as the sample is read
+# and memory does not grow with the row count.
+#
+# On a terminal the output goes through a pager: $PAGER, else `less -FRX`
+# (exits at once when everything fits), else a built-in "-- More --" prompt.
+# Quitting the pager stops reading rows.
+# subprocess, shlex, shutil and textwrap (~10 ms together) load on first
+# use: the app imports this module at startup, before any table is shown
+import itertools
+import os
+import sys
+
+# Rows read before the column widths are fixed
+SAMPLE_ROWS = 50
+
+# Widest a column gets from its sample when no maxcolwidths entry limits it
+MAX_COL_WIDTH = 40
+
+# Extra room tabulate gives every header
+MIN_PADDING = 2
+
+
+# ========================== FORMATTING ==========================
+
+def _text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _wrap(text, width):
+    # Most cells fit: skip textwrap, which dominates the cost per row
+    if len(text) <= width and "\n" not in text:
+        return [text]
+    import textwrap
+
+    lines = []
+    for part in text.splitlines() or [""]:
+        lines.extend(textwrap.wrap(part, width) or [""])
+    return lines
+
+
+# Widths and alignment from the header and the sampled rows, sized the way
+# tabulate sizes them (headers get MIN_PADDING, cells their longest wrapped
+# line). A column is right-aligned when every sampled value is a number.
+def _layout(headers, sample, maxcolwidths):
+    widths = []
+    numeric = []
+    for i, header in enumerate(headers):
+        values = [row[i] for row in sample if row[i] is not None]
+        limit = maxcolwidths[i] if maxcolwidths and i < len(maxcolwidths) and maxcolwidths[i] else MAX_COL_WIDTH
+        cells = [len(line) for v in values for line in _wrap(_text(v), limit)]
+        widths.append(max([len(header) + MIN_PADDING] + cells))
+        numeric.append(bool(values) and all(_is_number(v) for v in values))
+    return widths, numeric
+
+
+def _rule(widths, left, fill, middle, right):
+    return left + middle.join(fill * (w + 2) for w in widths) + right
+
+
+def _row_lines(cells, widths, numeric):
+    wrapped = [_wrap(_text(c), w) for c, w in zip(cells, widths)]
+    height = max(len(lines) for lines in wrapped)
+    for n in range(height):
+        parts = []
+        for lines, width, right in zip(wrapped, widths, numeric):
+            text = lines[n] if n < len(lines) else ""
+            parts.append(text.rjust(width) if right else text.ljust(width))
+        yield "│ " + " │ ".join(parts) + " │"
+
+
+# Lines of the grid, produced as `rows` is consumed; nothing for no rows
+def iter_table_lines(rows, headers, maxcolwidths=None, sample_size=SAMPLE_ROWS):
+    rows = iter(rows)
+    sample = [list(r) for r in itertools.islice(rows, sample_size)]
+    if not sample:
+        return
+
+    widths, numeric = _layout(headers, sample, maxcolwidths)
+    separator = _rule(widths, "├", "─", "┼", "┤")
+
+    yield _rule(widths, "╒", "═", "╤", "╕")
+    yield from _row_lines(headers, widths, numeric)
+    yield _rule(widths, "╞", "═", "╪", "╡")
+    for n, row in enumerate(itertools.chain(sample, rows)):
+        if n:
+            yield separator
+        yield from _row_lines(row, widths, numeric)
+    yield _rule(widths, "╘", "═", "╧", "╛")
+
+
+# ========================== OUTPUT ==========================
+
+class _Stop(Exception):
+    # The reader quit the pager
+    pass
+
+
+def _pager_command():
+    command = os.environ.get("PAGER")
+    if command:
+        import shlex
+        return shlex.split(command)
+    import shutil
+    if shutil.which("less"):
+        return ["less", "-FRX"]
+    return None
+
+
+class _ExternalPager:
+
+    def __init__(self, command):
+        import subprocess
+
+        env = dict(os.environ)
+        env.setdefault("LESSCHARSET", "utf-8")
+        # Line-buffered: every row reaches the pager as soon as it is written,
+        # and a full pipe holds the renderer back until the reader scrolls
+        self._proc = subprocess.Popen(command, stdin=subprocess.PIPE, text=True, encoding="utf-8",
+                                      errors="replace", bufsize=1, env=env)
+
+    def write(self, line):
+        try:
+            self._proc.stdin.write(line + "\n")
+        except (BrokenPipeError, OSError):
+            raise _Stop()
+
+    def close(self):
+        try:
+            self._proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        self._proc.wait()
+
+
+class _PromptPager:
+    # No pager program (e.g. Windows without less): pause every screenful
+
+    def __init__(self):
+        import shutil
+
+        self._page = max(shutil.get_terminal_size().lines - 2, 5)
+        self._shown = 0
+
+    def write(self, line):
+        if self._shown == self._page:
+            if input("-- More -- (Enter: next page, 'q': stop) ").strip().lower() == "q":
+                raise _Stop()
+            self._shown = 0
+        print(line)
+        self._shown += 1
+
+    def close(self):
+        pass
+
+
+class _FileOutput:
+
+    def __init__(self, out):
+        self._out = out
+
+    def write(self, line):
+        self._out.write(line + "\n")
+
+    def close(self):
+        self._out.flush()
+
+
+def _open_output(out, pager):
+    if out is not None:
+        return _FileOutput(out)
+    if pager is None:
+        pager = sys.stdin.isatty() and sys.stdout.isatty()
+    if not pager:
+        return _FileOutput(sys.stdout)
+    # Anything printed before the table must reach the terminal first
+    sys.stdout.flush()
+    command = _pager_command()
+    if command:
+        try:
+            return _ExternalPager(command)
+        except OSError as e:
+            # e.g. $PAGER names a program that is not installed
+            print(f"⚠️  Pager '{command[0]}' could not start ({e.strerror or e}); paging here instead.")
+    return _PromptPager()
+
+
+# Write `rows` (any iterable, e.g. a generator over a cursor) as a grid.
+# `footer` is an optional callable returning lines shown below a complete
+# table. pager=None pages only on a terminal; `out` writes to a file object
+# instead. Returns the number of rows read (0: nothing was printed). A
+# source with close() (a generator) is closed afterwards, even when the
+# reader quit early. Rows are pulled only as fast as the reader scrolls
+# (less through pipe back-pressure, the "-- More --" prompt page by page),
+# so a generator over one open cursor would keep its read snapshot, and
+# block WAL checkpoints, until the pager closes. Long listings should come
+# from a generator that reads short keyset chunks, like
+# LibraryService.iter_fines_report. Short, bounded ones can be plain lists.
+def render_table(rows, headers, maxcolwidths=None, footer=None, pager=None, out=None,
+                 sample_size=SAMPLE_ROWS):
+    shown = 0
+
+    def counted():
+        nonlocal shown
+        for row in rows:
+            shown += 1
+            yield row
+
+    output = None
+    try:
+        output = _open_output(out, pager)
+        for line in iter_table_lines(counted(), headers, maxcolwidths, sample_size):
+            output.write(line)
+        if footer is not None and shown:
+            for line in footer():
+                output.write(line)
+    except _Stop:
+        pass
+    finally:
+        if output is not None:
+            output.close()
+        close = getattr(rows, "close", None)
+        if close is not None:
+            close()
+    return shown
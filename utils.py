@@ -1,5 +1,6 @@
 import os
 from datetime import date, datetime
+from functools import lru_cache
 
 
 # ========================== SYSTEM UTILITIES ==========================
@@ -9,7 +10,15 @@ def clear_screen():
     if os.name == "nt":
         os.system("cls")
     else:
-        os.system("clear")
+        # Same escape sequence `clear` prints, without spawning a shell per screen
+        print("\033[H\033[2J\033[3J", end="", flush=True)
+
+
+def tabulate(*args, **kwargs):
+    # Deferred: importing tabulate costs ~80 ms (importlib.metadata), and the
+    # first menus print no tables
+    from tabulate import tabulate as render
+    return render(*args, **kwargs)
 
 
 # ========================== INPUT HANDLING ==========================
@@ -77,17 +86,31 @@ def validate_username_format(text):
     return True
 
 
-def calculate_fine(due_date_str):
-    # Calculates 1.00 fine per day overdue
-    try:
-        due_date = datetime.strptime(due_date_str, "%Y-%m-%d").date()
-        today = date.today()
-        
-        days_overdue = (today - due_date).days
+# Fine charged per day a book is kept past its due date
+FINE_PER_DAY = 1.0
 
-        if days_overdue > 0:
-            return days_overdue * 1.0, days_overdue
-        
-        return 0.0, 0
-    except ValueError:
-        return 0.0, 0
\ No newline at end of file
+
+# ========================== DAY NUMBERS ==========================
+
+# Loan dates are stored as whole days since 1970-01-01, so comparisons and
+# overdue math are integer operations; strings exist only at the edges.
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_day(value):
+    # date or "YYYY-MM-DD" -> day number (ValueError on bad input)
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d").date()
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+@lru_cache(maxsize=4096)
+def from_day(day):
+    # Day number -> "YYYY-MM-DD"; None (not returned) stays None
+    if day is None:
+        return None
+    return date.fromordinal(day + _EPOCH_ORDINAL).strftime("%Y-%m-%d")
+
+
+def today_day():
+    return to_day(date.today())
@@ -1,6 +1,6 @@
 # views.py
-import questionary
-from tabulate import tabulate
+from search_index import book_label
+from services import LibraryError
 from utils import clear_screen
 
 
@@ -64,6 +64,10 @@ def manage_loans_menu(app):
         print("3. View All Loans")
         print("4. Delete Loan Record")
         print("5. Manual Loan Update")
+        print("6. Batch Issue (one student, many books)")
+        print("7. Batch Return (one student, many books)")
+        print("8. Fines Report")
+        print("9. Holds (Place/Cancel/Queue)")
         print("0. Back")
 
         choice = input("Choice: ")
@@ -78,33 +82,110 @@ def manage_loans_menu(app):
             app.delete_loan()
         elif choice == '5':
             app.update_loan()
+        elif choice == '6':
+            app.batch_issue_books()
+        elif choice == '7':
+            app.batch_return_books()
+        elif choice == '8':
+            app.fines_report()
+        elif choice == '9':
+            manage_holds_menu(app)
+        elif choice == '0':
+            return
+
+
+# Sub-menu for the hold queue
+def manage_holds_menu(app):
+    while True:
+        clear_screen()
+        print("--- 📌 HOLDS ---")
+        print("1. Place Hold")
+        print("2. Cancel Hold")
+        print("3. View Queue for a Book")
+        print("4. View a Student's Holds")
+        print("5. Release Expired Holds Now")
+        print("0. Back")
+
+        choice = input("Choice: ")
+
+        if choice == '1':
+            app.place_hold()
+        elif choice == '2':
+            app.cancel_hold()
+        elif choice == '3':
+            app.view_hold_queue()
+        elif choice == '4':
+            app.view_user_holds()
+        elif choice == '5':
+            app.sweep_expired_holds()
         elif choice == '0':
             return
 
 
 # ========================== SMART SEARCH SYSTEM ==========================
 
+# questionary pulls in prompt_toolkit (~120 ms of imports), so both load
+# when the first interactive prompt opens rather than at startup
+def _questionary():
+    import questionary
+    return questionary
+
+
+_completer_class = None
+
+
+# Autocomplete backed by the in-memory search index
+def _search_completer(index, kinds, limit=15):
+    global _completer_class
+    if _completer_class is None:
+        from prompt_toolkit.completion import Completer, Completion
+
+        class SearchCompleter(Completer):
+            def __init__(self, index, kinds, limit):
+                self.index = index
+                self.kinds = kinds
+                self.limit = limit
+
+            def get_completions(self, document, complete_event):
+                text = document.text_before_cursor
+                for label in self.index.search(text, limit=self.limit, kinds=self.kinds):
+                    yield Completion(label, start_position=-len(text))
+
+                if "cancel".startswith(text.strip().lower()):
+                    yield Completion("Cancel", start_position=-len(text))
+
+        _completer_class = SearchCompleter
+    return _completer_class(index, kinds, limit)
+
+
 # Interactive Search UI
 def show_smart_search(app_manager):
     clear_screen()
     print("--- 🔍 LIVE AUTOCOMPLETE SEARCH ---")
     print("Start typing to find Books or Students...")
 
-    # Load data for autocomplete
-    all_choices = app_manager.get_all_search_data()
-    all_choices.append("Cancel")
+    # Index is built once per process and kept current by LibraryManager
+    completer = _search_completer(
+        app_manager.get_search_index(),
+        app_manager.search_kinds(),
+    )
 
     # Render menu
-    selection = questionary.autocomplete(
+    selection = _questionary().autocomplete(
         "Search:",
-        choices=all_choices,
-        ignore_case=True,
-        match_middle=True 
+        choices=[],
+        completer=completer,
     ).ask()
 
     if selection == "Cancel" or selection is None:
         return
 
+    # Free text instead of a suggestion: fall back to ranked catalog search
+    if " | ID: " not in selection:
+        selection = _pick_catalog_result(app_manager, selection)
+        if selection is None:
+            return
+
     # Parse the selection string to get ID
     try:
         part1, part2 = selection.split(" | ID: ")
@@ -121,6 +202,23 @@ def show_smart_search(app_manager):
         input("Press Enter...")
 
 
+# Full-text results for a typed query; returns a label or None
+def _pick_catalog_result(app, query):
+    books = app.search_catalog(query)
+
+    if not books:
+        print("No matches found.")
+        input("Press Enter...")
+        return None
+
+    labels = [book_label(b[0], b[1], b[2]) for b in books]
+    choice = _questionary().select("Best matches:", choices=labels + ["Back"]).ask()
+
+    if choice == "Back":
+        return None
+    return choice
+
+
 # ========================== SEARCH ACTION HANDLERS ==========================
 
 # Actions when a book is selected
@@ -129,28 +227,33 @@ def _handle_book_action(app, book_id):
 
     if app.current_user_role == 'admin':
         message = "Action:"
-        choices=["Issue this Book", "View Details", "Update Book", "Delete Book", "Back"]
+        choices=["Issue this Book", "Place Hold", "View Details", "Update Book", "Delete Book", "Back"]
     else:
         message = "Action:"
-        choices = ["View Details", "Back"]
+        choices = ["View Details", "Place Hold", "Back"]
     
-    action = questionary.select(message, choices=choices).ask()
+    action = _questionary().select(message, choices=choices).ask()
 
     if action == "Issue this Book":
         app.issue_book(prefilled_book_id=book_id)
 
+    elif action == "Place Hold":
+        app.place_hold(prefilled_book_id=book_id)
+
     elif action == "View Details":
-        book = app.cursor.execute(
-            "SELECT * FROM books WHERE book_id=?", (book_id,)
-        ).fetchone()
-        
-        if book:
-            print("-" * 30)
-            print(f"Title:  {book[1]}")
-            print(f"Author: {book[2]}")
-            print(f"Stock: {book[4]} available / {book[3]} total")
-            print("-" * 30)
+        try:
+            book = app.service.get_book(book_id)
+        except LibraryError as e:
+            print(f"❌ {e}")
             input("Press Enter...")
+            return
+
+        print("-" * 30)
+        print(f"Title:  {book.title}")
+        print(f"Author: {book.author}")
+        print(f"Stock: {book.available_copies} available / {book.total_copies} total")
+        print("-" * 30)
+        input("Press Enter...")
 
     elif action == "Update Book":
         app.update_book(prefilled_book_id=book_id)
@@ -162,28 +265,26 @@ def _handle_book_action(app, book_id):
 def _handle_user_action(app, user_id):
     print(f"\n👤 Selected User ID: {user_id}")
 
-    user_data = app.cursor.execute(
-        "SELECT username, name, phone, role FROM users WHERE user_id=?", (user_id,)
-    ).fetchone()
-
-    if not user_data:
+    try:
+        user = app.service.get_user(user_id)
+    except LibraryError:
         print("User not found.")
         input("Press Enter...")
         return
 
-    username = user_data[0]
+    username = user.username
 
-    action = questionary.select(
+    action = _questionary().select(
         "Action:",
         choices=["View Profile", "Update User", "View Loans", "Back"]
     ).ask()
 
     if action == "View Profile":
         print("-" * 30)
-        print(f"Name:     {user_data[1]}")
+        print(f"Name:     {user.name}")
         print(f"Username: {username}")
-        print(f"Phone:    {user_data[2]}")
-        print(f"Role:     {user_data[3]}")
+        print(f"Phone:    {user.phone}")
+        print(f"Role:     {user.role}")
         print("-" * 30)
         input("Press Enter...")
 